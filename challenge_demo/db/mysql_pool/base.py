@@ -0,0 +1,15 @@
+from django.db.backends.mysql import base
+from challenge_demo.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    The MySQL backend with an in-process connection pool.
+    """
+
+    def is_pooled_connection_usable(self, connection):
+        try:
+            connection.ping()
+        except base.Database.Error:
+            return False
+        return True
@@ -0,0 +1,65 @@
+import queue
+import threading
+
+
+# one pool of idle driver connections per database (alias, engine, host, port, name and user)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mix into a backend's DatabaseWrapper to keep up to settings_dict['POOL_SIZE'] closed connections open in this
+    process and hand them out again instead of opening new ones.
+
+    Django still "closes" the connection at the end of every request (CONN_MAX_AGE = 0) or once it is too old, but
+    the driver connection goes back to the pool, rolled back, rather than being torn down. A connection closed inside
+    a transaction, with autocommit turned off or after an error Django found it unusable with is torn down instead, as
+    is one the pool has no room for. With CONN_HEALTH_CHECKS a pooled connection is checked before it is handed out.
+    """
+
+    def connection_pool(self):
+        key = (self.alias, self.settings_dict['ENGINE'], self.settings_dict['HOST'], self.settings_dict['PORT'],
+               self.settings_dict['NAME'], self.settings_dict['USER'])
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = queue.LifoQueue(maxsize=self.settings_dict['POOL_SIZE'])
+            return _pools[key]
+
+    def is_pooled_connection_usable(self, connection):
+        """
+        Whether an idle driver connection still works, the backend's way.
+        """
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.connection_pool()
+        while True:
+            try:
+                connection = pool.get_nowait()
+            except queue.Empty:
+                return super().get_new_connection(conn_params)
+            if not self.settings_dict['CONN_HEALTH_CHECKS'] or self.is_pooled_connection_usable(connection):
+                return connection
+            connection.close()
+
+    def is_reusable(self):
+        """
+        Whether the connection being closed can go back to the pool: not in a transaction, in the configured
+        autocommit mode, and not left unusable by an error (connect() clears errors_occurred, and
+        close_if_unusable_or_obsolete() clears it again when the connection still works).
+        """
+        return not (self.in_atomic_block or self.autocommit != self.settings_dict['AUTOCOMMIT']
+                    or self.errors_occurred)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if not self.is_reusable():
+                return self.connection.close()
+            try:
+                self.connection.rollback()
+                self.connection_pool().put_nowait(self.connection)
+            except Exception:  # the connection is broken or the pool is full
+                self.connection.close()
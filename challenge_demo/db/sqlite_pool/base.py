@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+from challenge_demo.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    The SQLite backend with an in-process connection pool, a stand-in for the MySQL one where no MySQL is available.
+    """
+
+    def is_pooled_connection_usable(self, connection):
+        try:
+            connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return not connection.in_transaction
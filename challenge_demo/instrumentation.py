@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, Http404
+
+
+class Histogram:
+    """
+    A Prometheus histogram with labels, aggregated in this process.
+    """
+    def __init__(self, name, documentation, buckets):
+        self.name, self.documentation, self.buckets = name, documentation, list(buckets)
+        self.series = {}  # label values -> [count per bucket (the last one is +Inf), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def expose(self, label_names):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        for labels, counts, total in series:
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+LABEL_NAMES = ('view', 'method')
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HISTOGRAMS = {
+    'duration': Histogram('http_request_duration_seconds', 'Wall time from the first middleware to the response.',
+                          DURATION_BUCKETS),
+    'render': Histogram('http_response_render_seconds', 'Time spent rendering (serializing) template responses.',
+                        DURATION_BUCKETS),
+    'queries': Histogram('http_request_db_queries', 'Database queries run per request.',
+                         (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)),
+    'db': Histogram('http_request_db_duration_seconds', 'Time spent in database queries per request.',
+                    DURATION_BUCKETS),
+    'size': Histogram('http_response_size_bytes', 'Size of the response body.',
+                      (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)),
+}
+
+
+class QueryTimer:
+    """
+    A connection.execute_wrapper counting the queries run and the time spent in them.
+    """
+    def __init__(self):
+        self.count, self.seconds = 0, 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class InstrumentationMiddleware:
+    """
+    Record the wall time, render time, database query count and time, and response size of every request per view
+    into the HISTOGRAMS served at /metrics, and, with settings.DEBUG or settings.SERVER_TIMING_ENABLED on, report the
+    timings of the request in a Server-Timing header. Only loaded when settings.INSTRUMENTATION_ENABLED is on.
+
+    A streamed response is recorded once its body has been sent, with the queries run while streaming it (under ASGI
+    those run in other threads and are not counted). Its Server-Timing header only covers the time to the first byte.
+    """
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.url_name == 'metrics':
+            return response
+        labels = (match.view_name if match is not None else 'unresolved', request.method)
+        view_done = getattr(request, '_instrumentation_view_done', None)
+        render = time.perf_counter() - view_done if view_done else 0.0
+
+        elapsed = time.perf_counter() - start
+        # like /metrics, the query counts and timings are not for every client to see
+        if settings.DEBUG or settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = ', '.join([
+                f'total;dur={elapsed * 1000:.3f}',
+                f'render;dur={render * 1000:.3f}',
+                f'db;dur={timer.seconds * 1000:.3f};desc="{timer.count} queries"',
+            ])
+        if response.streaming:
+            response.streaming_content = self.record_stream(response, labels, start, timer, render)
+        else:
+            self.record(labels, elapsed, render, timer, len(response.content))
+        return response
+
+    def process_template_response(self, request, response):
+        # called between the view and the rendering of its response
+        request._instrumentation_view_done = time.perf_counter()
+        return response
+
+    def record(self, labels, elapsed, render, timer, size):
+        HISTOGRAMS['duration'].observe(labels, elapsed)
+        HISTOGRAMS['render'].observe(labels, render)
+        HISTOGRAMS['queries'].observe(labels, timer.count)
+        HISTOGRAMS['db'].observe(labels, timer.seconds)
+        HISTOGRAMS['size'].observe(labels, size)
+
+    def record_stream(self, response, labels, start, timer, render):
+        content = response.streaming_content
+        if response.is_async:
+            async def stream():
+                size = 0
+                async for block in content:
+                    size += len(block)
+                    yield block
+                self.record(labels, time.perf_counter() - start, render, timer, size)
+        else:
+            def stream():
+                size = 0
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(timer))
+                    for block in content:
+                        size += len(block)
+                        yield block
+                self.record(labels, time.perf_counter() - start, render, timer, size)
+        return stream()
+
+
+def metrics(request):
+    """
+    The HISTOGRAMS in the Prometheus text format, for the addresses in settings.METRICS_ALLOWED_IPS only.
+    """
+    if not settings.INSTRUMENTATION_ENABLED or request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.expose(LABEL_NAMES))
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'challenge_demo.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,14 +84,21 @@ WSGI_APPLICATION = 'challenge_demo.wsgi.application'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 pymysql.install_as_MySQLdb()
+# DB_CONN_MAX_AGE: seconds a connection is kept open across requests (0 closes it after every request, as before)
+# DB_CONN_HEALTH_CHECKS=True: check a kept or pooled connection still works before reusing it
+# DB_POOL_SIZE: idle connections a process keeps for reuse, 0 (default) for no pool
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 0)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'challenge_demo.db.mysql_pool' if DB_POOL_SIZE else 'django.db.backends.mysql',
         'NAME': os.environ['DB_NAME'],
         'USER': os.environ['DB_USER'],
         'PASSWORD': os.environ['DB_PASSWORD'],
         'HOST': os.environ['DB_HOST'],
         'PORT': os.environ['DB_PORT'],
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE') or 0),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS') == 'True',
+        'POOL_SIZE': DB_POOL_SIZE,
     }
 }
 
@@ -136,6 +144,51 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# INSTRUMENTATION=True records per view timings, query counts and response sizes, served at /metrics to METRICS_ALLOWED_IPS
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION') == 'True'
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# SERVER_TIMING=True sends the timings and query count of each request to every client in a Server-Timing header,
+# which is otherwise only sent with DEBUG on
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING') == 'True'
+
+# largest ?page_size= a client can ask the lenders list for
+LENDER_MAX_PAGE_SIZE = int(os.environ.get('LENDER_MAX_PAGE_SIZE') or 1000)
+
+# most codes a ?code__in= basket or a /lenders/lookup/ request can ask for (every code there can be by default)
+LENDER_LOOKUP_MAX_CODES = int(os.environ.get('LENDER_LOOKUP_MAX_CODES') or 17576)
+
+# most lenders a single /lenders/bulk/ request can create, update or delete
+LENDER_BULK_MAX_ITEMS = int(os.environ.get('LENDER_BULK_MAX_ITEMS') or 50000)
+
+# most loans a single /lenders/commissions/ request can price
+LENDER_COMMISSION_MAX_LOANS = int(os.environ.get('LENDER_COMMISSION_MAX_LOANS') or 1000000)
+
+# a file based cache is shared by all the processes of a host, the default local-memory one by a single process only
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    } if os.environ.get('CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# cache holding the rendered lender list and detail responses, and how long (seconds) they are kept
+LENDER_RESPONSE_CACHE_ALIAS = 'default'
+LENDER_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('LENDER_RESPONSE_CACHE_TIMEOUT') or 600)
+
+# how long (seconds, 0 disables) and for how many distinct Authorization headers a successful /csv-in-bulk/ basic
+# authentication is remembered, and whether it also logs the user in a session (off for stateless scripted clients)
+CSV_IN_BULK_AUTH_CACHE_TIMEOUT = int(os.environ.get('CSV_IN_BULK_AUTH_CACHE_TIMEOUT') or 300)
+CSV_IN_BULK_AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('CSV_IN_BULK_AUTH_CACHE_MAX_ENTRIES') or 1000)
+CSV_IN_BULK_AUTH_SESSIONS = os.environ.get('CSV_IN_BULK_AUTH_SESSIONS') != 'False'
+
+# seconds a running /csv-in-bulk/ job may go without committing a chunk before its worker is taken to have died (killed,
+# out of memory, redeployed) and the job is failed
+CSV_IN_BULK_JOB_LEASE_SECONDS = int(os.environ.get('CSV_IN_BULK_JOB_LEASE_SECONDS') or 600)
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
@@ -0,0 +1,131 @@
+import base64
+import os
+import re
+import tempfile
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from challenge_demo import instrumentation
+from challenge_demo.db import pool
+from challenge_demo.db.sqlite_pool.base import DatabaseWrapper as PooledSQLiteWrapper
+from lenders.models import Lender
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        for histogram in instrumentation.HISTOGRAMS.values():
+            histogram.series.clear()
+        Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                              trial_commission_rate=23, active=True)
+
+    def metric(self, text, name, view, method='GET'):
+        match = re.search(rf'^{name}{{view="{view}",method="{method}"}} (\S+)$', text, re.MULTILINE)
+        return float(match.group(1)) if match else None
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    def test_requests_are_timed_per_view_and_exposed_to_prometheus(self):
+        response = self.client.get('/lenders/?format=json')
+        self.client.get('/lenders/CBA/?format=json')
+        self.client.get('/lenders/CBA/?format=json')
+        self.assertRegex(response['Server-Timing'],
+                         r'^total;dur=[\d.]+, render;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+
+        metrics = self.client.get('/metrics')
+        self.assertEqual(metrics['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        text = metrics.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertEqual(self.metric(text, 'http_request_duration_seconds_count', 'lender-detail'), 2)
+        self.assertEqual(self.metric(text, 'http_request_duration_seconds_count', 'lender-list'), 1)
+        self.assertEqual(self.metric(text, 'http_response_size_bytes_sum', 'lender-list'), len(response.content))
+        self.assertGreater(self.metric(text, 'http_request_db_queries_sum', 'lender-list'), 0)
+        self.assertIn('http_request_db_queries_bucket{view="lender-list",method="GET",le="+Inf"} 1', text)
+        self.assertIsNone(self.metric(text, 'http_request_duration_seconds_count', 'metrics'))
+
+    def test_streamed_responses_are_recorded_once_sent(self):
+        User.objects.create_user(username='downloader', password='downloader-password')
+        credentials = base64.b64encode(b'downloader:downloader-password').decode()
+        response = self.client.get('/csv-in-bulk/', HTTP_AUTHORIZATION=f'Basic {credentials}')
+        size = len(b''.join(response.streaming_content))
+        text = self.client.get('/metrics').content.decode()
+        self.assertEqual(self.metric(text, 'http_response_size_bytes_sum', 'csv_in_bulk.views.csv_in_bulk'), size)
+        self.assertGreater(self.metric(text, 'http_request_db_queries_sum', 'csv_in_bulk.views.csv_in_bulk'), 1)
+
+    def test_server_timing_is_only_sent_when_allowed(self):
+        self.assertNotIn('Server-Timing', self.client.get('/lenders/'))
+        with self.settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get('/lenders/'))
+
+    def test_metrics_are_local_only(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 404)
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled_instrumentation_adds_nothing(self):
+        self.assertNotIn('Server-Timing', self.client.get('/lenders/'))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {**connection.settings_dict, 'ENGINE': 'challenge_demo.db.sqlite_pool',
+                              'NAME': os.path.join(directory.name, 'pool.sqlite3'), 'POOL_SIZE': 2,
+                              'CONN_HEALTH_CHECKS': True}
+        self.addCleanup(self.empty_pools)
+
+    def empty_pools(self):
+        for idle in pool._pools.values():
+            while not idle.empty():
+                idle.get_nowait().close()
+        pool._pools.clear()
+
+    def wrapper(self):
+        wrapper = PooledSQLiteWrapper(self.settings_dict, alias='pooled')
+        wrapper.ensure_connection()
+        return wrapper
+
+    def test_closed_connections_are_reused(self):
+        wrapper = self.wrapper()
+        driver_connection = wrapper.connection
+        wrapper.close()
+        self.assertIsNone(wrapper.connection)
+        self.assertIs(self.wrapper().connection, driver_connection)
+
+    def test_the_pool_never_grows_past_its_size(self):
+        wrappers = [self.wrapper() for _ in range(3)]
+        driver_connections = [wrapper.connection for wrapper in wrappers]
+        for wrapper in wrappers:
+            wrapper.close()
+        self.assertEqual(wrappers[0].connection_pool().qsize(), 2)
+        with self.assertRaises(PooledSQLiteWrapper.Database.ProgrammingError):  # closed rather than pooled
+            driver_connections[2].execute('SELECT 1')
+
+    def test_connections_failing_the_health_check_are_not_handed_out(self):
+        wrapper = self.wrapper()
+        broken = wrapper.connection
+        wrapper.close()
+        broken.close()  # e.g. dropped by the server while idle
+        self.assertIsNot(self.wrapper().connection, broken)
+        self.assertTrue(wrapper.connection_pool().empty())
+
+    def test_connections_in_a_transaction_or_after_an_error_are_thrown_away(self):
+        def open_transaction(wrapper):
+            wrapper.set_autocommit(False)
+            wrapper.cursor().execute('CREATE TABLE pending (id integer)')
+
+        def enter_atomic_block(wrapper):
+            wrapper.in_atomic_block = True
+
+        def find_unusable(wrapper):
+            wrapper.errors_occurred = True  # as left by close_if_unusable_or_obsolete()
+
+        for state in (open_transaction, enter_atomic_block, find_unusable):
+            with self.subTest(state=state.__name__):
+                wrapper = self.wrapper()
+                driver_connection = wrapper.connection
+                state(wrapper)
+                wrapper.close()
+                self.assertTrue(wrapper.connection_pool().empty())
+                with self.assertRaises(PooledSQLiteWrapper.Database.ProgrammingError):  # closed rather than pooled
+                    driver_connection.execute('SELECT 1')
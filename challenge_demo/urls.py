@@ -16,10 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from challenge_demo.instrumentation import metrics
 
 urlpatterns = [
     path('', include('lenders.urls')),
     path('csv-in-bulk/', include('csv_in_bulk.urls')),
     path('api-auth/', include('rest_framework.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,20 +1,85 @@
-from django.contrib.auth import authenticate, login
+from django.conf import settings
+from django.contrib.auth import authenticate, login, get_user_model
+from django.utils.crypto import salted_hmac
+from collections import OrderedDict
 import base64
+import binascii
+import threading
+import time
+
+
+# verified Authorization headers, least recently used first: hmac of the header -> (user id, authentication backend,
+# password hash at verification time, expiry time)
+_verified_credentials = OrderedDict()
+_verified_credentials_lock = threading.Lock()
+_KEY_SALT = 'csv_in_bulk.authenticators.basic_auth_logged_in'
+
+
+def _cached_user(key):
+    """
+    The active user a cached header verified, or None when the header is not cached, has expired, or the user was
+    deactivated or changed password since (comparing the stored password hash costs one primary key lookup rather
+    than a password hash, and also catches changes made by other processes).
+    """
+    with _verified_credentials_lock:
+        entry = _verified_credentials.get(key)
+        if entry is not None:
+            _verified_credentials.move_to_end(key)
+    if entry is None:
+        return None
+    user_id, backend, password, expires = entry
+    user = None
+    if time.monotonic() < expires:
+        user = get_user_model()._default_manager.filter(pk=user_id, is_active=True).first()
+    if user is None or user.password != password:
+        with _verified_credentials_lock:
+            _verified_credentials.pop(key, None)
+        return None
+    user.backend = backend
+    return user
+
+
+def _cache_user(key, user):
+    if settings.CSV_IN_BULK_AUTH_CACHE_TIMEOUT <= 0:
+        return
+    with _verified_credentials_lock:
+        _verified_credentials[key] = (user.pk, user.backend, user.password,
+                                      time.monotonic() + settings.CSV_IN_BULK_AUTH_CACHE_TIMEOUT)
+        _verified_credentials.move_to_end(key)
+        while len(_verified_credentials) > settings.CSV_IN_BULK_AUTH_CACHE_MAX_ENTRIES:
+            _verified_credentials.popitem(last=False)
+
+
+def clear_verified_credentials():
+    with _verified_credentials_lock:
+        _verified_credentials.clear()
 
 
 def basic_auth_logged_in(request):
     """"
     Authenticate a user using the basic authentication.
-    The user will be logged-in in the request object upon successful authentication.
+    The user will be logged-in in the request object upon successful authentication, and also logged in the session
+    unless CSV_IN_BULK_AUTH_SESSIONS is off.
 
+    A successful verification is cached for CSV_IN_BULK_AUTH_CACHE_TIMEOUT seconds under a keyed hash of the header
+    (never the credentials themselves), so repeated calls skip the password hash. Failed attempts are never cached.
     """
     if 'HTTP_AUTHORIZATION' in request.META:
         auth = request.META['HTTP_AUTHORIZATION'].split()
         if len(auth) == 2 and auth[0].lower() == "basic":
-            uname, passwd = base64.b64decode(auth[1].encode()).decode('utf-8').split(':')
-            user = authenticate(username=uname, password=passwd)
-            if user and user.is_active:
+            key = salted_hmac(_KEY_SALT, request.META['HTTP_AUTHORIZATION'], algorithm='sha256').hexdigest()
+            user = _cached_user(key)
+            if user is None:
+                try:
+                    uname, _, passwd = base64.b64decode(auth[1].encode()).decode('utf-8').partition(':')
+                except (binascii.Error, UnicodeDecodeError):
+                    return False
+                user = authenticate(username=uname, password=passwd)
+                if not (user and user.is_active):
+                    return False
+                _cache_user(key, user)
+            if settings.CSV_IN_BULK_AUTH_SESSIONS:
                 login(request, user)
-                request.user = user
-                return True
-    return False
\ No newline at end of file
+            request.user = user
+            return True
+    return False
@@ -0,0 +1,111 @@
+import functools
+import gzip
+import zlib
+
+
+# zstd is only offered when the optional zstandard package is installed
+GZIP, ZSTD = 'gzip', 'zstd'
+# the encoding a download is compressed with when the client accepts several equally
+PREFERENCE = (ZSTD, GZIP)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class UnsupportedEncodingError(ValueError):
+    """
+    An upload's Content-Encoding is not one of supported_encodings().
+    """
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+@functools.lru_cache(maxsize=None)
+def supported_encodings():
+    """
+    The content codings uploads can be sent and downloads can be compressed with.
+    """
+    return (GZIP, ZSTD) if _zstandard() else (GZIP,)
+
+
+def decompression_errors():
+    """
+    The exceptions meaning a compressed upload is corrupt or truncated.
+    """
+    zstandard = _zstandard()
+    return (gzip.BadGzipFile, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def decompressed_upload(request):
+    """
+    The upload of a request as a binary file-like object, decompressed on the fly as it is read when the request has a
+    Content-Encoding, so that the whole upload is never held compressed or decompressed.
+    """
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    if encoding in ('', 'identity'):
+        return request
+    if encoding not in supported_encodings():
+        raise UnsupportedEncodingError(f'Content-Encoding must be one of {", ".join(supported_encodings())}')
+    if encoding == GZIP:
+        return gzip.GzipFile(fileobj=request, mode='rb')
+    return _zstandard().ZstdDecompressor().stream_reader(request, read_across_frames=True)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The supported encoding an Accept-Encoding header gives the highest q-value to (PREFERENCE breaking ties), or None
+    to send the download uncompressed.
+    """
+    qvalues = {}
+    for coding in accept_encoding.split(','):
+        name, *parameters = coding.split(';')
+        qvalue = 1.0
+        for parameter in parameters:
+            key, _, value = parameter.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        if name.strip():
+            qvalues[name.strip().lower()] = qvalue
+    ranked = [(qvalues.get(encoding, qvalues.get('*', 0.0)), -PREFERENCE.index(encoding), encoding)
+              for encoding in supported_encodings()]
+    qvalue, _, encoding = max(ranked)
+    return encoding if qvalue > 0 else None
+
+
+def _compressor(encoding):
+    if encoding == GZIP:
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # a gzip member rather than zlib data
+    return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+def compressed(blocks, encoding, charset='utf-8'):
+    """
+    Compress a stream of text blocks as they come: each block is encoded and fed to one compressor, whose output is
+    yielded whenever it has some, so the whole file is never buffered.
+    """
+    compressor = _compressor(encoding)
+    for block in blocks:
+        data = compressor.compress(block.encode(charset))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def acompressed(blocks, encoding, charset='utf-8'):
+    """
+    compressed for an async iterable of text blocks, as an async generator.
+    """
+    compressor = _compressor(encoding)
+    async for block in blocks:
+        data = compressor.compress(block.encode(charset))
+        if data:
+            yield data
+    yield compressor.flush()
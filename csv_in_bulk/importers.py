@@ -0,0 +1,183 @@
+import codecs
+import io
+import math
+import shutil
+import tempfile
+from contextlib import ExitStack
+from lenders.models import Lender
+from lenders.validation import validate_lender_frame, MissingColumnsError
+from lenders.bulk import insert_lenders, update_lenders, BULK_BATCH_SIZE
+from lenders.parquet import read_lender_parquet, parquet_errors, parquet_available
+from csv_in_bulk.compression import decompression_errors
+from django.db import transaction
+from django.forms.models import model_to_dict
+
+
+LENDER_COLUMNS = ['name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active']
+# rows parsed, validated and committed at a time when importing an upload stream
+CSV_CHUNK_ROWS = 5000
+
+# how rows whose code is already stored are handled
+INSERT, UPSERT, SKIP_EXISTING = 'insert', 'upsert', 'skip_existing'
+IMPORT_MODES = (INSERT, UPSERT, SKIP_EXISTING)
+REPORT_KEYS = ('items_added', 'items_updated', 'items_unchanged', 'items_not_added')
+
+# the formats an upload can be sent in, parquet only when the optional pyarrow is installed
+CSV, PARQUET = 'csv', 'parquet'
+# the first bytes of every parquet file
+PARQUET_MAGIC = b'PAR1'
+
+
+# pandas (and numpy under it) is imported where a csv is first parsed rather than at module import, so that booting a
+# process that never handles a csv does not pay for it
+def parsing_errors():
+    """
+    The exceptions meaning an upload is not a readable lender csv (or, when compressed, not a readable compressed file).
+    """
+    import pandas as pd
+    return (UnicodeDecodeError, pd.errors.EmptyDataError, pd.errors.ParserError, MissingColumnsError,
+            *decompression_errors())
+
+
+def read_lender_csv(file_like, **kwargs):
+    """
+    Parse an uploaded csv keeping every cell as the raw string the user sent, so that values are converted and
+    validated exactly once by lenders.validation.validate_lender_frame (and empty cells are '' rather than NaN).
+    """
+    import pandas as pd
+    return pd.read_csv(file_like, dtype=str, keep_default_na=False, **kwargs)
+
+
+def _rejected_item(df, values, position):
+    """
+    The converted values of a rejected row, falling back to what was uploaded for cells that could not be converted.
+    """
+    item = {'id': None}
+    for column in LENDER_COLUMNS:
+        value = values[column][position]
+        item[column] = df[column].iat[position] if isinstance(value, float) and math.isnan(value) else value
+    return item
+
+
+def _changed_fields(lender, row):
+    return [column for column in LENDER_COLUMNS if getattr(lender, column) != row[column]]
+
+
+def import_lender_frame(df, mode=INSERT, batch_size=BULK_BATCH_SIZE):
+    """
+    Validate a DataFrame of lenders and write it in one transaction according to `mode`:
+        - INSERT: new codes are created, codes already stored are rejected;
+        - UPSERT: new codes are created, stored lenders that differ are updated;
+        - SKIP_EXISTING: new codes are created, stored lenders are left as they are.
+    New lenders are written with chunked bulk_create and changed ones with bulk_update of the changed columns only.
+
+    Returns a report dict with a list per REPORT_KEYS entry, each row of the frame landing in exactly one of them in
+    the same per-row format the csv_in_bulk endpoint always reported, in upload order.
+    """
+    if 'active' in df.columns and df['active'].dtype != bool:
+        # the csv convention of csv_in_bulk.helpers.convert_bool_string_to_bool, vectorised
+        df = df.assign(active=df['active'].astype(str).str.upper() == 'TRUE')
+    errors, values, existing = validate_lender_frame(df, reject_existing=mode == INSERT)
+    # the error dicts only hold plain message strings, so their repr is exactly str(ValidationError(errors))
+    not_added = {p: {'item': _rejected_item(df, values, p), 'exception': repr(e)} for p, e in errors.items()}
+
+    new_positions, updated, unchanged = [], {}, {}
+    for position in range(len(df)):
+        if position in errors:
+            continue
+        row = {column: values[column][position] for column in LENDER_COLUMNS}
+        lender = existing.get(row['code'])
+        if lender is None:
+            new_positions.append(position)
+            continue
+        changed = _changed_fields(lender, row) if mode == UPSERT else []
+        for column in changed:
+            setattr(lender, column, row[column])
+        (updated if changed else unchanged)[position] = lender
+    new_lenders = [Lender(**{column: values[column][p] for column in LENDER_COLUMNS}) for p in new_positions]
+
+    with transaction.atomic():
+        failed = insert_lenders(new_lenders, batch_size)
+        update_lenders(list(updated.values()), LENDER_COLUMNS, batch_size)
+    added = {}
+    for index, (position, lender) in enumerate(zip(new_positions, new_lenders)):
+        if index in failed:
+            not_added[position] = {'item': model_to_dict(lender), 'exception': failed[index]}
+        else:
+            added[position] = lender
+
+    return {
+        'items_added': [{'item': model_to_dict(added[p]), 'exception': None} for p in sorted(added)],
+        'items_updated': [{'item': model_to_dict(updated[p]), 'exception': None} for p in sorted(updated)],
+        'items_unchanged': [{'item': model_to_dict(unchanged[p]), 'exception': None} for p in sorted(unchanged)],
+        'items_not_added': [not_added[p] for p in sorted(not_added)],
+    }
+
+
+def import_lender_stream(stream, mode=INSERT, chunk_rows=CSV_CHUNK_ROWS, encoding='utf-8'):
+    """
+    Import a csv from a binary file-like object (e.g. the request) without ever holding the whole upload.
+
+    The stream is decoded incrementally and parsed `chunk_rows` rows at a time, each chunk being validated and
+    committed before the next one is read, so memory is bounded by the chunk size rather than the file size.
+    Yields the import_lender_frame report of every chunk.
+    """
+    for df in read_lender_csv(codecs.getreader(encoding)(stream), chunksize=chunk_rows):
+        yield import_lender_frame(df, mode)
+
+
+def upload_formats():
+    """
+    The formats lenders can be uploaded and downloaded in here.
+    """
+    return (CSV, PARQUET) if parquet_available() else (CSV,)
+
+
+def import_lender_parquet(file, mode=INSERT, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Import a parquet file one record batch of `chunk_rows` rows at a time, like import_lender_stream does a csv.
+    Its columns are typed, so rates and booleans are taken as they are rather than parsed from text.
+    """
+    for df in read_lender_parquet(file, chunk_rows):
+        yield import_lender_frame(df, mode)
+
+
+def is_parquet(file):
+    """
+    Whether a seekable binary file is a parquet file, judging by its first bytes.
+    """
+    start = file.read(len(PARQUET_MAGIC))
+    file.seek(0)
+    return start == PARQUET_MAGIC
+
+
+def import_upload(stream, mode=INSERT, on_chunk=None, upload_format=CSV):
+    """
+    Import a whole csv (or parquet) upload stream and return the json report the csv_in_bulk endpoint responds with.
+    `on_chunk`, if given, is called with the report of every chunk as soon as that chunk is committed.
+
+    A parquet file is described by its footer, so unless the stream already is a file on disk it is spooled to a
+    temporary file first.
+    """
+    csv_parsing_errors, report = [], {key: [] for key in REPORT_KEYS}
+    errors = parsing_errors()
+    try:
+        with ExitStack() as stack:
+            if upload_format == PARQUET:
+                errors += parquet_errors()
+                if not isinstance(stream, io.BufferedReader):
+                    spooled = stack.enter_context(tempfile.TemporaryFile())
+                    shutil.copyfileobj(stream, spooled)
+                    spooled.seek(0)
+                    stream = spooled
+                chunk_reports = import_lender_parquet(stream, mode)
+            else:
+                chunk_reports = import_lender_stream(stream, mode)
+            for chunk_report in chunk_reports:
+                for key in REPORT_KEYS:
+                    report[key].extend(chunk_report[key])
+                if on_chunk:
+                    on_chunk(chunk_report)
+    except errors as e:  # handles issues with the csv (or parquet) file
+        csv_parsing_errors.append({'exception': str(e)})
+    return {'csv_parsing_errors': csv_parsing_errors, **report}
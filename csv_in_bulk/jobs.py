@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from csv_in_bulk.importers import import_upload, is_parquet, REPORT_KEYS, CSV, PARQUET
+from csv_in_bulk.models import BulkUploadJob
+
+
+def spool_directory():
+    """
+    Where uploads wait for a worker; it must be shared by the web processes and the workers.
+    """
+    directory = getattr(settings, 'CSV_IN_BULK_SPOOL_DIR', None) or os.path.join(tempfile.gettempdir(),
+                                                                                  'csv_in_bulk_spool')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def enqueue_upload(stream, owner, mode, upload_format=CSV):
+    """
+    Copy an upload stream to the spool directory chunk by chunk and queue a job to import it. The spooled file is
+    named after its format (.csv or .parquet), which the worker imports it as.
+    """
+    upload_path = os.path.join(spool_directory(), f'{uuid.uuid4()}.{upload_format}')
+    with open(upload_path, 'wb') as spooled:
+        shutil.copyfileobj(stream, spooled)
+    return BulkUploadJob.objects.create(owner=owner, mode=mode, upload_path=upload_path)
+
+
+class JobLostError(Exception):
+    """
+    The job a worker is importing was failed meanwhile, its heartbeat having gone stale, so the worker stops.
+    """
+
+
+def fail_stale_jobs():
+    """
+    Fail the running jobs whose heartbeat is older than CSV_IN_BULK_JOB_LEASE_SECONDS, their worker having died
+    mid-import, and remove their spooled upload. The rows of the chunks they committed are kept. Returns how many
+    jobs were failed.
+    The UPDATE is conditional on the heartbeat read, so a job whose worker just renewed it is left running.
+    """
+    now = timezone.now()
+    failed = 0
+    stale = BulkUploadJob.objects.filter(status=BulkUploadJob.RUNNING,
+                                         heartbeat__lt=now - timedelta(seconds=settings.CSV_IN_BULK_JOB_LEASE_SECONDS))
+    for job in stale.only('id', 'heartbeat', 'rows_processed', 'upload_path'):
+        report = {'csv_parsing_errors': [], **{key: [] for key in REPORT_KEYS},
+                  'exception': f'the worker importing the upload stopped after {job.rows_processed} rows, whose '
+                               f'committed chunks are kept'}
+        if BulkUploadJob.objects.filter(pk=job.pk, status=BulkUploadJob.RUNNING, heartbeat=job.heartbeat).update(
+                status=BulkUploadJob.FAILED, finished=now, report=report):
+            failed += 1
+            if os.path.exists(job.upload_path):
+                os.remove(job.upload_path)
+    return failed
+
+
+def claim_next_job():
+    """
+    Fail the stale running jobs, then atomically move the oldest queued job to running and return it, or None when
+    the queue is empty.
+    The conditional UPDATE means two workers can never claim the same job, on any database backend.
+    """
+    fail_stale_jobs()
+    for job in BulkUploadJob.objects.filter(status=BulkUploadJob.QUEUED).only('id')[:10]:
+        now = timezone.now()
+        if BulkUploadJob.objects.filter(pk=job.pk, status=BulkUploadJob.QUEUED).update(
+                status=BulkUploadJob.RUNNING, started=now, heartbeat=now):
+            return BulkUploadJob.objects.get(pk=job.pk)
+    return None
+
+
+def run_job(job):
+    """
+    Import a claimed job's spooled upload, publishing the progress counters and renewing the heartbeat after every
+    committed chunk. A job failed meanwhile as stale (see fail_stale_jobs) is given up and returned as it is stored.
+    """
+    def record_progress(chunk_report):
+        for key in REPORT_KEYS:
+            setattr(job, key, getattr(job, key) + len(chunk_report[key]))
+        job.rows_processed = sum(getattr(job, key) for key in REPORT_KEYS)
+        job.heartbeat = timezone.now()
+        if not BulkUploadJob.objects.filter(pk=job.pk, status=BulkUploadJob.RUNNING).update(
+                heartbeat=job.heartbeat, rows_processed=job.rows_processed,
+                **{key: getattr(job, key) for key in REPORT_KEYS}):
+            raise JobLostError(job.pk)
+
+    try:
+        with open(job.upload_path, 'rb') as upload:
+            # a parquet upload spooled before the format was part of the file name is named .csv, and told apart by
+            # its first bytes
+            upload_format = PARQUET if job.upload_path.endswith(f'.{PARQUET}') or is_parquet(upload) else CSV
+            job.report = import_upload(upload, job.mode, on_chunk=record_progress, upload_format=upload_format)
+    except JobLostError:
+        return BulkUploadJob.objects.get(pk=job.pk)
+    except Exception as e:  # a job must never be left running, whatever went wrong
+        job.report = {'csv_parsing_errors': [], **{key: [] for key in REPORT_KEYS}, 'exception': str(e)}
+        job.status = BulkUploadJob.FAILED
+    else:
+        job.status = BulkUploadJob.FAILED if job.report['csv_parsing_errors'] else BulkUploadJob.SUCCEEDED
+    finally:
+        if os.path.exists(job.upload_path):
+            os.remove(job.upload_path)
+    job.finished = timezone.now()
+    if not BulkUploadJob.objects.filter(pk=job.pk, status=BulkUploadJob.RUNNING).update(
+            status=job.status, finished=job.finished, report=job.report):
+        return BulkUploadJob.objects.get(pk=job.pk)
+    return job
+
+
+def job_as_dict(job):
+    """
+    The json a client polls for.
+    """
+    return {
+        'id': str(job.id),
+        'url': reverse('bulk-upload-job', kwargs={'job_id': job.id}),
+        'status': job.status,
+        'mode': job.mode,
+        'created': job.created,
+        'started': job.started,
+        'finished': job.finished,
+        'rows_processed': job.rows_processed,
+        **{key: getattr(job, key) for key in REPORT_KEYS},
+        'report': job.report,
+    }
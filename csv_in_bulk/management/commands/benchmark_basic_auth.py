@@ -0,0 +1,41 @@
+import base64
+import uuid
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, timed
+from csv_in_bulk.authenticators import clear_verified_credentials
+
+
+CONFIGURATIONS = [
+    ('uncached, sessions', {'CSV_IN_BULK_AUTH_CACHE_TIMEOUT': 0, 'CSV_IN_BULK_AUTH_SESSIONS': True}),
+    ('cached, sessions', {'CSV_IN_BULK_AUTH_SESSIONS': True}),
+    ('cached, no sessions', {'CSV_IN_BULK_AUTH_SESSIONS': False}),
+]
+
+
+class Command(BaseCommand):
+    help = ('Requests/sec of a basic authenticated /csv-in-bulk/ request from a cookie-less scripted client, with and '
+            'without the credential cache and sessions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        credentials = base64.b64encode(b'benchmark:benchmark-password').decode()
+        # the cheapest authenticated request: the status of a job that does not exist
+        url = f'/csv-in-bulk/jobs/{uuid.uuid4()}/'
+        with isolated_database():
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            for label, overrides in CONFIGURATIONS:
+                clear_verified_credentials()
+                Session.objects.all().delete()
+                with override_settings(ALLOWED_HOSTS=['testserver'], **overrides):
+                    def send_requests():
+                        for _ in range(options['requests']):
+                            # a new client per request: scripted clients do not send the session cookie back
+                            Client().get(url, HTTP_AUTHORIZATION=f'Basic {credentials}')
+                    seconds, _ = timed(send_requests)
+                self.stdout.write(f'{label:>20} {options["requests"] / seconds:8.1f} requests/s '
+                                  f'sessions created={Session.objects.count()}')
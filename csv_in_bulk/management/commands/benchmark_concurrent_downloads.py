@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from lenders.benchmarking import isolated_database, seed_lenders
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'benchmark:benchmark-password').decode()
+
+
+class PeakThreads:
+    """
+    Sample threading.active_count() in the background while the block runs.
+    """
+    def __enter__(self):
+        self.peak, self.running = threading.active_count(), True
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        return self
+
+    def sample(self):
+        while self.running:
+            self.peak = max(self.peak, threading.active_count() - 1)
+            time.sleep(0.001)
+
+    def __exit__(self, *exc_info):
+        self.running = False
+        self.sampler.join()
+
+
+def wsgi_downloads(clients, threads, client_rate):
+    """
+    A threaded WSGI server (gunicorn --threads, mod_wsgi, ...): each download holds one of `threads` threads until the
+    client has read all of it.
+    """
+    handler = WSGIHandler()
+
+    def download():
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/csv-in-bulk/', 'SERVER_NAME': 'testserver',
+                   'SERVER_PORT': '80', 'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': CREDENTIALS,
+                   'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http'}
+        response = handler(environ, lambda status, headers: None)
+        size = 0
+        for block in response:
+            size += len(block)
+            time.sleep(len(block) / client_rate)
+        response.close()
+        return size
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda _: download(), range(clients)))
+
+
+def asgi_downloads(clients, client_rate):
+    """
+    An ASGI server (uvicorn, daphne, ...): every download is a task on one event loop.
+    """
+    handler = ASGIHandler()
+
+    async def download():
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': '/csv-in-bulk/', 'raw_path': b'/csv-in-bulk/', 'query_string': b'',
+                 'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+                 'headers': [(b'host', b'testserver'), (b'authorization', CREDENTIALS.encode())]}
+        request_sent, size = False, 0
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                await asyncio.Event().wait()  # the client never disconnects
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            nonlocal size
+            if message['type'] == 'http.response.body' and message.get('body'):
+                size += len(message['body'])
+                await asyncio.sleep(len(message['body']) / client_rate)
+
+        await handler(scope, receive, send)
+        return size
+
+    async def download_concurrently():
+        return await asyncio.gather(*(download() for _ in range(clients)))
+
+    return asyncio.run(download_concurrently())
+
+
+class Command(BaseCommand):
+    help = ('Load test of concurrent /csv-in-bulk/ downloads by slow clients, served in process the way a threaded WSGI '
+            'server and an ASGI server would: wall time, downloads/sec and peak threads.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=5000)
+        parser.add_argument('--clients', type=int, nargs='+', default=[8, 32, 128])
+        parser.add_argument('--threads', type=int, default=8, help='worker threads of the WSGI server')
+        parser.add_argument('--client-rate', type=int, default=256 * 1024, help='bytes/sec a client reads at')
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], CSV_IN_BULK_AUTH_SESSIONS=False):
+            seed_lenders(options['lenders'])
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            wsgi_downloads(1, 1, float('inf'))  # verify the password once, the credential cache does the rest
+            for clients in options['clients']:
+                for label, run in (
+                        (f'wsgi ({options["threads"]} threads)',
+                         lambda: wsgi_downloads(clients, options['threads'], options['client_rate'])),
+                        ('asgi', lambda: asgi_downloads(clients, options['client_rate']))):
+                    with PeakThreads() as threads:
+                        start = time.perf_counter()
+                        sizes = run()
+                        seconds = time.perf_counter() - start
+                    assert len(set(sizes)) == 1, 'every client must receive the whole file'
+                    self.stdout.write(f'{label:>17} clients={clients:>4} {seconds:7.2f}s '
+                                      f'{clients / seconds:7.1f} downloads/s peak threads={threads.peak}')
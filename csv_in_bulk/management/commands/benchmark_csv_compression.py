@@ -0,0 +1,58 @@
+import base64
+import gzip
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, clear_lenders, seed_lenders, lender_csv, timed, MAX_LENDER_CODES
+from csv_in_bulk import compression
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'benchmark:benchmark-password').decode()
+
+
+def compress(data, encoding):
+    if encoding is None:
+        return data
+    if encoding == compression.GZIP:
+        return gzip.compress(data, compression.GZIP_LEVEL)
+    return compression._zstandard().ZstdCompressor(level=compression.ZSTD_LEVEL).compress(data)
+
+
+class Command(BaseCommand):
+    help = ('Bytes on the wire and seconds of whole /csv-in-bulk/ downloads and uploads sent uncompressed and with '
+            'every supported Content-Encoding (zstd only when zstandard is installed).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, nargs='+', default=[1000, 10000, MAX_LENDER_CODES])
+
+    def write(self, label, encoding, lenders, size, raw_size, seconds):
+        self.stdout.write(f'{label:<8} {encoding or "identity":<8} lenders={lenders:>6} {size / 2 ** 20:8.3f}MiB '
+                          f'ratio={raw_size / size:5.1f}:1 {seconds:7.3f}s {raw_size / 2 ** 20 / seconds:7.1f}MiB/s '
+                          f'(uncompressed)')
+
+    def handle(self, *args, **options):
+        encodings = (None, *compression.supported_encodings())
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], CSV_IN_BULK_AUTH_SESSIONS=False):
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            client = Client(HTTP_AUTHORIZATION=CREDENTIALS)
+            client.get('/csv-in-bulk/')  # warm up: the credential cache and the first imports
+            for lenders in options['lenders']:
+                seed_lenders(lenders)
+                raw_size = None
+                for encoding in encodings:
+                    def download():
+                        response = client.get('/csv-in-bulk/', HTTP_ACCEPT_ENCODING=encoding or 'identity')
+                        return sum(len(block) for block in response.streaming_content)
+                    seconds, size = timed(download)
+                    raw_size = raw_size or size
+                    self.write('download', encoding, lenders, size, raw_size, seconds)
+
+                upload = lender_csv(lenders).encode()
+                for encoding in encodings:
+                    clear_lenders()
+                    body = compress(upload, encoding)
+                    seconds, response = timed(client.post, '/csv-in-bulk/', data=body, content_type='text/csv',
+                                              HTTP_CONTENT_ENCODING=encoding or 'identity')
+                    if response.status_code != 200:
+                        self.stderr.write(f'upload {encoding}: {response.status_code}')
+                    self.write('upload', encoding, lenders, len(body), len(upload), seconds)
@@ -0,0 +1,53 @@
+import csv
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.forms.models import model_to_dict
+from lenders.benchmarking import isolated_database, seed_lenders, timed, MAX_LENDER_CODES
+from lenders.models import Lender
+from lenders.renderers import csv_blocks
+from csv_in_bulk.views import DOWNLOAD_HEADER, DOWNLOAD_CHUNK_ROWS
+
+
+class PseudoBuffer:
+    def write(self, value):
+        return value
+
+
+def download_row_by_row():
+    """
+    The original download: the whole queryset cached, model_to_dict and one writerow per lender.
+    """
+    csv_writer = csv.writer(PseudoBuffer())
+    header = list(model_to_dict(Lender.objects.first()))
+    yield csv_writer.writerow(header)
+    for lender in (model_to_dict(x) for x in Lender.objects.all()):
+        yield csv_writer.writerow([lender[field] for field in header])
+
+
+def download_in_blocks():
+    return csv_blocks(DOWNLOAD_HEADER, Lender.objects.iter_values_list(*DOWNLOAD_HEADER, chunk_size=DOWNLOAD_CHUNK_ROWS),
+                      DOWNLOAD_CHUNK_ROWS)
+
+
+def consume(blocks):
+    return sum(len(block) for block in blocks)
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec and peak traced memory of the csv download before and after batching.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, nargs='+', default=[1000, 10000, MAX_LENDER_CODES])
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            for lenders in options['lenders']:
+                seed_lenders(lenders)
+                for label, download in (('row-by-row', download_row_by_row), ('blocks', download_in_blocks)):
+                    seconds, _ = timed(consume, download())
+                    tracemalloc.start()
+                    consume(download())
+                    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    tracemalloc.stop()
+                    self.stdout.write(f'{label:>10} lenders={lenders:>6} {seconds:7.3f}s '
+                                      f'{lenders / seconds:9.0f} rows/s peak={peak:7.1f}MiB')
@@ -0,0 +1,67 @@
+from functools import partial
+from io import StringIO
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.utils import IntegrityError
+from django.forms.models import model_to_dict
+from lenders.benchmarking import isolated_database, clear_lenders, lender_csv, timed, MAX_LENDER_CODES
+from lenders.models import Lender
+from csv_in_bulk.helpers import convert_bool_string_to_bool
+from csv_in_bulk.importers import read_lender_csv, import_lender_frame, INSERT, UPSERT, SKIP_EXISTING
+
+
+def import_row_by_row(csv_text):
+    """
+    The original csv_in_bulk import loop (one full_clean() and one INSERT per row), kept as the baseline.
+    """
+    items_not_added, items_added = [], []
+    for _, row in pd.read_csv(StringIO(csv_text)).iterrows():
+        new_lender = Lender(name=str(row['name']),
+                            code=str(row['code']),
+                            upfront_commission_rate=float(row['upfront_commission_rate']),
+                            trial_commission_rate=float(row['trial_commission_rate']),
+                            active=convert_bool_string_to_bool(row['active']))
+        try:
+            new_lender.full_clean()
+            new_lender.save()
+        except (IntegrityError, ValidationError) as e:
+            items_not_added.append({'item': model_to_dict(new_lender), 'exception': str(e)})
+        else:
+            items_added.append({'item': model_to_dict(new_lender), 'exception': None})
+    return {'items_added': items_added, 'items_not_added': items_not_added}
+
+
+def import_in_bulk(csv_text, mode=INSERT):
+    return import_lender_frame(read_lender_csv(StringIO(csv_text)), mode)
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the row-by-row and the bulk csv import on a throwaway test database, '
+            'for a first upload and for re-uploading the same file in every import mode.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, MAX_LENDER_CODES])
+        parser.add_argument('--invalid-every', type=int, default=20,
+                            help='every n-th row is rejected by validation (0 for none)')
+
+    def measure(self, label, rows, importer, csv_text):
+        queries = []
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            seconds, report = timed(importer, csv_text)
+        counts = ' '.join(f'{key[6:]}={len(report.get(key, [])):>5}' for key in
+                          ('items_added', 'items_updated', 'items_unchanged', 'items_not_added'))
+        self.stdout.write(f'{label:>24} rows={rows:>6} {counts} queries={len(queries):>6} '
+                          f'{seconds:8.3f}s {rows / seconds:10.0f} rows/s')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            for rows in options['rows']:
+                csv_text = lender_csv(rows, options['invalid_every'])
+                for label, importer in (('row-by-row', import_row_by_row), ('bulk', import_in_bulk)):
+                    clear_lenders()
+                    self.measure(label, rows, importer, csv_text)
+                self.measure('re-upload row-by-row', rows, import_row_by_row, csv_text)
+                for mode in (INSERT, UPSERT, SKIP_EXISTING):
+                    self.measure(f're-upload bulk {mode}', rows, partial(import_in_bulk, mode=mode), csv_text)
@@ -0,0 +1,48 @@
+import tempfile
+import tracemalloc
+from io import StringIO
+from django.core.management.base import BaseCommand
+from lenders.benchmarking import isolated_database, clear_lenders, lender_csv_lines, timed
+from csv_in_bulk.importers import read_lender_csv, import_lender_frame, import_lender_stream, CSV_CHUNK_ROWS
+
+
+def import_whole_upload(upload, chunk_rows):
+    """
+    The previous upload handling: the whole body as bytes, then as str, then as one DataFrame.
+    """
+    report = import_lender_frame(read_lender_csv(StringIO(upload.read().decode(encoding='utf-8'))))
+    return len(report['items_added']), len(report['items_not_added'])
+
+
+def import_streamed_upload(upload, chunk_rows):
+    added = not_added = 0
+    for report in import_lender_stream(upload, chunk_rows=chunk_rows):
+        added, not_added = added + len(report['items_added']), not_added + len(report['items_not_added'])
+    return added, not_added
+
+
+class Command(BaseCommand):
+    help = ('Compare the peak traced memory of importing a csv upload read whole versus streamed in chunks. '
+            'Only counts of the per-row report are kept so the figures show the parsing and persisting working set.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[20000, 100000, 400000])
+        parser.add_argument('--chunk-rows', type=int, default=CSV_CHUNK_ROWS)
+
+    def handle(self, *args, **options):
+        with isolated_database(), tempfile.TemporaryFile() as upload:
+            for rows in options['rows']:
+                upload.seek(0)
+                upload.truncate()
+                for line in lender_csv_lines(rows):
+                    upload.write(line.encode('utf-8'))
+                size_mb = upload.tell() / 2 ** 20
+                for label, importer in (('whole', import_whole_upload), ('streamed', import_streamed_upload)):
+                    clear_lenders()
+                    upload.seek(0)
+                    tracemalloc.start()
+                    seconds, (added, not_added) = timed(importer, upload, options['chunk_rows'])
+                    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    tracemalloc.stop()
+                    self.stdout.write(f'{label:>8} rows={rows:>7} file={size_mb:7.1f}MiB added={added:>6} '
+                                      f'rejected={not_added:>7} peak={peak:8.1f}MiB {seconds:7.2f}s')
@@ -0,0 +1,55 @@
+import base64
+from io import BytesIO
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, clear_lenders, seed_lenders, lender_csv, timed, MAX_LENDER_CODES
+from lenders.parquet import parquet_available, PARQUET_MEDIA_TYPE
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'benchmark:benchmark-password').decode()
+
+
+def parquet_upload(csv):
+    """
+    The lenders of a csv upload as a parquet file, typed as the download writes them.
+    """
+    import pandas as pd
+    return pd.read_csv(BytesIO(csv)).to_parquet(index=False)
+
+
+class Command(BaseCommand):
+    help = ('Bytes and seconds of whole /csv-in-bulk/ downloads and uploads and /lenders/export/ responses as csv '
+            '(or json) against parquet (needs pyarrow).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, nargs='+', default=[1000, 10000, MAX_LENDER_CODES])
+
+    def write(self, label, lenders, size, seconds):
+        self.stdout.write(f'{label:<34} lenders={lenders:>6} {size / 2 ** 20:8.3f}MiB {seconds:7.3f}s '
+                          f'{lenders / seconds:9.0f} lenders/s')
+
+    def handle(self, *args, **options):
+        if not parquet_available():
+            raise CommandError('pyarrow is not installed')
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], CSV_IN_BULK_AUTH_SESSIONS=False):
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            client = Client(HTTP_AUTHORIZATION=CREDENTIALS)
+            client.get('/csv-in-bulk/?format=parquet')  # warm up: the credential cache and the first imports
+            for lenders in options['lenders']:
+                seed_lenders(lenders)
+                for url in ('/csv-in-bulk/', '/csv-in-bulk/?format=parquet', '/lenders/export/',
+                            '/lenders/export/?format=parquet'):
+                    def download():
+                        return sum(len(block) for block in client.get(url).streaming_content)
+                    seconds, size = timed(download)
+                    self.write(f'GET {url[1:]}', lenders, size, seconds)
+
+                csv = lender_csv(lenders).encode()
+                for label, body, content_type in (('POST csv', csv, 'text/csv'),
+                                                  ('POST parquet', parquet_upload(csv), PARQUET_MEDIA_TYPE)):
+                    clear_lenders()
+                    seconds, response = timed(client.post, '/csv-in-bulk/', data=body, content_type=content_type)
+                    if response.status_code != 200:
+                        self.stderr.write(f'{label}: {response.status_code}')
+                    self.write(label, lenders, len(body), seconds)
@@ -0,0 +1,37 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from csv_in_bulk.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Import the csv uploads queued with POST /csv-in-bulk/?async=true.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='jobs imported concurrently')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='exit once the queue is empty')
+
+    def work(self, once, poll_interval):
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                job = run_job(job)
+                self.stdout.write(f'{job.id} {job.status}: {job.rows_processed} rows, {job.items_added} added, '
+                                  f'{job.items_updated} updated, {job.items_unchanged} unchanged, '
+                                  f'{job.items_not_added} not added')
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for worker in [pool.submit(self.work, options['once'], options['poll_interval'])
+                           for _ in range(options['workers'])]:
+                worker.result()
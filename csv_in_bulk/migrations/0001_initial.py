@@ -0,0 +1,40 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkUploadJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('mode', models.CharField(max_length=16)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16)),
+                ('upload_path', models.CharField(max_length=1024)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('items_added', models.PositiveIntegerField(default=0)),
+                ('items_updated', models.PositiveIntegerField(default=0)),
+                ('items_unchanged', models.PositiveIntegerField(default=0)),
+                ('items_not_added', models.PositiveIntegerField(default=0)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+    ]
@@ -1,3 +1,36 @@
+import uuid
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class BulkUploadJob(models.Model):
+    """
+    A csv upload spooled to disk to be imported in the background by `manage.py process_bulk_upload_jobs`.
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # renewed by the worker on claiming the job and after every committed chunk; a running job whose heartbeat is
+    # older than CSV_IN_BULK_JOB_LEASE_SECONDS lost its worker
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    mode = models.CharField(max_length=16)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    upload_path = models.CharField(max_length=1024)
+
+    # progress counters, updated after every committed chunk
+    rows_processed = models.PositiveIntegerField(default=0)
+    items_added = models.PositiveIntegerField(default=0)
+    items_updated = models.PositiveIntegerField(default=0)
+    items_unchanged = models.PositiveIntegerField(default=0)
+    items_not_added = models.PositiveIntegerField(default=0)
+
+    # the same json the synchronous upload responds with, once the job is finished
+    report = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created']
@@ -1,3 +1,507 @@
-from django.test import TestCase
+import base64
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from io import BytesIO
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from lenders.models import Lender
+from lenders.benchmarking import lender_csv_lines
+from csv_in_bulk import authenticators, compression
+from csv_in_bulk.importers import import_lender_stream, CSV_CHUNK_ROWS
+from csv_in_bulk.jobs import claim_next_job, run_job
+from lenders.renderers import csv_blocks, acsv_blocks
+from lenders.parquet import parquet_available, parquet_table_bytes, read_parquet_rows, PARQUET_MEDIA_TYPE
+from csv_in_bulk.models import BulkUploadJob
+from csv_in_bulk.views import DOWNLOAD_HEADER
+from rest_framework import status
 
-# Create your tests here.
+
+class CSVInBulkUploadTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='uploader', password='uploader-password')
+        credentials = base64.b64encode(b'uploader:uploader-password').decode()
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Basic {credentials}'}
+        Lender.objects.create(name='Commonwealth Bank',
+                              code='CBA',
+                              upfront_commission_rate=12,
+                              trial_commission_rate=23,
+                              active=True)
+
+    def upload(self, csv):
+        return self.client.post('/csv-in-bulk/', data=csv.encode('utf-8'), content_type='text/csv',
+                                **self.auth_headers)
+
+    def test_valid_rows_are_added_with_their_ids(self):
+        response = self.upload('id,name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                               '1,csv_upload_test_A,CSA,100.0,200.0,True\n'
+                               '2,csv_upload_test_B,CSB,1.5,2,false\n')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items_added = [each['item'] for each in response.json()['items_added']]
+        self.assertEqual(items_added, [
+            {'id': Lender.objects.get(code='CSA').id, 'name': 'csv_upload_test_A', 'code': 'CSA',
+             'upfront_commission_rate': 100.0, 'trial_commission_rate': 200.0, 'active': True},
+            {'id': Lender.objects.get(code='CSB').id, 'name': 'csv_upload_test_B', 'code': 'CSB',
+             'upfront_commission_rate': 1.5, 'trial_commission_rate': 2.0, 'active': False},
+        ])
+        self.assertFalse(response.json()['items_not_added'])
+
+    def test_integer_rates_are_reported_as_the_row_by_row_import_did(self):
+        """
+        The report holds model_to_dict() of each lender as built by the row by row import, with float() rates.
+        """
+        response = self.upload('name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                               'Integer Bank,CSA,1,2,True\n'
+                               'Integer Bank,csb,3,4,True\n')
+        added = Lender(id=Lender.objects.get(code='CSA').id, name='Integer Bank', code='CSA',
+                       upfront_commission_rate=float('1'), trial_commission_rate=float('2'), active=True)
+        rejected = Lender(name='Integer Bank', code='csb', upfront_commission_rate=float('3'),
+                          trial_commission_rate=float('4'), active=True)
+        self.assertIn(b'"items_added": [{"item": ' + json.dumps(model_to_dict(added)).encode(), response.content)
+        self.assertIn(b'"items_not_added": [{"item": ' + json.dumps(model_to_dict(rejected)).encode(), response.content)
+
+    def test_rejected_rows_report_the_same_errors_as_full_clean(self):
+        rows = [('', 'CSC', '1', '2'), ('Blah', 'c1', '-1', '501'), ('Blah', 'CSDD', 'A', '2'),
+                ('Blah', 'CBA', '1', '2'), ('Blah', 'CSE', '', '600')]
+        response = self.upload('name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                               + ''.join(f'{",".join(row)},True\n' for row in rows))
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        for (name, code, upfront, trial), reported in zip(rows, response.json()['items_not_added']):
+            with self.assertRaises(ValidationError) as context:
+                Lender(name=name, code=code, upfront_commission_rate=upfront, trial_commission_rate=trial,
+                       active=True).full_clean()
+            self.assertEqual(reported['exception'], str(context.exception))
+            self.assertEqual(reported['item']['code'], code)
+        self.assertEqual(Lender.objects.count(), 1)
+
+    def test_only_the_first_valid_row_of_a_duplicated_code_is_added(self):
+        response = self.upload('name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                               'first,CSF,900,1,True\n'
+                               'second,CSF,1,1,True\n'
+                               'third,CSF,1,1,True\n')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([each['item']['name'] for each in response.json()['items_added']], ['second'])
+        first, third = response.json()['items_not_added']
+        self.assertNotIn('already exists', first['exception'])
+        self.assertIn('Lender with this Code already exists.', third['exception'])
+        self.assertEqual(Lender.objects.get(code='CSF').name, 'second')
+
+    def test_missing_columns_are_reported_as_a_parsing_error(self):
+        response = self.upload('name,code\nBlah,CSG\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('upfront_commission_rate', response.json()['csv_parsing_errors'][0]['exception'])
+        self.assertFalse(Lender.objects.filter(code='CSG').exists())
+
+    def test_empty_file_is_reported_as_a_parsing_error(self):
+        response = self.upload('')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('No columns to parse from file', response.json()['csv_parsing_errors'][0]['exception'])
+
+    def test_a_file_failing_to_parse_after_committed_chunks_is_a_partial_success(self):
+        lines = list(lender_csv_lines(CSV_CHUNK_ROWS + 1))
+        response = self.upload(''.join(lines[:-1]) + '0,"unterminated,CSX,1,1,True\n' + lines[-1])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        report = response.json()
+        self.assertEqual(len(report['csv_parsing_errors']), 1)
+        self.assertEqual(len(report['items_added']), CSV_CHUNK_ROWS - 1)  # CBA was already there
+        self.assertEqual(Lender.objects.count(), CSV_CHUNK_ROWS)
+
+    def test_stream_is_imported_chunk_by_chunk(self):
+        upload = BytesIO('name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                         'a,CSH,1,1,True\nb,CSI,1,1,True\nc,CSH,1,1,True\nd,CSJ,1,1,True\nd,CBA,1,1,True\n'
+                         .encode('utf-8'))
+        chunks = import_lender_stream(upload, chunk_rows=2)
+        report = next(chunks)
+        self.assertEqual([each['item']['code'] for each in report['items_added']], ['CSH', 'CSI'])
+        self.assertEqual(Lender.objects.filter(code__in=['CSH', 'CSI']).count(), 2)  # committed before reading on
+        remaining = list(chunks)
+        self.assertEqual([[each['item']['code'] for each in report['items_added']] for report in remaining],
+                         [['CSJ'], []])
+        self.assertEqual([len(report['items_not_added']) for report in remaining], [1, 1])
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.post('/csv-in-bulk/?mode=merge', data=b'', content_type='text/csv',
+                                    **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upsert_classifies_rows_as_created_updated_unchanged_or_rejected(self):
+        Lender.objects.create(name='Westpac', code='WBC', upfront_commission_rate=11, trial_commission_rate=13)
+        response = self.client.post('/csv-in-bulk/?mode=upsert',
+                                    data=b'name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                                         b'Commonwealth Bank,CBA,12,23,True\n'
+                                         b'Westpac Banking,WBC,11,14,True\n'
+                                         b'New Bank,NEW,1,1,False\n'
+                                         b'Bad Bank,BAD,-1,1,False\n',
+                                    content_type='text/csv', **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        codes = {key: [each['item']['code'] for each in response.json()[key]]
+                 for key in ('items_added', 'items_updated', 'items_unchanged', 'items_not_added')}
+        self.assertEqual(codes, {'items_added': ['NEW'], 'items_updated': ['WBC'], 'items_unchanged': ['CBA'],
+                                 'items_not_added': ['BAD']})
+        westpac = Lender.objects.get(code='WBC')
+        self.assertEqual((westpac.name, westpac.trial_commission_rate), ('Westpac Banking', 14))
+
+    def test_unchanged_re_upload_only_selects(self):
+        csv = b'name,code,upfront_commission_rate,trial_commission_rate,active\nCommonwealth Bank,CBA,12,23,True\n'
+        for mode in ('upsert', 'skip_existing'):
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                response = self.client.post(f'/csv-in-bulk/?mode={mode}', data=csv, content_type='text/csv',
+                                            **self.auth_headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['items_unchanged']), 1)
+            self.assertFalse([sql for sql in queries if 'lenders_lender' in sql and not sql.startswith('SELECT')])
+
+    def test_bulk_import_invalidates_the_cached_lender_responses(self):
+        self.assertEqual(self.client.get('/lenders/').json()['count'], 1)
+        self.upload('name,code,upfront_commission_rate,trial_commission_rate,active\nBlah,CSA,1,2,True\n')
+        self.assertEqual(self.client.get('/lenders/').json()['count'], 2)
+
+    def test_skip_existing_leaves_stored_lenders_untouched(self):
+        response = self.client.post('/csv-in-bulk/?mode=skip_existing',
+                                    data=b'name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                                         b'Renamed,CBA,1,1,False\n',
+                                    content_type='text/csv', **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['items_unchanged'][0]['item']['name'], 'Commonwealth Bank')
+        self.assertEqual(Lender.objects.get(code='CBA').name, 'Commonwealth Bank')
+
+
+class BulkUploadJobTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='uploader', password='uploader-password')
+        User.objects.create_user(username='someone', password='someone-password')
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Basic {base64.b64encode(b"uploader:uploader-password").decode()}'}
+        self.spool = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(CSV_IN_BULK_SPOOL_DIR=self.spool.name)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.spool.cleanup()
+
+    def test_async_upload_is_accepted_then_imported_by_a_worker(self):
+        response = self.client.post('/csv-in-bulk/?async=true&mode=upsert',
+                                    data=b'name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                                         b'Async Bank,ASY,1,2,True\nBad Bank,BAD,-1,2,True\n',
+                                    content_type='text/csv', **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Location'], response.json()['url'])
+        self.assertEqual(response.json()['status'], BulkUploadJob.QUEUED)
+        self.assertFalse(Lender.objects.filter(code='ASY').exists())
+        upload_path = BulkUploadJob.objects.get().upload_path
+        self.assertTrue(os.path.exists(upload_path))
+        self.assertTrue(upload_path.endswith('.csv'))
+
+        run_job(claim_next_job())
+        self.assertIsNone(claim_next_job())
+        self.assertFalse(os.path.exists(upload_path))
+        job = self.client.get(response['Location'], **self.auth_headers).json()
+        self.assertEqual((job['status'], job['mode'], job['rows_processed'], job['items_added'], job['items_not_added']),
+                         (BulkUploadJob.SUCCEEDED, 'upsert', 2, 1, 1))
+        self.assertEqual(job['report']['items_added'][0]['item']['code'], 'ASY')
+        self.assertTrue(Lender.objects.filter(code='ASY').exists())
+
+    def test_unparsable_upload_fails_the_job(self):
+        response = self.client.post('/csv-in-bulk/?async=true', data=b'', content_type='text/csv',
+                                    **self.auth_headers)
+        run_job(claim_next_job())
+        job = self.client.get(response['Location'], **self.auth_headers).json()
+        self.assertEqual(job['status'], BulkUploadJob.FAILED)
+        self.assertIn('No columns to parse from file', job['report']['csv_parsing_errors'][0]['exception'])
+
+    def test_a_job_whose_worker_died_is_failed_once_its_lease_expires(self):
+        location = self.client.post('/csv-in-bulk/?async=true', data=b'name,code,upfront_commission_rate,'
+                                    b'trial_commission_rate,active\nAsync Bank,ASY,1,2,True\n',
+                                    content_type='text/csv', **self.auth_headers)['Location']
+        job = claim_next_job()  # and the worker is killed before importing it
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(BulkUploadJob.objects.get().status, BulkUploadJob.RUNNING)  # within its lease
+
+        BulkUploadJob.objects.update(heartbeat=timezone.now() - datetime.timedelta(seconds=601))
+        self.assertIsNone(claim_next_job())
+        polled = self.client.get(location, **self.auth_headers).json()
+        self.assertEqual(polled['status'], BulkUploadJob.FAILED)
+        self.assertIn('stopped after 0 rows', polled['report']['exception'])
+        self.assertFalse(os.path.exists(job.upload_path))
+
+        # a worker that was only stalled gives the job up at its next chunk
+        with open(job.upload_path, 'wb') as upload:
+            upload.write(b'name,code,upfront_commission_rate,trial_commission_rate,active\nAsync Bank,ASY,1,2,True\n')
+        self.assertEqual(run_job(job).status, BulkUploadJob.FAILED)
+        self.assertIn('stopped after 0 rows', BulkUploadJob.objects.get().report['exception'])
+
+    def test_workers_renew_the_heartbeat_of_their_job(self):
+        self.client.post('/csv-in-bulk/?async=true', data=b'name,code,upfront_commission_rate,trial_commission_rate,'
+                         b'active\nAsync Bank,ASY,1,2,True\n', content_type='text/csv', **self.auth_headers)
+        job = claim_next_job()
+        BulkUploadJob.objects.update(heartbeat=timezone.now() - datetime.timedelta(seconds=601))
+        self.assertEqual(run_job(job).status, BulkUploadJob.SUCCEEDED)
+        self.assertGreater(BulkUploadJob.objects.get().heartbeat, timezone.now() - datetime.timedelta(seconds=60))
+
+    def test_jobs_are_only_visible_to_their_owner(self):
+        location = self.client.post('/csv-in-bulk/?async=true', data=b'', content_type='text/csv',
+                                    **self.auth_headers)['Location']
+        someone = {'HTTP_AUTHORIZATION': f'Basic {base64.b64encode(b"someone:someone-password").decode()}'}
+        self.assertEqual(self.client.get(location, **someone).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(location).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CSVInBulkDownloadTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='downloader', password='downloader-password')
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Basic {base64.b64encode(b"downloader:downloader-password").decode()}'}
+
+    def download(self):
+        response = self.client.get('/csv-in-bulk/', **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_empty_table_downloads_an_empty_file(self):
+        self.assertEqual(self.download(), '')
+
+    def test_download_has_a_header_and_a_row_per_lender(self):
+        cba = Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                                    trial_commission_rate=23.5, active=True)
+        svb = Lender.objects.create(name='Silicon Valley Bank, Inc', code='SVB', upfront_commission_rate=100,
+                                    trial_commission_rate=200, active=False)
+        self.assertEqual(self.download(),
+                         'id,name,code,upfront_commission_rate,trial_commission_rate,active\r\n'
+                         f'{cba.id},Commonwealth Bank,CBA,12.0,23.5,True\r\n'
+                         f'{svb.id},"Silicon Valley Bank, Inc",SVB,100.0,200.0,False\r\n')
+
+    async def test_asgi_download_is_an_async_stream_of_the_same_csv(self):
+        await Lender.objects.acreate(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                                     trial_commission_rate=23.5, active=True)
+        await Lender.objects.acreate(name='Westpac', code='WBC', upfront_commission_rate=1,
+                                     trial_commission_rate=2, active=False)
+        expected = await sync_to_async(self.download)()
+        with mock.patch('csv_in_bulk.views.DOWNLOAD_CHUNK_ROWS', 1):
+            response = await self.async_client.get('/csv-in-bulk/',
+                                                   headers={'Authorization': self.auth_headers['HTTP_AUTHORIZATION']})
+            self.assertTrue(response.is_async)
+            blocks = [block async for block in response.streaming_content]
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(b''.join(blocks).decode('utf-8'), expected)
+
+    def test_rows_are_written_in_blocks(self):
+        blocks = list(csv_blocks(['a', 'b'], ([i, i * 2] for i in range(5)), rows_per_block=2))
+        self.assertEqual(blocks, ['a,b\r\n0,0\r\n1,2\r\n', '2,4\r\n3,6\r\n', '4,8\r\n'])
+
+    async def test_async_rows_are_written_in_the_same_blocks(self):
+        async def rows():
+            for i in range(5):
+                yield [i, i * 2]
+        self.assertEqual([block async for block in acsv_blocks(['a', 'b'], rows(), rows_per_block=2)],
+                         list(csv_blocks(['a', 'b'], ([i, i * 2] for i in range(5)), rows_per_block=2)))
+        self.assertEqual([block async for block in acsv_blocks(['a', 'b'], rows(), rows_per_block=5)],
+                         ['a,b\r\n0,0\r\n1,2\r\n2,4\r\n3,6\r\n4,8\r\n'])
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='uploader', password='uploader-password')
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Basic {base64.b64encode(b"uploader:uploader-password").decode()}'}
+        self.csv = ('name,code,upfront_commission_rate,trial_commission_rate,active\n'
+                    + ''.join(f'Lender {code},{code},1,2,True\n' for code in ('ABC', 'DEF', 'GHI'))).encode()
+
+    def upload(self, data, encoding, url='/csv-in-bulk/'):
+        return self.client.post(url, data=data, content_type='text/csv', HTTP_CONTENT_ENCODING=encoding,
+                                **self.auth_headers)
+
+    def download(self, accept_encoding):
+        response = self.client.get('/csv-in-bulk/', HTTP_ACCEPT_ENCODING=accept_encoding, **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        return response.get('Content-Encoding'), b''.join(response.streaming_content)
+
+    def test_gzip_upload_is_decompressed(self):
+        response = self.upload(gzip.compress(self.csv), 'gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['items_added']), 3)
+
+    def test_gzip_upload_to_a_job_is_spooled_decompressed(self):
+        with tempfile.TemporaryDirectory() as spool, override_settings(CSV_IN_BULK_SPOOL_DIR=spool):
+            response = self.upload(gzip.compress(self.csv), 'GZip', url='/csv-in-bulk/?async=true')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(run_job(claim_next_job()).status, BulkUploadJob.SUCCEEDED)
+        self.assertEqual(Lender.objects.count(), 3)
+
+    def test_corrupt_and_unsupported_uploads(self):
+        response = self.upload(gzip.compress(self.csv)[:-20], 'gzip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.json()['csv_parsing_errors']), 1)
+        response = self.upload(b'not gzip', 'gzip')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload(self.csv, 'br')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertIn('gzip', response['Accept-Encoding'])
+        self.assertEqual(Lender.objects.count(), 0)
+
+    @skipUnless(compression._zstandard(), 'zstandard is not installed')
+    def test_zstd_upload_and_download(self):
+        zstandard = compression._zstandard()
+        response = self.upload(zstandard.ZstdCompressor().compress(self.csv), 'zstd')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        encoding, content = self.download('gzip, zstd')
+        self.assertEqual(encoding, 'zstd')
+        self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(content), self.download('')[1])
+
+    def test_download_is_compressed_when_accepted(self):
+        self.upload(self.csv, '')
+        identity_encoding, plain = self.download('')
+        self.assertIsNone(identity_encoding)
+        with mock.patch('csv_in_bulk.views.DOWNLOAD_CHUNK_ROWS', 1):
+            encoding, content = self.download('deflate, gzip;q=0.8')
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(content), plain)
+        self.assertEqual(self.download('gzip;q=0')[0], None)
+
+    async def test_asgi_download_is_compressed_as_a_stream(self):
+        await sync_to_async(self.upload)(self.csv, '')
+        plain = await sync_to_async(self.download)('')
+        response = await self.async_client.get('/csv-in-bulk/', headers={
+            'Authorization': self.auth_headers['HTTP_AUTHORIZATION'], 'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join([block async for block in response.streaming_content])), plain[1])
+
+    def test_encoding_negotiation(self):
+        zstd = 'zstd' if compression._zstandard() else None
+        for accept_encoding, expected in [('', None), ('identity', None), ('gzip', 'gzip'), ('GZIP;q=0.5', 'gzip'),
+                                          ('*', zstd or 'gzip'), ('gzip, zstd', zstd or 'gzip'), ('*;q=0', None),
+                                          ('gzip;q=0, *', zstd), ('br, deflate', None), ('gzip;q=bad', None)]:
+            self.assertEqual(compression.negotiate_encoding(accept_encoding), expected, accept_encoding)
+
+
+@skipUnless(parquet_available(), 'pyarrow is not installed')
+class ParquetTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='uploader', password='uploader-password')
+        self.auth_headers = {'HTTP_AUTHORIZATION': f'Basic {base64.b64encode(b"uploader:uploader-password").decode()}'}
+        self.rows = [{'name': 'Parquet Bank', 'code': 'PQB', 'upfront_commission_rate': 1.5,
+                      'trial_commission_rate': 2.0, 'active': True},
+                     {'name': 'Bad Bank', 'code': 'PQC', 'upfront_commission_rate': -1.0,
+                      'trial_commission_rate': 2.0, 'active': False}]
+
+    def upload(self, data, url='/csv-in-bulk/'):
+        return self.client.post(url, data=data, content_type=PARQUET_MEDIA_TYPE, **self.auth_headers)
+
+    def test_parquet_upload_is_imported_from_its_typed_columns(self):
+        response = self.upload(parquet_table_bytes(self.rows))
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        added = response.json()['items_added']
+        self.assertEqual([each['item'] for each in added],
+                         [{'id': Lender.objects.get(code='PQB').id, **self.rows[0]}])
+        self.assertEqual(response.json()['items_not_added'][0]['item']['code'], 'PQC')
+
+    def test_parquet_upload_to_a_job_is_recognised_by_the_worker(self):
+        with tempfile.TemporaryDirectory() as spool, override_settings(CSV_IN_BULK_SPOOL_DIR=spool):
+            response = self.upload(parquet_table_bytes(self.rows[:1]), url='/csv-in-bulk/?async=true')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertTrue(BulkUploadJob.objects.get().upload_path.endswith('.parquet'))
+            self.assertEqual(run_job(claim_next_job()).status, BulkUploadJob.SUCCEEDED)
+        self.assertTrue(Lender.objects.filter(code='PQB', active=True).exists())
+
+    def test_corrupt_parquet_and_missing_columns_are_parsing_errors(self):
+        for data in (b'not parquet', parquet_table_bytes(self.rows)[:-20],
+                     parquet_table_bytes([{'name': 'No Code Bank'}])):
+            response = self.upload(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(len(response.json()['csv_parsing_errors']), 1)
+        self.assertEqual(Lender.objects.count(), 0)
+
+    def test_parquet_download_has_a_row_group_per_chunk(self):
+        self.upload(parquet_table_bytes(self.rows[:1]))
+        Lender.objects.create(name='Westpac', code='WBC', upfront_commission_rate=1, trial_commission_rate=2,
+                              active=False)
+        with mock.patch('csv_in_bulk.views.DOWNLOAD_CHUNK_ROWS', 1):
+            response = self.client.get('/csv-in-bulk/?format=parquet', HTTP_ACCEPT_ENCODING='gzip',
+                                       **self.auth_headers)
+            blocks = list(response.streaming_content)
+        self.assertEqual(response['Content-Type'], PARQUET_MEDIA_TYPE)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('.parquet"', response['Content-Disposition'])
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(read_parquet_rows(BytesIO(b''.join(blocks))),
+                         list(Lender.objects.order_by('id').values(*DOWNLOAD_HEADER)))
+
+    async def test_asgi_parquet_download_is_the_same_file(self):
+        await sync_to_async(self.upload)(parquet_table_bytes(self.rows[:1]))
+        response = await self.async_client.get('/csv-in-bulk/?format=parquet',
+                                               headers={'Authorization': self.auth_headers['HTTP_AUTHORIZATION']})
+        self.assertTrue(response.is_async)
+        content = b''.join([block async for block in response.streaming_content])
+        self.assertEqual(read_parquet_rows(BytesIO(content))[0]['code'], 'PQB')
+
+    def test_unknown_download_format_is_rejected(self):
+        response = self.client.get('/csv-in-bulk/?format=xlsx', **self.auth_headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BasicAuthCacheTestCase(TestCase):
+    def setUp(self):
+        authenticators.clear_verified_credentials()
+        self.user = User.objects.create_user(username='scripted', password='pass:word')
+        self.url = f'/csv-in-bulk/jobs/{uuid.uuid4()}/'
+
+    def get(self, credentials=b'scripted:pass:word'):
+        """404 once authenticated (the job does not exist), 401 otherwise"""
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f'Basic {base64.b64encode(credentials).decode()}')
+
+    def test_password_is_verified_once_per_header(self):
+        with mock.patch.object(authenticators, 'authenticate', wraps=authenticators.authenticate) as authenticate:
+            for _ in range(3):
+                self.assertEqual(self.get().status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self.get(b'scripted:wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.get(b'scripted:wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(authenticate.call_count, 3)
+
+    def test_password_change_and_deactivation_invalidate_the_cache(self):
+        self.get()
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertEqual(self.get().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get(b'scripted:new-password').status_code, status.HTTP_404_NOT_FOUND)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(b'scripted:new-password').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(CSV_IN_BULK_AUTH_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        with mock.patch.object(authenticators, 'authenticate', wraps=authenticators.authenticate) as authenticate:
+            self.get()
+            self.get()
+        self.assertEqual(authenticate.call_count, 2)
+
+    @override_settings(CSV_IN_BULK_AUTH_CACHE_MAX_ENTRIES=1)
+    def test_cache_is_bounded(self):
+        User.objects.create_user(username='other', password='other-password')
+        self.get()
+        self.get(b'other:other-password')
+        self.assertEqual(len(authenticators._verified_credentials), 1)
+
+    def test_sessions_can_be_skipped(self):
+        self.get()
+        self.assertEqual(Session.objects.count(), 1)
+        self.client.cookies.clear()
+        with self.settings(CSV_IN_BULK_AUTH_SESSIONS=False):
+            response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_malformed_credentials_are_unauthorized(self):
+        for header in ['Basic not-base64!', 'Basic ' + base64.b64encode(b'\xff\xfe').decode()]:
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=header).status_code,
+                             status.HTTP_401_UNAUTHORIZED)
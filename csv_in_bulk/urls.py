@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path('', views.csv_in_bulk),
+    path('jobs/<uuid:job_id>/', views.bulk_upload_job, name='bulk-upload-job'),
 ]
@@ -1,37 +1,41 @@
-import csv
-import pandas as pd
-from io import StringIO
 from lenders.models import Lender
+from lenders.renderers import csv_blocks, acsv_blocks
+from django.core.handlers.asgi import ASGIRequest
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from csv_in_bulk.authenticators import basic_auth_logged_in
+from csv_in_bulk.compression import (decompressed_upload, negotiate_encoding, compressed, acompressed,
+                                     supported_encodings, UnsupportedEncodingError)
 from csv_in_bulk.helpers import convert_bool_string_to_bool
-from django.forms.models import model_to_dict
-from django.core.exceptions import ValidationError
-from django.db.utils import IntegrityError
+from csv_in_bulk.importers import import_upload, upload_formats, INSERT, IMPORT_MODES, LENDER_COLUMNS, CSV, PARQUET
+from lenders.parquet import PARQUET_MEDIA_TYPE, parquet_blocks, aparquet_blocks
+from csv_in_bulk.jobs import enqueue_upload, job_as_dict
+from csv_in_bulk.models import BulkUploadJob
 from rest_framework import status
 from django.http import StreamingHttpResponse
 import datetime
 
 
-class PseudoBuffer:
+# the columns of a csv download, in the order an upload takes them
+DOWNLOAD_HEADER = ['id', *LENDER_COLUMNS]
+# rows fetched per query and rows written per streamed block of a csv download
+DOWNLOAD_CHUNK_ROWS = 2000
+
+
+def upload_status_code(report):
     """
-    mock file-likeinterface.
+    The response code of an upload attempt, decided after object creation.
+    Chunks are committed as they are read, so a file failing to parse half way has its earlier rows written: that is
+    207 Multi-Status rather than 400 Bad Request, for a client not to resend rows that are already in.
     """
-    def write(self, value):
-        """
-        zero buffer
-        """
-        return value
-
-def row_generator(header):
-    yield header
-    for dg in (model_to_dict(x) for x in Lender.objects.all()):
-        temp = []
-        for field in header:
-            temp.append(dg[field])
-        yield temp
+    if report['csv_parsing_errors']:
+        if report['items_added'] or report['items_updated']:
+            return status.HTTP_207_MULTI_STATUS
+        return status.HTTP_400_BAD_REQUEST
+    if (report['items_added'] or report['items_updated'] or report['items_unchanged']) and not report['items_not_added']:
+        return status.HTTP_200_OK
+    return status.HTTP_207_MULTI_STATUS
 
 
 @csrf_exempt
@@ -39,56 +43,68 @@ def row_generator(header):
 def csv_in_bulk(request):
     if basic_auth_logged_in(request):
         if request.method == 'POST':
-            #these will be used for determining the response status code and the response json
-            csv_parsing_errors, items_not_added,items_added  = [], [], []
+            mode = request.GET.get('mode', INSERT)
+            if mode not in IMPORT_MODES:
+                return JsonResponse(data={'error': f'mode must be one of {", ".join(IMPORT_MODES)}'},
+                                    status=status.HTTP_400_BAD_REQUEST)
             try:
-                df = pd.read_csv(StringIO(request.read().decode(encoding='utf-8')))
-            except (UnicodeDecodeError, pd.errors.EmptyDataError) as e:# handles issues with the csv file
-                csv_parsing_errors.append({'exception':str(e)})
+                #a gzip or zstd upload is decompressed as it is read
+                upload = decompressed_upload(request)
+            except UnsupportedEncodingError as e:
+                return JsonResponse(data={'error': str(e)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                    headers={'Accept-Encoding': ', '.join(supported_encodings())})
+            #a parquet file is told apart by its content type, any other upload is taken to be a csv
+            upload_format = PARQUET if request.content_type == PARQUET_MEDIA_TYPE else CSV
+            if upload_format not in upload_formats():
+                return JsonResponse(data={'error': 'parquet uploads need pyarrow to be installed'},
+                                    status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+            if convert_bool_string_to_bool(request.GET.get('async')):
+                #spool the (decompressed) upload and let a `manage.py process_bulk_upload_jobs` worker import it
+                job = job_as_dict(enqueue_upload(upload, request.user, mode, upload_format))
+                return JsonResponse(job, status=status.HTTP_202_ACCEPTED, headers={'Location': job['url']})
+            #parse, validate and commit the upload chunk by chunk straight off the request stream
+            report = import_upload(upload, mode, upload_format=upload_format)
+            return JsonResponse(report, status=upload_status_code(report))
+        else:#GET request for CSV (or ?format=parquet) download
+            download_format = request.GET.get('format', CSV)
+            if download_format not in upload_formats():
+                return JsonResponse(data={'error': f'format must be one of {", ".join(upload_formats())}'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            if isinstance(request, ASGIRequest):
+                #under ASGI an async generator streams on the event loop, so a slow download does not hold a thread
+                rows = Lender.objects.aiter_values_list(*DOWNLOAD_HEADER, chunk_size=DOWNLOAD_CHUNK_ROWS)
+                blocks = aparquet_blocks if download_format == PARQUET else acsv_blocks
             else:
-                for _,row in df.iterrows():
-                    new_lender = None
-                    try:
-                        new_lender = Lender(name=str(row['name']),
-                               code=str(row['code']),
-                               upfront_commission_rate=float(row['upfront_commission_rate']),
-                               trial_commission_rate=float(row['trial_commission_rate']),
-                               active=convert_bool_string_to_bool(row['active'])
-                               )
-                        new_lender.full_clean()
-                        new_lender.save()
-                    except (IntegrityError,ValidationError) as e:#handles issues with object creation
-                        if new_lender:#for avoiding calling .mode_to_dict() on a None object
-                            item_content = model_to_dict(new_lender)
-                        else: #in case new lender cannot be retrieved, use row['name'] to provide diagnosis clues
-                            item_content = row['name']
-                        items_not_added.append({'item': item_content,'exception': str(e)})
-                    else:
-                        items_added.append({'item': model_to_dict(new_lender),'exception': None})
-            #decide response code after object creation
-            if items_added and not items_not_added:
-                response_code = status.HTTP_200_OK
-            else:
-                response_code = status.HTTP_207_MULTI_STATUS
-            if csv_parsing_errors:
-                response_code = status.HTTP_400_BAD_REQUEST
-            # return a json containing the result of this upload attempt
-            return JsonResponse({
-                                 'csv_parsing_errors': csv_parsing_errors,
-                                 'items_added':items_added,
-                                 'items_not_added':items_not_added
-                                 },
-                                 status=response_code)
-        else:#GET request for CSV download
-            a_lender = Lender.objects.first() # store in memory first to prevent race condition when getting the header
-            if a_lender:
-                csv_writer = csv.writer(PseudoBuffer())
-                header =[k for k,v in model_to_dict(a_lender).items()]
-                writer_generator = (csv_writer.writerow(row) for row in row_generator(header))
-            else:
-                writer_generator = iter(())#empty generator for returning an empty csv file
+                rows = Lender.objects.iter_values_list(*DOWNLOAD_HEADER, chunk_size=DOWNLOAD_CHUNK_ROWS)
+                blocks = parquet_blocks if download_format == PARQUET else csv_blocks
+            writer_generator = blocks(DOWNLOAD_HEADER, rows, DOWNLOAD_CHUNK_ROWS)
             datetime_str_now = datetime.datetime.now().strftime('%Y-%m-%dT%H_%M_%S')
-            #stream the response to protect load balancer and feed the stream with write_generator to prevent memory hog
-            return StreamingHttpResponse(writer_generator,content_type="text/csv",headers={"Content-Disposition": f'attachment; filename="bulk_download_{datetime_str_now}.csv"'})
+            headers = {"Content-Disposition": f'attachment; filename="bulk_download_{datetime_str_now}.{download_format}"'}
+            if download_format == PARQUET:
+                #a row group per chunk, its columns already compressed by the parquet writer
+                return StreamingHttpResponse(writer_generator, content_type=PARQUET_MEDIA_TYPE, headers=headers)
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if encoding:
+                #compress block by block as the csv is written, never the whole file at once
+                compress = acompressed if isinstance(request, ASGIRequest) else compressed
+                writer_generator = compress(writer_generator, encoding)
+                headers["Content-Encoding"] = encoding
+            #stream the response to protect load balancer and feed the stream with writer_generator to prevent memory hog
+            return StreamingHttpResponse(writer_generator,content_type="text/csv",headers=headers)
+    else:
+        return JsonResponse(data={'error':'Unauthorized'},status=status.HTTP_401_UNAUTHORIZED)
+
+
+@require_http_methods(['GET'])
+def bulk_upload_job(request, job_id):
+    """
+    Progress counters of a background upload, and its report once it is finished.
+    """
+    if basic_auth_logged_in(request):
+        job = BulkUploadJob.objects.filter(pk=job_id, owner=request.user).first()
+        if job is None:
+            return JsonResponse(data={'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(job_as_dict(job))
     else:
         return JsonResponse(data={'error':'Unauthorized'},status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
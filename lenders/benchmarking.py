@@ -0,0 +1,153 @@
+import itertools
+import math
+import re
+import string
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import setup_databases, teardown_databases
+from lenders.models import Lender, LenderTombstone, LenderChangeCounter
+
+
+# a lender code is exactly three capital letters, so this is the largest table the schema can hold
+MAX_LENDER_CODES = len(string.ascii_uppercase) ** 3
+
+CSV_HEADER = 'id,name,code,upfront_commission_rate,trial_commission_rate,active\n'
+
+# the (filters, ordering) combinations the lenders list serves with ?active= and ?ordering=
+LIST_QUERY_SHAPES = [
+    ({}, ['created', 'id']),
+    ({}, ['-created']),
+    ({}, ['upfront_commission_rate']),
+    ({}, ['-trial_commission_rate']),
+    ({}, ['active']),
+    ({'active': True}, ['created', 'id']),
+    ({'active': False}, ['-created']),
+    ({'active': True}, ['upfront_commission_rate']),
+    ({'active': False}, ['-upfront_commission_rate']),
+    ({'active': True}, ['-trial_commission_rate']),
+    ({'active': False}, ['trial_commission_rate']),
+]
+
+# what a web worker imports before serving its first request: the wsgi application and the url configuration
+STARTUP_CODE = 'import challenge_demo.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'
+# cold-start import time a worker may take, and modules it must not import until they are needed
+STARTUP_BUDGET_SECONDS = 1.0
+STARTUP_DEFERRED_MODULES = ('pandas', 'numpy')
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$')
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """
+    Run a benchmark against a throwaway test database (the same one `manage.py test` would create) so seeding
+    and timing never touch the configured database.
+    """
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+
+
+def lender_codes(n):
+    """
+    The first n lender codes in lexicographic order (AAA, AAB, ...).
+    """
+    if n > MAX_LENDER_CODES:
+        raise ValueError(f'at most {MAX_LENDER_CODES} unique lender codes exist, {n} were requested.')
+    return [''.join(letters) for letters in itertools.islice(itertools.product(string.ascii_uppercase, repeat=3), n)]
+
+
+def clear_lenders():
+    """
+    Empty the lenders and tombstone tables with one DELETE each, without the tombstones Lender.objects.all().delete()
+    would record, under a single change sequence number so that no cached response of the old lenders is served.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        LenderChangeCounter.next_value()
+        for model in (Lender, LenderTombstone):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def seed_lenders(n):
+    """
+    Replace the lenders table with n lenders (a fifth of them active), without tombstones, and refresh the planner
+    statistics.
+    """
+    clear_lenders()
+    with transaction.atomic():
+        seq = LenderChangeCounter.next_value()
+        Lender.objects.bulk_create(
+            [Lender(name=f'benchmark_lender_{code}', code=code, upfront_commission_rate=i % 500,
+                    trial_commission_rate=i % 300, active=i % 5 == 0, created_seq=seq, updated_seq=seq)
+             for i, code in enumerate(lender_codes(n))],
+            batch_size=1000)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE TABLE {Lender._meta.db_table}' if connection.vendor == 'mysql' else 'ANALYZE')
+
+
+def lender_csv_lines(n, invalid_every=0):
+    """
+    The lines of a CSV upload with n lenders in the format accepted by /csv-in-bulk/, header included.
+    Every `invalid_every`-th row (if non-zero) carries an out of range commission rate, and codes repeat once all
+    MAX_LENDER_CODES of them are used (those rows are then rejected as duplicates).
+    """
+    yield CSV_HEADER
+    codes = itertools.cycle(lender_codes(min(n, MAX_LENDER_CODES)))
+    for i, code in enumerate(itertools.islice(codes, n), start=1):
+        upfront_commission_rate = 900.0 if invalid_every and i % invalid_every == 0 else float(i % 500)
+        yield f'{i},benchmark_lender_{code},{code},{upfront_commission_rate},{float(i % 300)},{i % 2 == 0}\n'
+
+
+def lender_csv(n, invalid_every=0):
+    """
+    A CSV upload with n lenders, see lender_csv_lines.
+    """
+    return ''.join(lender_csv_lines(n, invalid_every))
+
+
+def timed(fn, *args, **kwargs):
+    """
+    Call fn and return (seconds elapsed, return value).
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def latency_summary(timings):
+    """
+    Throughput and latency percentiles of a list of per-request seconds, in milliseconds rounded to the microsecond.
+    Percentiles are nearest-rank: the slowest of the fastest p% of the requests, so p99 is a latency that was observed.
+    """
+    ordered = sorted(timings)
+
+    def percentile(p):
+        return ordered[max(math.ceil(p / 100 * len(ordered)), 1) - 1]
+
+    milliseconds = {key: round(seconds * 1000, 3) for key, seconds in [
+        ('mean_ms', sum(ordered) / len(ordered)), ('p50_ms', percentile(50)), ('p95_ms', percentile(95)),
+        ('p99_ms', percentile(99)), ('max_ms', ordered[-1])]}
+    return {'requests': len(ordered), 'requests_per_second': round(len(ordered) / sum(ordered), 1), **milliseconds}
+
+
+def measure_startup(code=STARTUP_CODE):
+    """
+    Run `code` in a fresh interpreter under `python -X importtime`, which inherits the environment and so the settings
+    module. Returns (seconds spent importing, {top level module: cumulative seconds}, every module imported).
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR,
+                               capture_output=True, text=True, check=True)
+    top_level, modules = {}, set()
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            microseconds, indent, module = match.groups()
+            modules.add(module)
+            if not indent:
+                top_level[module] = int(microseconds) / 1e6
+    return sum(top_level.values()), top_level, modules
@@ -0,0 +1,78 @@
+from django.db import transaction
+from django.db.utils import IntegrityError
+from django.utils import timezone
+from lenders.models import Lender, LenderTombstone, LenderChangeCounter
+
+
+# lenders written per INSERT, UPDATE or DELETE statement of a bulk write
+BULK_BATCH_SIZE = 1000
+
+
+def insert_lenders(lenders, batch_size=BULK_BATCH_SIZE):
+    """
+    Insert new lenders with chunked bulk_create, within the caller's transaction.
+    A batch hitting an IntegrityError (e.g. a concurrent write took one of its codes after validation) is settled row
+    by row. Returns {index in lenders: error} for the lenders that could not be inserted, every other lender has its
+    primary key set, also on backends such as MySQL that do not return primary keys from bulk inserts.
+    The lenders share one change sequence number.
+    """
+    if lenders:
+        seq = LenderChangeCounter.next_value()
+        for lender in lenders:
+            lender.created_seq = lender.updated_seq = seq
+    failed = {}
+    for start in range(0, len(lenders), batch_size):
+        batch = lenders[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                Lender.objects.bulk_create(batch)
+        except IntegrityError:
+            for index, lender in enumerate(batch, start=start):
+                try:
+                    with transaction.atomic():
+                        lender.save()
+                except IntegrityError as e:
+                    lender.pk = None
+                    failed[index] = str(e)
+
+    missing_ids = [lender.code for index, lender in enumerate(lenders) if lender.pk is None and index not in failed]
+    ids = {}
+    for start in range(0, len(missing_ids), batch_size):
+        ids.update(Lender.objects.filter(code__in=missing_ids[start:start + batch_size]).values_list('code', 'id'))
+    for index, lender in enumerate(lenders):
+        if lender.pk is None and index not in failed:
+            lender.pk = ids.get(lender.code)
+
+    return failed
+
+
+def update_lenders(lenders, fields, batch_size=BULK_BATCH_SIZE):
+    """
+    Write `fields` of stored lenders with chunked bulk_update, within the caller's transaction, and their updated time
+    and change sequence number, which bulk_update does not set.
+    """
+    if lenders and fields:
+        updated, seq = timezone.now(), LenderChangeCounter.next_value()
+        for lender in lenders:
+            lender.updated, lender.updated_seq = updated, seq
+        Lender.objects.bulk_update(lenders, [*fields, 'updated', 'updated_seq'], batch_size=batch_size)
+
+
+def delete_lenders(codes, batch_size=BULK_BATCH_SIZE):
+    """
+    Delete the lenders of `codes` with one DELETE ... WHERE code IN per batch, within the caller's transaction, and
+    return the set of codes that were deleted. Their tombstones are inserted with one bulk_create per batch, under one
+    change sequence number.
+    """
+    deleted, seq = set(), None
+    codes = list(codes)
+    for start in range(0, len(codes), batch_size):
+        found = list(Lender.objects.filter(code__in=codes[start:start + batch_size]).values_list('id', 'code'))
+        if not found:
+            continue
+        deleted.update(code for _, code in found)
+        seq = LenderTombstone.record(found, seq)
+        # the plain QuerySet.delete() of the base manager, since LenderQuerySet.delete() would record the tombstones
+        # again
+        Lender._base_manager.filter(pk__in=[id for id, _ in found]).delete()
+    return deleted
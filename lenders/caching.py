@@ -0,0 +1,93 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from lenders.models import LenderChangeCounter
+
+
+COUNTER_KEYS = {'hits': 'lenders:response_cache:hits', 'misses': 'lenders:response_cache:misses'}
+
+
+def response_cache():
+    return caches[settings.LENDER_RESPONSE_CACHE_ALIAS]
+
+
+def cache_state():
+    """
+    The current generation of the cached lender responses and when the lenders last changed, read from the committed
+    LenderChangeCounter: every write to the lenders draws a new change sequence number, so a write committed by any
+    process (another web worker, or process_bulk_upload_jobs) starts a new generation for every other process too,
+    whatever cache they use.
+    """
+    generation, last_modified = LenderChangeCounter.committed_state()
+    return {'generation': generation, 'last_modified': last_modified}
+
+
+def _count(outcome):
+    cache = response_cache()
+    cache.add(COUNTER_KEYS[outcome], 0, timeout=None)
+    try:
+        cache.incr(COUNTER_KEYS[outcome])
+    except ValueError:  # evicted between add and incr, losing one count is fine
+        pass
+
+
+def response_cache_stats():
+    """
+    {'hits': n, 'misses': n} since the cache was last cleared.
+    """
+    cache = response_cache()
+    return {outcome: cache.get(key, 0) for outcome, key in COUNTER_KEYS.items()}
+
+
+class CachedResponseMixin:
+    """
+    Serve the list and retrieve actions of a viewset from the lender response cache.
+
+    Rendered responses are cached under the absolute url (path, query parameters and host, since the serialized urls
+    are absolute) and the renderer format, within the current generation of cache_state(). Every response carries an
+    ETag (a hash of its content) and Last-Modified (when the lenders last changed), and conditional GETs that still
+    match are answered with 304 Not Modified.
+    The browsable api is never cached because its pages depend on the user.
+    """
+    uncached_formats = ('api',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, action, request, *args, **kwargs):
+        renderer_format = request.accepted_renderer.format
+        if renderer_format in self.uncached_formats:
+            return action(request, *args, **kwargs)
+
+        cache = response_cache()
+        state = cache_state()
+        url_hash = hashlib.md5(f'{renderer_format} {request.build_absolute_uri()}'.encode()).hexdigest()
+        key = f'lenders:response_cache:{state["generation"]}:{url_hash}'
+        cached = cache.get(key)
+        if cached is None:
+            _count('misses')
+            response = action(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            # rendered here rather than by the handler so that the bytes can be stored
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cached = {'content': response.content, 'content_type': response['Content-Type'],
+                      'etag': quote_etag(hashlib.md5(response.content).hexdigest())}
+            cache.set(key, cached, timeout=settings.LENDER_RESPONSE_CACHE_TIMEOUT)
+        else:
+            _count('hits')
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+
+        response['ETag'] = cached['etag']
+        response['Last-Modified'] = http_date(state['last_modified'])
+        return get_conditional_response(request, etag=cached['etag'], last_modified=state['last_modified'],
+                                        response=response)
@@ -0,0 +1,62 @@
+import heapq
+import operator
+from lenders.models import Lender, LenderTombstone
+from lenders.serializers import LenderRowsSerializer
+
+
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+
+class InvalidChangeTokenError(ValueError):
+    """
+    A ?since= change token that /lenders/changes/ did not hand out.
+    """
+
+
+def change_token(seq):
+    """
+    The change token of a change sequence number, as a string.
+    """
+    return str(seq)
+
+
+def token_seq(token):
+    """
+    The change sequence number a change token stands for.
+    """
+    try:
+        seq = int(token)
+        if seq < 0:
+            raise ValueError(token)
+        return seq
+    except ValueError:
+        raise InvalidChangeTokenError(f'{token!r} is not a change token.')
+
+
+def lender_changes(since, until, context):
+    """
+    The lenders inserted, updated or deleted after change sequence number `since` (everything there is when None) and
+    up to `until`, in the order they were committed: every stored lender as LenderRowsSerializer outputs it after a
+    'change' of 'insert' (created after `since`) or 'update', and every deleted one as its 'change', 'id' and 'code'.
+    A lender deleted and then created again with the same code is reported in that order.
+    Without `since` the client has nothing to drop, so no deletes are reported.
+    The lenders are read with a range of the updated_seq index and the deletes with one of the tombstone deleted_seq
+    index.
+    """
+    lenders = Lender.objects.filter(updated_seq__lte=until)
+    if since is not None:
+        lenders = lenders.filter(updated_seq__gt=since)
+    rows = list(lenders.order_by('updated_seq', 'id').values_list(*LenderRowsSerializer.ROW_FIELDS, 'created_seq',
+                                                                 'updated_seq'))
+    # the rows end with created, which LenderRowsSerializer ignores, then created_seq and updated_seq
+    serialized = LenderRowsSerializer([row[:-2] for row in rows], context).data
+    # within a sequence number deletes go first, as delete_lenders draws its own before a recreating insert does
+    changes = [((row[-1], 1, row[0]), {'change': INSERT if since is None or row[-2] > since else UPDATE, **lender})
+               for row, lender in zip(rows, serialized)]
+    if since is not None:
+        tombstones = LenderTombstone.objects.filter(deleted_seq__gt=since, deleted_seq__lte=until)
+        deletes = [((seq, 0, lender_id), {'change': DELETE, 'id': lender_id, 'code': code})
+                   for seq, lender_id, code in tombstones.order_by('deleted_seq', 'lender_id')
+                   .values_list('deleted_seq', 'lender_id', 'code')]
+        changes = heapq.merge(changes, deletes, key=operator.itemgetter(0))
+    return [change for _, change in changes]
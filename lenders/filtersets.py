@@ -0,0 +1,32 @@
+from django import forms
+from django.conf import settings
+from django_filters import rest_framework as filters
+from lenders.models import Lender
+
+
+class LenderFilterForm(forms.Form):
+    def clean_code__in(self):
+        codes = self.cleaned_data.get('code__in')
+        if codes and len(codes) > settings.LENDER_LOOKUP_MAX_CODES:
+            raise forms.ValidationError(f'Ensure at most {settings.LENDER_LOOKUP_MAX_CODES} codes are given '
+                                        f'({len(codes)} were).')
+        return codes
+
+
+class LenderFilterSet(filters.FilterSet):
+    """
+    ?active= and ?code= as before, ?code__in=CBA,WBC,SVB for a basket of up to LENDER_LOOKUP_MAX_CODES codes
+    (one query on the unique code index), ?search= for the lenders whose name starts with it, case insensitively (a
+    range of the name prefix index), and __gte/__lte bounds on either commission rate (a range of its index).
+    """
+    search = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+
+    class Meta:
+        model = Lender
+        form = LenderFilterForm
+        fields = {
+            'active': ['exact'],
+            'code': ['exact', 'in'],
+            'upfront_commission_rate': ['gte', 'lte'],
+            'trial_commission_rate': ['gte', 'lte'],
+        }
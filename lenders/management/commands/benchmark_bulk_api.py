@@ -0,0 +1,45 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, clear_lenders, lender_codes, timed
+
+
+def lender_items(codes):
+    return [{'name': f'benchmark_lender_{code}', 'code': code, 'upfront_commission_rate': i % 500,
+             'trial_commission_rate': i % 300, 'active': i % 2 == 0} for i, code in enumerate(codes)]
+
+
+class Command(BaseCommand):
+    help = ('Lenders/sec written by one POST /lenders/ per lender against POST, PATCH and DELETE /lenders/bulk/ '
+            '(session authenticated, so no password hash per request).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, nargs='+', default=[1000, 10000, 17576])
+        parser.add_argument('--single-posts', type=int, default=500,
+                            help='lenders created one request each, whose rate is reported for every size')
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            client.force_login(User.objects.create_user(username='benchmark', password='benchmark-password'))
+
+            items = lender_items(lender_codes(options['single_posts']))
+            seconds, _ = timed(lambda: [client.post('/lenders/', item, content_type='application/json')
+                                        for item in items])
+            self.stdout.write(f'single POST   lenders={len(items):>6} {seconds:8.3f}s {len(items) / seconds:9.0f}/s')
+
+            for lenders in options['lenders']:
+                clear_lenders()
+                codes = lender_codes(lenders)
+                requests = [
+                    ('bulk POST', client.post, lender_items(codes)),
+                    ('bulk PATCH', client.patch, [{'code': code, 'active': i % 3 == 0} for i, code in enumerate(codes)]),
+                    ('bulk DELETE', client.delete, codes),
+                ]
+                for label, method, data in requests:
+                    body = json.dumps(data)
+                    seconds, response = timed(method, '/lenders/bulk/', body, content_type='application/json')
+                    if response.status_code != 200:
+                        self.stderr.write(f'{label}: {response.status_code}')
+                    self.stdout.write(f'{label:<13} lenders={lenders:>6} {seconds:8.3f}s {lenders / seconds:9.0f}/s')
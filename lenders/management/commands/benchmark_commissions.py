@@ -0,0 +1,63 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders, lender_codes, timed, MAX_LENDER_CODES
+from lenders.commissions import loan_frame, price_loans
+
+
+def loans(n, lenders):
+    """
+    n loans spread over the first `lenders` codes, every 100th one with a code no lender has.
+    """
+    codes = lender_codes(lenders)
+    return [{'code': 'ZZ' if i % 100 == 99 else codes[i % lenders], 'loan_amount': 10000 + i % 990000,
+             'term_months': 12 + i % 348} for i in range(n)]
+
+
+class Command(BaseCommand):
+    help = ('Loans/sec priced by POST /lenders/commissions/ with a JSON and a csv body (whole streamed responses), '
+            'and by the array arithmetic alone, against a price per loan computed in Python from GET /lenders/<code>/ '
+            'rates.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--lenders', type=int, default=MAX_LENDER_CODES)
+
+    def write(self, label, n, seconds):
+        self.stdout.write(f'{label:<28} loans={n:>7} {seconds:8.3f}s {n / seconds:10.0f} loans/s')
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            seed_lenders(options['lenders'])
+            client = Client()
+            client.force_login(User.objects.create_user(username='benchmark', password='benchmark-password'))
+            client.post('/lenders/commissions/', '[]', content_type='application/json')  # warm up: first imports
+            for n in options['loans']:
+                batch = loans(n, options['lenders'])
+                frame = loan_frame(batch)
+                self.write('array arithmetic', n, timed(price_loans, frame)[0])
+
+                body = json.dumps(batch)
+                csv = 'code,loan_amount,term_months\n' + ''.join(
+                    f'{loan["code"]},{loan["loan_amount"]},{loan["term_months"]}\n' for loan in batch)
+                for label, data, content_type in (('POST json', body, 'application/json'),
+                                                  ('POST csv', csv, 'text/csv')):
+                    def price():
+                        response = client.post('/lenders/commissions/?format=json', data, content_type=content_type)
+                        return sum(len(block) for block in response.streaming_content)
+                    self.write(label, n, timed(price)[0])
+
+                def price_one_by_one():
+                    # what a client did before: a GET per distinct lender, then the arithmetic per loan
+                    rates = {}
+                    for loan in batch[:1000]:
+                        if loan['code'] not in rates:
+                            response = client.get(f'/lenders/{loan["code"]}/?format=json')
+                            rates[loan['code']] = response.json() if response.status_code == 200 else None
+                        lender = rates[loan['code']]
+                        if lender:
+                            round(loan['loan_amount'] * lender['upfront_commission_rate'] / 100, 2)
+                            round(loan['loan_amount'] * lender['trial_commission_rate'] / 100
+                                  * loan['term_months'] / 12, 2)
+                self.write('GET per lender (1000 loans)', min(n, 1000), timed(price_one_by_one)[0])
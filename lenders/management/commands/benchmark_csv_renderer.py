@@ -0,0 +1,50 @@
+import tracemalloc
+import pandas as pd
+from django.core.management.base import BaseCommand
+from lenders.benchmarking import timed
+from lenders.renderers import CSVRenderer
+
+
+def render_with_pandas(data):
+    """
+    The original CSVRenderer.render: a DataFrame built for every response, then to_csv.
+    """
+    if 'id' in data:
+        content = [data]
+    else:
+        content = data['results']
+    return str(pd.DataFrame(data=content).to_csv(index=False))
+
+
+def lender_page(rows):
+    """
+    A page of rows shaped like LenderSerializer's output (no database involved, so any number of rows is possible).
+    """
+    results = [{'id': i, 'url': f'http://testserver/lenders/L{i}/', 'name': f'benchmark_lender_{i}', 'code': f'L{i}',
+                'upfront_commission_rate': float(i % 500), 'trial_commission_rate': i % 300 + 0.5,
+                'active': i % 5 == 0, 'options': None} for i in range(rows)]
+    return results[0] if rows == 1 else {'count': rows, 'next': None, 'previous': None, 'results': results}
+
+
+class Command(BaseCommand):
+    help = 'Compare the pandas and the csv module CSVRenderer: best time of --repeat renders and peak traced memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1, 5, 1000, 100000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        renderer = CSVRenderer()
+        for rows in options['rows']:
+            data = lender_page(rows)
+            if renderer.render(data) != render_with_pandas(data):
+                self.stderr.write(f'rows={rows}: the renderers disagree')
+            repeat = max(1, options['repeat'] * 1000 // max(rows, 1000))
+            for label, render in (('pandas', render_with_pandas), ('csv', renderer.render)):
+                seconds = min(timed(render, data)[0] for _ in range(repeat))
+                tracemalloc.start()
+                render(data)
+                peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+                self.stdout.write(f'{label:>6} rows={rows:>6} {seconds * 1000:10.3f}ms '
+                                  f'{rows / seconds:11.0f} rows/s peak={peak:7.2f}MiB')
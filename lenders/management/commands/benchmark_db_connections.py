@@ -0,0 +1,63 @@
+import os
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+
+POOLED_ENGINES = {'mysql': 'challenge_demo.db.mysql_pool', 'sqlite': 'challenge_demo.db.sqlite_pool'}
+
+
+def request_latencies(settings_dict, requests):
+    """
+    Latency of `requests` simulated requests each running one query, the connection being handled around them the way
+    the request_started and request_finished signals do (close_old_connections).
+    """
+    wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias='benchmark')
+    latencies = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        wrapper.close()
+    return latencies
+
+
+class Command(BaseCommand):
+    help = ('Per-request latency of a one query request without persistent connections, with CONN_MAX_AGE (and health '
+            'checks) and with the in-process pool. Only SELECT 1 is run, against the configured database server, or '
+            'against a temporary SQLite file standing in for it when the configured database is SQLite.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def handle(self, *args, **options):
+        base = {**connections['default'].settings_dict}
+        with tempfile.TemporaryDirectory() as directory:
+            if connections['default'].vendor == 'sqlite':
+                base['NAME'] = os.path.join(directory, 'stand_in.sqlite3')
+            configurations = [
+                ('no persistence', {'CONN_MAX_AGE': 0}),
+                ('CONN_MAX_AGE=600', {'CONN_MAX_AGE': 600}),
+                ('CONN_MAX_AGE=600 + health checks', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+            ]
+            if connections['default'].vendor in POOLED_ENGINES:
+                pooled = {'ENGINE': POOLED_ENGINES[connections['default'].vendor], 'CONN_MAX_AGE': 0,
+                          'POOL_SIZE': options['pool_size']}
+                configurations += [('pool', pooled), ('pool + health checks', {**pooled, 'CONN_HEALTH_CHECKS': True})]
+            self.stdout.write(f'{connections["default"].vendor}, {options["requests"]} requests')
+            for label, overrides in configurations:
+                latencies = sorted(request_latencies({**base, 'CONN_HEALTH_CHECKS': False, **overrides},
+                                                     options['requests']))
+                self.stdout.write(f'{label:>32} mean={statistics.mean(latencies) * 1000:7.3f}ms '
+                                  f'p50={latencies[len(latencies) // 2] * 1000:7.3f}ms '
+                                  f'p95={latencies[int(len(latencies) * 0.95)] * 1000:7.3f}ms')
@@ -0,0 +1,52 @@
+import base64
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'benchmark:benchmark-password').decode()
+ENDPOINTS = [
+    ('detail (cached)', '/lenders/AAA/?format=json', {}, {}),
+    ('list of 100 (uncached)', '/lenders/?format=json&page_size=100', {'LENDER_RESPONSE_CACHE_TIMEOUT': 0}, {}),
+    ('csv download', '/csv-in-bulk/', {}, {'HTTP_AUTHORIZATION': CREDENTIALS}),
+]
+
+
+class Command(BaseCommand):
+    help = ('Per-request latency of a few endpoints with the instrumentation middleware off and on: the best median of '
+            '--rounds alternating rounds, so that drift affects both alike.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def latency(self, url, overrides, headers, enabled, requests):
+        with override_settings(ALLOWED_HOSTS=['testserver'], INSTRUMENTATION_ENABLED=enabled,
+                               CSV_IN_BULK_AUTH_SESSIONS=False, **overrides):
+            client = Client()  # its handler loads the middleware with the settings above
+            timings = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.get(url, **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            seed_lenders(options['lenders'])
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            for label, url, overrides, headers in ENDPOINTS:
+                self.latency(url, overrides, headers, False, 5)  # warm up: credential and response caches
+                off, on = [], []
+                for _ in range(options['rounds']):
+                    off.append(self.latency(url, overrides, headers, False, options['requests']))
+                    on.append(self.latency(url, overrides, headers, True, options['requests']))
+                off, on = min(off), min(on)
+                self.stdout.write(f'{label:>24} off={off * 1e6:9.1f}us on={on * 1e6:9.1f}us '
+                                  f'overhead={(on - off) * 1e6:7.1f}us ({(on - off) / off:+.1%})')
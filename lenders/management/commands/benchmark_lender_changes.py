@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders, lender_codes, timed, MAX_LENDER_CODES
+
+
+class Command(BaseCommand):
+    help = ('Seconds and bytes to resync a copy of --lenders lenders after --changes of them were updated (and a tenth '
+            'as many deleted), with one GET /lenders/changes/?since= against a whole /lenders/export/ '
+            '(response cache off).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=MAX_LENDER_CODES)
+        parser.add_argument('--changes', type=int, nargs='+', default=[10, 100, 1000])
+
+    def write(self, label, changes, seconds, size):
+        self.stdout.write(f'{label:<20} changes={changes:>6} {seconds:8.3f}s {size / 1024:10.1f}KiB')
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], LENDER_RESPONSE_CACHE_TIMEOUT=0):
+            seed_lenders(options['lenders'])
+            client = Client()
+            client.force_login(User.objects.create_user(username='benchmark', password='benchmark-password'))
+            codes = lender_codes(options['lenders'])
+            token = client.get('/lenders/changes/?format=json').json()['next']
+            for n in options['changes']:
+                # the updated lenders are spread over the table, the deleted ones taken from its end
+                changed = codes[::max(1, len(codes) // n)][:n]
+                client.patch('/lenders/bulk/', [{'code': code, 'name': f'renamed {n} {code}'} for code in changed],
+                             content_type='application/json')
+                deleted, codes = codes[len(codes) - n // 10:], codes[:len(codes) - n // 10]
+                if deleted:
+                    client.delete('/lenders/bulk/', deleted, content_type='application/json')
+
+                seconds, response = timed(client.get, f'/lenders/changes/?format=json&since={token}')
+                self.write('GET changes', n + len(deleted), seconds, len(response.content))
+                token = response.json()['next']
+
+                def export():
+                    return sum(len(block) for block in client.get('/lenders/export/').streaming_content)
+                seconds, size = timed(export)
+                self.write('GET whole export', n + len(deleted), seconds, size)
@@ -0,0 +1,68 @@
+import json
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders, timed
+from lenders.renderers import json_blocks
+from lenders.views import EXPORT_FIELDS, EXPORT_CHUNK_ROWS
+
+
+def lender_rows(n):
+    """
+    n value tuples shaped like EXPORT_FIELDS (no database involved, so any number of rows is possible).
+    """
+    return ((i, f'benchmark_lender_{i}', f'L{i}', float(i % 500), i % 300 + 0.5, i % 5 == 0) for i in range(n))
+
+
+def traced(fn, *args):
+    """
+    (seconds elapsed, peak traced memory in MiB) of calling fn, timed untraced since tracing slows it down.
+    """
+    seconds, _ = timed(fn, *args)
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return seconds, peak
+
+
+class Command(BaseCommand):
+    help = ('Rows/sec and peak memory of the streamed JSON and NDJSON lender export: the encoder alone on --rows '
+            'synthetic rows, then whole /lenders/export/ responses against paging through /lenders/?page_size=1000.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--lenders', type=int, nargs='+', default=[1000, 17576])
+
+    def write(self, label, rows, seconds, peak):
+        self.stdout.write(f'{label:<26} rows={rows:>8} {seconds:8.3f}s {rows / seconds:10.0f} rows/s '
+                          f'peak={peak:8.2f}MiB')
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            for ndjson in (False, True):
+                def encode():
+                    for _ in json_blocks(EXPORT_FIELDS, lender_rows(rows), EXPORT_CHUNK_ROWS, ndjson):
+                        pass
+                self.write(f'encode {"ndjson" if ndjson else "json"}', rows, *traced(encode))
+
+            def encode_at_once():
+                json.dumps([dict(zip(EXPORT_FIELDS, row)) for row in lender_rows(rows)])
+            self.write('json.dumps of one list', rows, *traced(encode_at_once))
+
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            for lenders in options['lenders']:
+                seed_lenders(lenders)
+                for url in ('/lenders/export/', '/lenders/export/?format=ndjson'):
+                    def export():
+                        for _ in client.get(url).streaming_content:
+                            pass
+                    self.write(url[len('/lenders/export/'):] or 'json', lenders, *traced(export))
+
+                def pages():
+                    url = '/lenders/?format=json&page_size=1000'
+                    while url:
+                        url = client.get(url).json()['next']
+                with override_settings(LENDER_RESPONSE_CACHE_TIMEOUT=0):
+                    self.write('pages of 1000', lenders, *traced(pages))
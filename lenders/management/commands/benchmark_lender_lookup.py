@@ -0,0 +1,34 @@
+import json
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders, lender_codes, timed, MAX_LENDER_CODES
+
+
+class Command(BaseCommand):
+    help = ('Seconds to resolve baskets of lender codes with a GET /lenders/<code>/ per code, one '
+            'GET /lenders/?code__in= and one POST /lenders/lookup/ (response cache off).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codes', type=int, nargs='+', default=[10, 100, 1000, MAX_LENDER_CODES])
+        parser.add_argument('--lenders', type=int, default=MAX_LENDER_CODES)
+        parser.add_argument('--single-gets', type=int, default=1000,
+                            help='most codes resolved a GET each, the rate being reported for larger baskets')
+
+    def write(self, label, codes, seconds):
+        self.stdout.write(f'{label:<16} codes={codes:>6} {seconds:8.3f}s {codes / seconds:9.0f} codes/s')
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], LENDER_RESPONSE_CACHE_TIMEOUT=0):
+            seed_lenders(options['lenders'])
+            client = Client()
+            client.get('/lenders/AAA/')  # warm up: the first imports
+            for n in options['codes']:
+                codes = lender_codes(n)
+                single = codes[:options['single_gets']]
+                seconds, _ = timed(lambda: [client.get(f'/lenders/{code}/?format=json') for code in single])
+                self.write('GET per code', len(single), seconds)
+                seconds, _ = timed(client.get, f'/lenders/?format=json&code__in={",".join(codes)}')
+                self.write('GET ?code__in=', n, seconds)
+                seconds, _ = timed(client.post, '/lenders/lookup/?format=json', json.dumps(codes),
+                                   content_type='application/json')
+                self.write('POST lookup', n, seconds)
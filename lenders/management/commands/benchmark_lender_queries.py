@@ -0,0 +1,39 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from lenders.benchmarking import isolated_database, seed_lenders, LIST_QUERY_SHAPES, MAX_LENDER_CODES
+from lenders.models import Lender
+
+
+class Command(BaseCommand):
+    help = ('Print the query plan and the median latency of every filter/ordering combination of the lenders list, '
+            'with the Lender indexes and again after dropping them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=MAX_LENDER_CODES)
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def measure(self, page_size, repeat):
+        for filters, ordering in LIST_QUERY_SHAPES:
+            queryset = Lender.objects.filter(**filters).order_by(*ordering)[:page_size]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - start)
+            plan = ' / '.join(line.strip() for line in queryset.explain().splitlines())
+            self.stdout.write(f'{str(filters):>17} {",".join(ordering):>26} '
+                              f'{statistics.median(timings) * 1000:8.3f}ms  {plan}')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            seed_lenders(options['lenders'])
+            self.stdout.write(f'with indexes ({connection.vendor}, {options["lenders"]} lenders)')
+            self.measure(options['page_size'], options['repeat'])
+            with connection.schema_editor() as schema_editor:
+                for index in Lender._meta.indexes:
+                    schema_editor.remove_index(Lender, index)
+            self.stdout.write('without indexes')
+            self.measure(options['page_size'], options['repeat'])
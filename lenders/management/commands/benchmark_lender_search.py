@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from lenders.benchmarking import isolated_database, seed_lenders, latency_summary, MAX_LENDER_CODES
+
+
+# seeded lenders are named benchmark_lender_<code>, so each longer prefix matches 26 times fewer of them
+QUERIES = [
+    'search=benchmark_lender_ABC',
+    'search=BENCHMARK_LENDER_AB',
+    'search=benchmark_lender_A',
+    'search=benchmark_lender_A&active=True',
+    'search=nobody',
+    'upfront_commission_rate__gte=10&upfront_commission_rate__lte=12',
+    'upfront_commission_rate__gte=100&upfront_commission_rate__lte=200',
+    'trial_commission_rate__lte=1&active=True',
+    'trial_commission_rate__gte=100&ordering=-trial_commission_rate',
+    'search=benchmark_lender_A&upfront_commission_rate__lte=50',
+]
+
+
+class Command(BaseCommand):
+    help = ('p50/p95/p99 latency of lender list pages filtered by ?search= name prefixes and commission rate ranges, '
+            'with page number and with cursor pagination (response cache off).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=MAX_LENDER_CODES)
+        parser.add_argument('--requests', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], LENDER_RESPONSE_CACHE_TIMEOUT=0):
+            seed_lenders(options['lenders'])
+            client = Client()
+            for query in QUERIES:
+                for pagination in ('', '&pagination=cursor'):
+                    url = f'/lenders/?format=json&{query}{pagination}'
+                    client.get(url)  # warm up
+                    timings = []
+                    for _ in range(options['requests']):
+                        start = time.perf_counter()
+                        client.get(url)
+                        timings.append(time.perf_counter() - start)
+                    summary = latency_summary(timings)
+                    self.stdout.write(f'{query + pagination:<84} p50={summary["p50_ms"]:7.2f}ms '
+                                      f'p95={summary["p95_ms"]:7.2f}ms p99={summary["p99_ms"]:7.2f}ms')
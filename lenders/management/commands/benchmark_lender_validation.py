@@ -0,0 +1,45 @@
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from csv_in_bulk.importers import read_lender_csv
+from lenders.benchmarking import isolated_database, lender_csv, seed_lenders, timed
+from lenders.models import Lender
+from lenders.validation import validate_lender_frame, LENDER_FIELDS
+
+
+def full_clean_rows(df):
+    """
+    Validate a frame the way the row-by-row importer did: one Lender and one full_clean() (one query) per row.
+    """
+    errors = {}
+    for position, row in enumerate(df[LENDER_FIELDS].itertuples(index=False)):
+        try:
+            Lender(**row._asdict()).full_clean()
+        except ValidationError as e:
+            errors[position] = e.message_dict
+    return errors
+
+
+class Command(BaseCommand):
+    help = ('Rows/sec of lenders.validation.validate_lender_frame against a full_clean() per row, on csv uploads with '
+            'every --invalid-every-th row out of range and codes repeating past the 17,576 that exist.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--invalid-every', type=int, default=10)
+        parser.add_argument('--full-clean-rows', type=int, default=5000,
+                            help='rows validated with full_clean(), whose rate is then reported for every size')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            seed_lenders(1000)
+            for rows in options['rows']:
+                df = read_lender_csv(StringIO(lender_csv(rows, options['invalid_every'])))
+                seconds, (errors, _, _) = timed(validate_lender_frame, df)
+                self.stdout.write(f'vectorised rows={rows:>8} {seconds:8.3f}s {rows / seconds:11.0f} rows/s '
+                                  f'rejected={len(errors)}')
+
+                sample = df.head(options['full_clean_rows'])
+                seconds, _ = timed(full_clean_rows, sample)
+                self.stdout.write(f'full_clean rows={len(sample):>8} {seconds:8.3f}s {len(sample) / seconds:11.0f} '
+                                  f'rows/s (~{rows * seconds / len(sample):.1f}s for {rows} rows)')
@@ -0,0 +1,60 @@
+from unittest import mock
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory, override_settings
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+from lenders.benchmarking import isolated_database, seed_lenders, timed
+from lenders.models import Lender
+from lenders.serializers import LenderSerializer, LenderRowsSerializer
+from lenders.views import LenderViewSet
+
+
+def reference_list():
+    """
+    The list action as it was: model instances serialized by LenderSerializer.
+    """
+    return mock.patch.multiple(LenderViewSet, get_queryset=GenericAPIView.get_queryset,
+                               get_serializer=GenericAPIView.get_serializer)
+
+
+class Command(BaseCommand):
+    help = ('Seconds to fetch and serialize --rows lenders with LenderSerializer over model instances and with '
+            'LenderRowsSerializer over values_list rows, then whole /lenders/?page_size= responses of either '
+            '(cache off).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5, help='the best of this many runs is reported')
+
+    def write(self, label, rows, seconds, reference_seconds=None):
+        speedup = f' {reference_seconds / seconds:5.1f}x' if reference_seconds else ''
+        self.stdout.write(f'{label:<32} rows={rows:>6} {seconds * 1000:9.2f}ms {rows / seconds:9.0f} rows/s{speedup}')
+
+    def best(self, repeat, fn, *args):
+        return min(timed(fn, *args)[0] for _ in range(repeat))
+
+    def handle(self, *args, **options):
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], LENDER_RESPONSE_CACHE_TIMEOUT=0,
+                                                    LENDER_MAX_PAGE_SIZE=max(options['rows'])):
+            seed_lenders(max(options['rows']))
+            context = {'request': Request(RequestFactory().get('/lenders/?format=json')), 'format': None}
+            client = Client()
+            for rows in options['rows']:
+                queryset = Lender.objects.order_by('created', 'id')[:rows]
+
+                def serialize_instances():
+                    return LenderSerializer(list(queryset.all()), many=True, context=context).data
+
+                def serialize_rows():
+                    return LenderRowsSerializer(list(queryset.values_list(*LenderRowsSerializer.ROW_FIELDS)),
+                                                context=context).data
+
+                reference = self.best(options['repeat'], serialize_instances)
+                self.write('LenderSerializer', rows, reference)
+                self.write('LenderRowsSerializer', rows, self.best(options['repeat'], serialize_rows), reference)
+
+                url = f'/lenders/?format=json&page_size={rows}'
+                with reference_list():
+                    reference = self.best(options['repeat'], client.get, url)
+                self.write('GET list (LenderSerializer)', rows, reference)
+                self.write('GET list (rows)', rows, self.best(options['repeat'], client.get, url), reference)
@@ -0,0 +1,27 @@
+import statistics
+from django.core.management.base import BaseCommand, CommandError
+from lenders.benchmarking import measure_startup, STARTUP_BUDGET_SECONDS, STARTUP_DEFERRED_MODULES
+
+
+class Command(BaseCommand):
+    help = ('Measure the cold-start import time of a web worker (challenge_demo.wsgi and the url configuration) with '
+            '`python -X importtime`, and fail when it is over budget or imports a deferred module.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--budget', type=float, default=STARTUP_BUDGET_SECONDS, help='seconds')
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        runs = [measure_startup() for _ in range(options['repeat'])]
+        seconds = statistics.median(total for total, _, _ in runs)
+        _, top_level, modules = runs[-1]
+        for module, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{cumulative * 1000:9.1f}ms  {module}')
+        self.stdout.write(f'median import time over {len(runs)} runs: {seconds * 1000:.1f}ms '
+                          f'(budget {options["budget"] * 1000:.0f}ms)')
+        imported = [module for module in STARTUP_DEFERRED_MODULES if module in modules]
+        if imported:
+            raise CommandError(f'imported at startup: {", ".join(imported)}')
+        if seconds > options['budget']:
+            raise CommandError(f'startup import time {seconds * 1000:.1f}ms is over the budget')
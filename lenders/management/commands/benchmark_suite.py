@@ -0,0 +1,145 @@
+import base64
+import datetime
+import json
+import platform
+import subprocess
+import time
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from lenders.benchmarking import (isolated_database, seed_lenders, clear_lenders, lender_codes, lender_csv,
+                                  latency_summary, LIST_QUERY_SHAPES)
+from lenders.parquet import parquet_available
+
+
+CREDENTIALS = 'Basic ' + base64.b64encode(b'benchmark:benchmark-password').decode()
+# the renderer formats measured besides json, which every other scenario uses
+FORMATS = ('api', 'csv') + (('parquet',) if parquet_available() else ())
+
+
+def git_commit():
+    completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                               text=True)
+    return completed.stdout.strip() or None
+
+
+def list_query(filters, ordering):
+    """
+    The lenders list query string serving a LIST_QUERY_SHAPES entry (the default ordering needs no parameter).
+    """
+    parameters = [f'active={value}' for value in filters.values()]
+    if ordering != ['created', 'id']:
+        parameters.append(f'ordering={",".join(ordering)}')
+    return '&'.join(parameters)
+
+
+class Command(BaseCommand):
+    help = ('Seed --lenders lenders, then measure throughput and p50/p95/p99 latency of the lenders list, detail, '
+            'every filter/ordering combination and renderer format, the exports and a csv import, through the test '
+            'client. Results are written as JSON, one entry per scenario, so that runs of two commits can be diffed '
+            '(or compared with --compare).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=200,
+                            help='timed requests of every list and detail scenario')
+        parser.add_argument('--bulk-requests', type=int, default=5,
+                            help='timed requests of every whole export and csv import scenario')
+        parser.add_argument('--cached', action='store_true',
+                            help='keep the lender response cache on, so that lists and details are served from it')
+        parser.add_argument('--output', help='the JSON results file (benchmark_suite_<commit>.json by default)')
+        parser.add_argument('--compare', help='the JSON results file of an earlier run to compare latencies with')
+
+    def measure(self, scenario, requests, send, before=None):
+        """
+        Time `requests` calls of send(i) (reading streamed responses to the end), after one untimed warm up call.
+        `before`, if given, is called untimed before every call.
+        """
+        timings, failures = [], 0
+        for i in range(requests + 1):
+            if before:
+                before()
+            start = time.perf_counter()
+            response = send(i)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elapsed = time.perf_counter() - start
+            if i:
+                timings.append(elapsed)
+                failures += response.status_code >= 400
+        result = {'scenario': scenario, **latency_summary(timings), 'failures': failures}
+        self.stdout.write(f'{scenario:<64} {result["requests_per_second"]:9.1f}/s p50={result["p50_ms"]:9.3f}ms '
+                          f'p95={result["p95_ms"]:9.3f}ms p99={result["p99_ms"]:9.3f}ms'
+                          + (f' failures={failures}' if failures else ''))
+        return result
+
+    def scenarios(self, client, csv_client, lenders, requests, bulk_requests):
+        codes = lender_codes(lenders)
+        yield self.measure('detail', requests, lambda i: client.get(f'/lenders/{codes[i % lenders]}/?format=json'))
+        for query in ('', 'page_size=100', 'pagination=cursor'):
+            yield self.measure(f'list {query}'.strip(), requests,
+                               lambda i: client.get(f'/lenders/?format=json&{query}'))
+        for filters, ordering in LIST_QUERY_SHAPES[1:]:  # the first shape is the plain list
+            query = list_query(filters, ordering)
+            yield self.measure(f'filter {query}', requests, lambda i: client.get(f'/lenders/?format=json&{query}'))
+        for renderer_format in FORMATS:
+            yield self.measure(f'format {renderer_format} list', requests,
+                               lambda i: client.get(f'/lenders/?format={renderer_format}'))
+            yield self.measure(f'format {renderer_format} detail', requests,
+                               lambda i: client.get(f'/lenders/{codes[i % lenders]}/?format={renderer_format}'))
+        yield self.measure('export /csv-in-bulk/', bulk_requests, lambda i: csv_client.get('/csv-in-bulk/'))
+        for url in ('/lenders/export/', '/lenders/export/?format=ndjson'):
+            yield self.measure(f'export {url}', bulk_requests, lambda i: client.get(url))
+        upload = lender_csv(lenders).encode()
+        yield self.measure('import /csv-in-bulk/', bulk_requests,
+                           lambda i: csv_client.post('/csv-in-bulk/', data=upload, content_type='text/csv'),
+                           before=clear_lenders)
+
+    def compare(self, results, path):
+        with open(path) as f:
+            earlier = {result['scenario']: result for result in json.load(f)['results']}
+        self.stdout.write(f'compared with {path}')
+        for result in results:
+            before = earlier.get(result['scenario'])
+            if before:
+                changes = ' '.join(f'{key[:-3]}={before[key]:.3f}->{result[key]:.3f}ms '
+                                   f'({(result[key] - before[key]) / before[key]:+.0%})'
+                                   for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                self.stdout.write(f'{result["scenario"]:<64} {changes}')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['bulk_requests'] < 1:
+            raise CommandError('--requests and --bulk-requests must be at least 1')
+        cache_timeout = settings.LENDER_RESPONSE_CACHE_TIMEOUT if options['cached'] else 0
+        with isolated_database(), override_settings(ALLOWED_HOSTS=['testserver'], CSV_IN_BULK_AUTH_SESSIONS=False,
+                                                    LENDER_RESPONSE_CACHE_TIMEOUT=cache_timeout):
+            User.objects.create_user(username='benchmark', password='benchmark-password')
+            seed_lenders(options['lenders'])
+            # the lenders api is read anonymously; /csv-in-bulk/ checks the basic credentials once, then from its cache
+            client, csv_client = Client(), Client(HTTP_AUTHORIZATION=CREDENTIALS)
+            results = list(self.scenarios(client, csv_client, options['lenders'], options['requests'],
+                                          options['bulk_requests']))
+            database = connection.vendor
+
+        commit = git_commit()
+        report = {
+            'commit': commit,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': database,
+            'lenders': options['lenders'],
+            'cached': options['cached'],
+            'results': results,
+        }
+        output = options['output'] or f'benchmark_suite_{commit or "uncommitted"}.json'
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        self.stdout.write(f'results written to {output}')
+        if options['compare']:
+            self.compare(results, options['compare'])
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['created'], name='lender_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['upfront_commission_rate'], name='lender_upfront_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['trial_commission_rate'], name='lender_trial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['active', 'created'], name='lender_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['active', 'upfront_commission_rate'], name='lender_active_upfront_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['active', 'trial_commission_rate'], name='lender_active_trial_idx'),
+        ),
+    ]
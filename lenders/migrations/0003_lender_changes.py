@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:04
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenders', '0002_lender_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LenderTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lender_id', models.BigIntegerField()),
+                ('code', models.CharField(max_length=3)),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lender',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['updated'], name='lender_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lendertombstone',
+            index=models.Index(fields=['deleted'], name='lender_tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+NAME_INDEX = 'lender_name_prefix_idx'
+# leading characters of a name the MySQL index holds: a varchar(1024) is longer than an InnoDB key can be
+NAME_PREFIX_LENGTH = 64
+
+
+def create_name_index(apps, schema_editor):
+    """
+    The index ?search= (name LIKE 'prefix%') is served by, which Meta.indexes cannot declare: on MySQL it holds the
+    first NAME_PREFIX_LENGTH characters, on SQLite it uses the NOCASE collation LIKE needs to use an index at all.
+    """
+    Lender = apps.get_model('lenders', 'Lender')
+    column = schema_editor.quote_name(Lender._meta.get_field('name').column)
+    if schema_editor.connection.vendor == 'mysql':
+        column = f'{column}({NAME_PREFIX_LENGTH})'
+    elif schema_editor.connection.vendor == 'sqlite':
+        column = f'{column} COLLATE NOCASE'
+    schema_editor.execute(f'CREATE INDEX {schema_editor.quote_name(NAME_INDEX)} '
+                          f'ON {schema_editor.quote_name(Lender._meta.db_table)} ({column})')
+
+
+def drop_name_index(apps, schema_editor):
+    Lender = apps.get_model('lenders', 'Lender')
+    schema_editor.execute(schema_editor.sql_delete_index % {
+        'table': schema_editor.quote_name(Lender._meta.db_table),
+        'name': schema_editor.quote_name(NAME_INDEX),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenders', '0003_lender_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
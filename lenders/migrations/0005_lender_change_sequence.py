@@ -0,0 +1,72 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:22
+
+import importlib
+from django.db import migrations, models
+
+
+name_prefix_index = importlib.import_module('lenders.migrations.0004_lender_name_prefix_index')
+
+
+def create_counter(apps, schema_editor):
+    # the lenders there are already were written before any change sequence number, as 0
+    apps.get_model('lenders', 'LenderChangeCounter').objects.create(pk=1, value=0)
+
+
+def recreate_name_index(apps, schema_editor):
+    # SQLite may add and remove the columns by remaking the table, which drops the name prefix index Meta.indexes does
+    # not declare
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        table = apps.get_model('lenders', 'Lender')._meta.db_table
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, table)
+        if name_prefix_index.NAME_INDEX not in indexes:
+            name_prefix_index.create_name_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenders', '0004_lender_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, recreate_name_index),
+        migrations.CreateModel(
+            name='LenderChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='lendertombstone',
+            name='lender_tombstone_deleted_idx',
+        ),
+        migrations.AddField(
+            model_name='lender',
+            name='created_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lender',
+            name='updated_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lendertombstone',
+            name='deleted_seq',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='lender',
+            index=models.Index(fields=['updated_seq'], name='lender_updated_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lendertombstone',
+            index=models.Index(fields=['deleted_seq'], name='lender_tombstone_seq_idx'),
+        ),
+        migrations.RunPython(recreate_name_index, migrations.RunPython.noop),
+    ]
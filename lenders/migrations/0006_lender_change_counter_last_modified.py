@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:37
+
+import time
+from django.db import migrations, models
+
+
+def start_last_modified(apps, schema_editor):
+    # the lenders may have changed any time before, so the responses served from now on are as new as now
+    apps.get_model('lenders', 'LenderChangeCounter').objects.update(last_modified=int(time.time()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lenders', '0005_lender_change_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lenderchangecounter',
+            name='last_modified',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(start_last_modified, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import time
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.core.validators import MinLengthValidator, MinValueValidator, MaxValueValidator, RegexValidator
 
 class LenderFieldConstraints:
@@ -17,8 +20,102 @@ class LenderFieldConstraints:
     trial_commission_rate_min = 0.0
     trial_commission_rate_max = 500.0
 
+class LenderQuerySet(models.QuerySet):
+
+    def iter_values_list(self, *fields, chunk_size=2000):
+        """
+        Iterate over the value tuples of `fields` in primary key order, chunk_size rows per query.
+        Each chunk is fetched with a keyset (WHERE id > last id ORDER BY id LIMIT chunk_size) instead of one cursor over
+        the whole table, so memory stays flat on every backend, including MySQL whose client buffers whole results.
+        """
+        queryset = self.order_by('pk').values_list('pk', *fields)
+        last_pk = None
+        while True:
+            chunk = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:chunk_size])
+            for row in chunk:
+                yield row[1:]
+            if len(chunk) < chunk_size:
+                return
+            last_pk = chunk[-1][0]
+
+    async def aiter_values_list(self, *fields, chunk_size=2000):
+        """
+        The async counterpart of iter_values_list, the same keyset chunks being fetched with the async ORM.
+        """
+        queryset = self.order_by('pk').values_list('pk', *fields)
+        last_pk = None
+        while True:
+            rows = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = [row async for row in rows[:chunk_size]]
+            for row in chunk:
+                yield row[1:]
+            if len(chunk) < chunk_size:
+                return
+            last_pk = chunk[-1][0]
+
+    def delete(self):
+        """
+        Delete the lenders, recording their tombstones first (so the change counter is locked before the lender rows,
+        as every writer does) and then deleting them by primary key with one DELETE.
+        """
+        with transaction.atomic(using=self.db):
+            found = list(self.values_list('id', 'code'))
+            if not found:
+                return 0, {}
+            LenderTombstone.record(found)
+            return self.model._base_manager.filter(pk__in=[id for id, _ in found]).delete()
+
+
+class LenderChangeCounter(models.Model):
+    """
+    The single row holding the last change sequence number handed out to a transaction writing lenders.
+    """
+    value = models.BigIntegerField(default=0)
+    # when the lenders last changed, in seconds since the epoch: the Last-Modified of the cached lender responses,
+    # which must strictly increase with every change since it has a one second resolution
+    last_modified = models.BigIntegerField(default=0)
+
+    @classmethod
+    def next_value(cls):
+        """
+        Increment the counter within the caller's transaction and return its new value.
+        The UPDATE locks the counter row until the transaction ends, so transactions writing lenders draw their numbers
+        in the order they commit: once a number is committed, every smaller one is too, and /lenders/changes/ can
+        hand the committed value out as a change token without a transaction still open behind it.
+        """
+        if not transaction.get_connection().in_atomic_block:
+            raise transaction.TransactionManagementError('a change sequence number must be drawn in the transaction '
+                                                         'that writes the change')
+        increment = {'value': models.F('value') + 1,
+                     'last_modified': Greatest(models.Value(int(time.time())), models.F('last_modified') + 1)}
+        if not cls.objects.filter(pk=1).update(**increment):
+            cls.objects.get_or_create(pk=1)  # the row migration 0005 inserts is gone, e.g. flushed by a test
+            cls.objects.filter(pk=1).update(**increment)
+        return cls.objects.values_list('value', flat=True).get(pk=1)
+
+    @classmethod
+    def committed_value(cls):
+        """
+        The last change sequence number committed, 0 before any.
+        """
+        return cls.objects.values_list('value', flat=True).filter(pk=1).first() or 0
+
+    @classmethod
+    def committed_state(cls):
+        """
+        The last change sequence number committed and its last_modified, (0, 0) before any.
+        """
+        return cls.objects.values_list('value', 'last_modified').filter(pk=1).first() or (0, 0)
+
+
 class Lender(models.Model):
     created = models.DateTimeField(auto_now_add=True)
+    # set on every save, and by lenders.bulk.update_lenders
+    updated = models.DateTimeField(auto_now=True)
+    # the change sequence numbers (LenderChangeCounter) of the transactions that inserted and last wrote the lender,
+    # which /lenders/changes/ reads changes from
+    created_seq = models.BigIntegerField(default=0, editable=False)
+    updated_seq = models.BigIntegerField(default=0, editable=False)
     name = models.CharField(blank=False,
                             max_length=LenderFieldConstraints.name_max_length,
                             validators=[
@@ -37,5 +134,67 @@ class Lender(models.Model):
                                                           MaxValueValidator(LenderFieldConstraints.trial_commission_rate_max)])
     active = models.BooleanField(default=True)
 
+    objects = LenderQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """
+        Save the lender with a change sequence number drawn in the same transaction.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            self.updated_seq = LenderChangeCounter.next_value()
+            if self._state.adding:
+                self.created_seq = self.updated_seq
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'updated', 'updated_seq'}
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the lender, recording its tombstone first so that the change counter is locked before the lender row.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            LenderTombstone.record([(self.pk, self.code)])
+            return super().delete(*args, **kwargs)
+
+    class Meta:
+        ordering = ['created']
+        # one index per query shape LenderViewSet serves: the ?active= filter followed by each ?ordering= field, and
+        # each ordering on its own (code already has its unique index, which also serves ?code=), the updated time,
+        # and the change sequence range /lenders/changes/ reads; ?search= has the name prefix index of migration 0004,
+        # which cannot be declared here
+        indexes = [
+            models.Index(fields=['created'], name='lender_created_idx'),
+            models.Index(fields=['upfront_commission_rate'], name='lender_upfront_idx'),
+            models.Index(fields=['trial_commission_rate'], name='lender_trial_idx'),
+            models.Index(fields=['active', 'created'], name='lender_active_created_idx'),
+            models.Index(fields=['active', 'upfront_commission_rate'], name='lender_active_upfront_idx'),
+            models.Index(fields=['active', 'trial_commission_rate'], name='lender_active_trial_idx'),
+            models.Index(fields=['updated'], name='lender_updated_idx'),
+            models.Index(fields=['updated_seq'], name='lender_updated_seq_idx'),
+        ]
+
+class LenderTombstone(models.Model):
+    """
+    A deleted lender, kept so that /lenders/changes/ can tell a client syncing incrementally to drop it.
+    """
+    lender_id = models.BigIntegerField()
+    code = models.CharField(max_length=LenderFieldConstraints.code_max_length)
+    deleted = models.DateTimeField(default=timezone.now)
+    # the change sequence number of the transaction that deleted the lender
+    deleted_seq = models.BigIntegerField()
+
+    @classmethod
+    def record(cls, lenders, seq=None):
+        """
+        Insert the tombstones of the (id, code) pairs of lenders about to be deleted, under change sequence number
+        `seq` or one drawn now, and return it. Lender.delete(), LenderQuerySet.delete() and
+        lenders.bulk.delete_lenders record their own, so /lenders/changes/ reports every deleted lender.
+        """
+        seq = seq or LenderChangeCounter.next_value()
+        cls.objects.bulk_create([cls(lender_id=id, code=code, deleted_seq=seq) for id, code in lenders])
+        return seq
+
     class Meta:
-        ordering = ['created']
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['deleted_seq'], name='lender_tombstone_seq_idx'),
+        ]
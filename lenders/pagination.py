@@ -0,0 +1,137 @@
+import datetime
+import functools
+import json
+import operator
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor, _reverse_ordering
+
+
+def basket_page_size(request, page_size_query_param):
+    """
+    The number of codes of a ?code__in= basket (up to LENDER_LOOKUP_MAX_CODES), so that it comes back whole in one
+    page rather than PAGE_SIZE at a time, unless the client asks for a ?page_size=. None without a basket.
+    """
+    codes = request.query_params.get('code__in')
+    if not codes or page_size_query_param in request.query_params:
+        return None
+    return min(len(codes.split(',')), settings.LENDER_LOOKUP_MAX_CODES)
+
+
+class LenderPageNumberPagination(PageNumberPagination):
+    """
+    ?page=n pagination, PAGE_SIZE lenders per page unless the client asks for up to LENDER_MAX_PAGE_SIZE with
+    ?page_size=n.
+    """
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.LENDER_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        return basket_page_size(request, self.page_size_query_param) or super().get_page_size(request)
+
+
+class LenderCursorPagination(CursorPagination):
+    """
+    Opaque ?cursor= pagination (opted in to with ?pagination=cursor): each page is a keyset query on the ordering, so
+    page n costs the same as page 1 and no COUNT(*) is issued.
+    The ordering comes from the view's OrderingFilter (?ordering=, defaulting to the view's `ordering`), made unique
+    with tie breakers, and the cursor holds the value of every field of it for the lender a page starts or ends at.
+    DRF's CursorPagination keys on the first field alone and skips the lenders sharing its value with an OFFSET,
+    which grows page after page over repeated values (?ordering=active, equal rates).
+    """
+    page_size_query_param = 'page_size'
+    # the fields appended to an ordering to make it unique, in its direction; id, which every index ends with on
+    # InnoDB, unless an index serves more: ?ordering=active is served by the (active, created) one
+    tie_breakers = {'active': ['created', 'id']}
+
+    @property
+    def max_page_size(self):
+        return settings.LENDER_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        return basket_page_size(request, self.page_size_query_param) or super().get_page_size(request)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        fields = {field.lstrip('-') for field in ordering}
+        if not fields & {'id', 'pk'}:
+            direction = '-' if ordering[0].startswith('-') else ''
+            ordering += [direction + field for field in self.tie_breakers.get(ordering[0].lstrip('-'), ['id'])
+                         if field not in fields]
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if self.cursor is not None and self.cursor.position is not None:
+            queryset = queryset.filter(self.after(self.position_values(queryset, self.cursor.position), reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        has_position = self.cursor is not None and self.cursor.position is not None
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_position, has_more
+        else:
+            self.has_next, self.has_previous = has_more, has_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, values, reverse):
+        """
+        The lenders after `values` of the ordering fields, in the ordering (before them when reverse):
+        (a > x) OR (a = x AND b > y) OR ..., each comparison in the direction of its field.
+        """
+        clauses, equal = [], {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+        return functools.reduce(operator.or_, clauses)
+
+    def position_values(self, queryset, position):
+        """
+        The ordering field values of a cursor position, converted back by the model fields.
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(position)
+            return [queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [getattr(instance, field.lstrip('-')) for field in ordering]
+        return json.dumps([value.isoformat() if isinstance(value, datetime.datetime) else value for value in values],
+                          separators=(',', ':'))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # an empty page, reached backwards, is followed by what followed its cursor
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
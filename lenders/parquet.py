@@ -0,0 +1,139 @@
+import importlib.util
+import io
+from lenders.models import Lender
+
+
+# Parquet support is optional: it needs the pyarrow package, which is imported where a parquet file is first read or
+# written rather than at module import (like pandas)
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def parquet_errors():
+    """
+    The exceptions meaning an upload is not a readable parquet file.
+    """
+    import pyarrow
+    return (pyarrow.ArrowException,)
+
+
+def lender_schema(fields):
+    """
+    The arrow schema of the given Lender fields, typed after the model fields so that no value is ever formatted or
+    parsed as text.
+    """
+    import pyarrow as pa
+    types = {'BigAutoField': pa.int64(), 'AutoField': pa.int64(), 'CharField': pa.string(),
+             'FloatField': pa.float64(), 'BooleanField': pa.bool_(), 'DateTimeField': pa.timestamp('us', tz='UTC')}
+    return pa.schema([(field, types[Lender._meta.get_field(field).get_internal_type()]) for field in fields])
+
+
+class _Sink(io.RawIOBase):
+    """
+    A write-only file keeping what was written until taken, and the position of the whole file for the writer.
+    """
+    def __init__(self):
+        self.chunks, self.position = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetBlockWriter:
+    """
+    Write blocks of value tuples as the row groups of one parquet file, handing back the bytes of the file written so
+    far after every block, so that it can be streamed without ever holding the whole file.
+    """
+    def __init__(self, schema):
+        import pyarrow.parquet as pq
+        self.schema, self.sink = schema, _Sink()
+        self.writer = pq.ParquetWriter(self.sink, schema)
+
+    def write(self, rows):
+        import pyarrow as pa
+        columns = zip(*rows)
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)], schema=self.schema))
+        return self.sink.take()
+
+    def close(self):
+        self.writer.close()
+        return self.sink.take()
+
+
+def parquet_blocks(fields, rows, rows_per_block=2000):
+    """
+    Write rows (value tuples in the order of fields) as a parquet file of one row group per rows_per_block rows,
+    yielding its bytes as they are written. No rows give a file with the schema and no row groups.
+    """
+    writer = ParquetBlockWriter(lender_schema(fields))
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) == rows_per_block:
+            yield writer.write(block)
+            block = []
+    if block:
+        yield writer.write(block)
+    yield writer.close()
+
+
+async def aparquet_blocks(fields, rows, rows_per_block=2000):
+    """
+    parquet_blocks for an async iterable of rows, as an async generator.
+    """
+    writer = ParquetBlockWriter(lender_schema(fields))
+    block = []
+    async for row in rows:
+        block.append(row)
+        if len(block) == rows_per_block:
+            yield writer.write(block)
+            block = []
+    if block:
+        yield writer.write(block)
+    yield writer.close()
+
+
+def parquet_table_bytes(rows):
+    """
+    A list of dicts as a whole parquet file, the column types being inferred from the values.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _Sink()
+    pq.write_table(pa.Table.from_pylist(rows), sink)
+    return sink.take()
+
+
+def read_lender_parquet(file, chunk_rows):
+    """
+    Yield a parquet file as DataFrames of at most chunk_rows rows, read one record batch at a time, so memory is
+    bounded by the chunk size. The file must be seekable since a parquet file is described by its footer.
+    """
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def read_parquet_rows(file):
+    """
+    Every row of a parquet file as a dict.
+    """
+    import pyarrow.parquet as pq
+    return [row for batch in pq.ParquetFile(file).iter_batches() for row in batch.to_pylist()]
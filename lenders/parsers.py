@@ -0,0 +1,36 @@
+from io import BytesIO
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from lenders.parquet import PARQUET_MEDIA_TYPE, parquet_errors, read_parquet_rows
+
+
+class ParquetParser(BaseParser):
+    """
+    A parquet file as a list of dicts, a row each. Only accepted when pyarrow is installed.
+    """
+    media_type = PARQUET_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:  # no body
+            raise ParseError('Parquet parse error - the body is empty')
+        try:
+            return read_parquet_rows(BytesIO(stream.read()))
+        except parquet_errors() as exc:
+            raise ParseError(f'Parquet parse error - {exc}')
+
+
+class CSVParser(BaseParser):
+    """
+    A UTF-8 csv with a header as a DataFrame, every cell kept as the string that was sent ('' when empty), like the
+    /csv-in-bulk/ importer reads one. Columns are converted by whoever uses them.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import pandas as pd
+        if stream is None:  # no body
+            raise ParseError('CSV parse error - the body is empty')
+        try:
+            return pd.read_csv(stream, dtype=str, keep_default_na=False, encoding='utf-8')
+        except (UnicodeDecodeError, pd.errors.EmptyDataError, pd.errors.ParserError) as exc:
+            raise ParseError(f'CSV parse error - {exc}')
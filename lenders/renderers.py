@@ -1,12 +1,168 @@
+import csv
+import itertools
+import json
+import operator
+from io import StringIO
 from rest_framework.renderers import BaseRenderer
-import pandas as pd
+from lenders.parquet import PARQUET_MEDIA_TYPE, parquet_table_bytes
+
+
+# compact and unescaped, like rest_framework.renderers.JSONRenderer with its default settings
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _write_block(csv_writer, buffer, block):
+    csv_writer.writerows(block)
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+def csv_blocks(header, rows, rows_per_block=2000, lineterminator='\r\n'):
+    """
+    Write rows as csv text in blocks of rows_per_block rows, the header leading the first block.
+    Nothing at all is yielded when there are no rows, matching the empty file the download always gave for no lenders.
+    """
+    buffer = StringIO()
+    csv_writer = csv.writer(buffer, lineterminator=lineterminator)
+    rows = iter(rows)
+    block = list(itertools.islice(rows, rows_per_block))
+    if block:
+        csv_writer.writerow(header)
+    while block:
+        yield _write_block(csv_writer, buffer, block)
+        block = list(itertools.islice(rows, rows_per_block))
+
+
+async def acsv_blocks(header, rows, rows_per_block=2000, lineterminator='\r\n'):
+    """
+    csv_blocks for an async iterable of rows, as an async generator.
+    """
+    buffer = StringIO()
+    csv_writer = csv.writer(buffer, lineterminator=lineterminator)
+    block, first_row = [], True
+    async for row in rows:
+        if first_row:
+            csv_writer.writerow(header)
+            first_row = False
+        block.append(row)
+        if len(block) == rows_per_block:
+            yield _write_block(csv_writer, buffer, block)
+            block = []
+    if block:
+        yield _write_block(csv_writer, buffer, block)
+
+
+def _encode_json_block(fields, block, ndjson):
+    objects = [dict(zip(fields, row)) for row in block]
+    if ndjson:
+        return '\n'.join(map(JSON_ENCODER.encode, objects)) + '\n'
+    return JSON_ENCODER.encode(objects)[1:-1]  # the items of the array, without its brackets
+
+
+def json_blocks(fields, rows, rows_per_block=2000, ndjson=False):
+    """
+    Encode rows (value tuples in the order of fields) as JSON objects in blocks of rows_per_block rows, each block
+    with one call to the encoder: an object per line for NDJSON, otherwise the items of one array whose brackets open
+    the first block and close the last (no rows give '[]' or nothing at all).
+    """
+    rows = iter(rows)
+    prefix = '' if ndjson else '['
+    block = list(itertools.islice(rows, rows_per_block))
+    while block:
+        yield prefix + _encode_json_block(fields, block, ndjson)
+        prefix = '' if ndjson else ','
+        block = list(itertools.islice(rows, rows_per_block))
+    if not ndjson:
+        yield '[]' if prefix == '[' else ']'
+
+
+async def ajson_blocks(fields, rows, rows_per_block=2000, ndjson=False):
+    """
+    json_blocks for an async iterable of rows, as an async generator.
+    """
+    prefix, block = '' if ndjson else '[', []
+    async for row in rows:
+        block.append(row)
+        if len(block) == rows_per_block:
+            yield prefix + _encode_json_block(fields, block, ndjson)
+            prefix, block = '' if ndjson else ',', []
+    if block:
+        yield prefix + _encode_json_block(fields, block, ndjson)
+        prefix = '' if ndjson else ','
+    if not ndjson:
+        yield '[]' if prefix == '[' else ']'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline delimited JSON: one object per line, the results of a page or a list being one line each.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            objects = data
+        else:
+            objects = data['results'] if 'results' in data else [data]
+        return ''.join(JSON_ENCODER.encode(item) + '\n' for item in objects).encode()
+
 
 class CSVRenderer(BaseRenderer):
     media_type = 'text/csv'
     format = 'csv'
-    def render(self, data, media_type=None, renderer_context={}):
-        if 'id' in data:
-            content = [data]
+    # rows written per block by render_blocks
+    rows_per_block = 1000
+
+    def render(self, data, media_type=None, renderer_context=None):
+        return ''.join(self.render_blocks(data))
+
+    def render_blocks(self, data):
+        """
+        Yield the csv of a response in blocks: a page has a row per result, anything else (a lender, an error) is one
+        row. The columns are the keys of the first row, fetched from every row by one precompiled itemgetter, and a
+        list of values rather than objects (the messages of a list shaped error) is one column named 0.
+        The text is the same pandas' DataFrame.to_csv(index=False) wrote, except that an empty page is empty.
+        """
+        if data is None:
+            return
+        if isinstance(data, list):
+            rows = data
+        else:
+            rows = data['results'] if 'results' in data else [data]
+        if not rows:
+            return
+        if not isinstance(rows[0], dict):
+            yield from csv_blocks(['0'], ((row,) for row in rows), self.rows_per_block, lineterminator='\n')
+            return
+        header = list(rows[0])
+        if len(header) == 1:
+            values = map(lambda row: (row[header[0]],), rows)
+        else:
+            values = map(operator.itemgetter(*header), rows)
+        yield from csv_blocks(header, values, self.rows_per_block, lineterminator='\n')
+
+
+class ParquetRenderer(BaseRenderer):
+    """
+    A parquet file with a row per result of a page (anything else, a lender or an error, being one row), the column
+    types inferred from the values. Only offered when pyarrow is installed.
+    """
+    media_type = PARQUET_MEDIA_TYPE
+    format = 'parquet'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            rows = data
         else:
-            content = data['results']
-        return str(pd.DataFrame(data=content).to_csv(index=False))
\ No newline at end of file
+            rows = data['results'] if 'results' in data else [data]
+        return parquet_table_bytes(rows)
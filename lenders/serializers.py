@@ -1,7 +1,22 @@
+import math
+from urllib.parse import quote
+from django.utils.http import RFC3986_SUBDELIMS
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
 from lenders.models import Lender
 
 
+def finite(value):
+    """
+    Reject float('nan') and float('inf'), which pass the min/max validators but cannot be stored.
+    """
+    if not math.isfinite(value):
+        raise serializers.ValidationError(serializers.FloatField.default_error_messages['invalid'])
+    return value
+
+
 class LenderSerializer(serializers.HyperlinkedModelSerializer):
 
     options = serializers.HyperlinkedRelatedField(
@@ -16,4 +31,116 @@ class LenderSerializer(serializers.HyperlinkedModelSerializer):
         lookup_field = 'code'
         extra_kwargs = {
             'url': {'lookup_field': 'code'}
-        }
\ No newline at end of file
+        }
+
+    def validate_upfront_commission_rate(self, value):
+        return finite(value)
+
+    def validate_trial_commission_rate(self, value):
+        return finite(value)
+
+
+class LenderRowsSerializer:
+    """
+    LenderSerializer(lenders, many=True).data, to the byte, for lenders fetched as values_list(*ROW_FIELDS) rows rather
+    than model instances: the detail url is reversed once, with a placeholder code, and every lender's url is that
+    template around its code, and no serializer field runs per lender.
+    (The `options` field of LenderSerializer is never output: a lender has no such attribute, so DRF skips it.)
+    """
+    # 'created' is fetched too since cursor pagination reads the position of the last lender of a page from its row
+    ROW_FIELDS = ['id', 'name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active', 'created']
+    PLACEHOLDER_CODE = 'LENDERCODE'
+
+    def __init__(self, rows, context):
+        self.rows, self.context = rows, context
+
+    def url_template(self):
+        """
+        The (prefix, suffix) of a lender's url around its code, as HyperlinkedIdentityField reverses it for the request
+        (absolute, with the ?format= of the request and any format suffix).
+        """
+        url = reverse('lender-detail', kwargs={'code': self.PLACEHOLDER_CODE}, request=self.context['request'],
+                      format=self.context.get('format'))
+        prefix, suffix = url.split(self.PLACEHOLDER_CODE)
+        return prefix, suffix
+
+    @property
+    def data(self):
+        prefix, suffix = self.url_template()
+        safe = RFC3986_SUBDELIMS + '/~:@'  # what reverse() leaves unquoted in a url argument
+        return [{'id': id, 'url': f'{prefix}{quote(code, safe=safe)}{suffix}', 'name': name, 'code': code,
+                 'upfront_commission_rate': upfront_commission_rate, 'trial_commission_rate': trial_commission_rate,
+                 'active': active}
+                for id, name, code, upfront_commission_rate, trial_commission_rate, active, _ in self.rows]
+
+
+class LenderBulkListSerializer(serializers.ListSerializer):
+    """
+    LenderBulkSerializer(many=True): every item is validated on its own and an invalid item does not fail the list.
+    After is_valid(), validated_data holds the valid items, `positions` their position in the request and
+    `item_errors` maps the position of every invalid item to its errors.
+
+    Codes are checked unique with one IN query for the whole list rather than one query per item, and within the list
+    the first valid item of a code wins. A partial list (PATCH) identifies lenders by code instead, which is then
+    required but never checked unique.
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if not data:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['empty']]},
+                                              code='empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        validated_items, self.positions, self.item_errors = [], [], {}
+        for position, item in enumerate(data):
+            try:
+                validated = self.child.run_validation(item)
+                if self.partial and 'code' not in validated:
+                    raise serializers.ValidationError({'code': [self.child.fields['code'].error_messages['required']]})
+            except serializers.ValidationError as exc:
+                self.item_errors[position] = exc.detail
+            else:
+                validated_items.append(validated)
+                self.positions.append(position)
+        if not self.partial:
+            validated_items = self.drop_duplicate_codes(validated_items)
+        return validated_items
+
+    def drop_duplicate_codes(self, validated_items):
+        stored = set(Lender.objects.in_bulk({item['code'] for item in validated_items}, field_name='code'))
+        # the message of the UniqueValidator ModelSerializer gives the field on a single POST
+        field = Lender._meta.get_field('code')
+        message = [field.error_messages['unique'] % {'model_name': Lender._meta.verbose_name,
+                                                     'field_label': field.verbose_name}]
+        unique_items, unique_positions = [], []
+        for position, item in zip(self.positions, validated_items):
+            if item['code'] in stored:
+                self.item_errors[position] = {'code': message}
+            else:
+                stored.add(item['code'])
+                unique_items.append(item)
+                unique_positions.append(position)
+        self.positions = unique_positions
+        return unique_items
+
+    def run_validation(self, data=serializers.empty):
+        # an invalid item is reported in item_errors, the list itself is only invalid when it is not a list of items
+        return self.to_internal_value(data)
+
+
+class LenderBulkSerializer(LenderSerializer):
+    """
+    LenderSerializer for the bulk endpoints, see LenderBulkListSerializer.
+    """
+    class Meta(LenderSerializer.Meta):
+        list_serializer_class = LenderBulkListSerializer
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # uniqueness is checked by LenderBulkListSerializer for the whole list at once
+        fields['code'].validators = [v for v in fields['code'].validators if not isinstance(v, UniqueValidator)]
+        return fields
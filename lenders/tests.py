@@ -1,5 +1,32 @@
-from django.test import TestCase
+import base64
+import datetime
+import itertools
+import json
+import math
+import string
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+import pandas as pd
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.generics import GenericAPIView
 from lenders.models import Lender
+from lenders.views import LenderViewSet
+from lenders.filtersets import LenderFilterSet
+from lenders.benchmarking import seed_lenders, latency_summary, LIST_QUERY_SHAPES
+from lenders.caching import response_cache_stats
+from lenders.renderers import CSVRenderer, json_blocks, ajson_blocks
+from lenders.commissions import INVALID_LOAN_AMOUNT, INVALID_TERM_MONTHS, UNKNOWN_LENDER, INACTIVE_LENDER
+from lenders.parquet import parquet_available, parquet_blocks, parquet_table_bytes, read_parquet_rows, \
+    PARQUET_MEDIA_TYPE
+from lenders.validation import validate_lender_frame, MissingColumnsError
 from django.db.utils import DataError
 from django.core.exceptions import ValidationError
 
@@ -217,4 +244,847 @@ class LenderTestCase(TestCase):
                                                 trial_commission_rate=1000,
                                                 active='A')
             test_object.full_clean()
-        self.assertTrue('value must be either True or False' in str(context.exception))
\ No newline at end of file
+        self.assertTrue('value must be either True or False' in str(context.exception))
+
+    def test_iter_values_list_fetches_in_primary_key_chunks(self):
+        codes = [code for (code,) in Lender.objects.order_by('pk').values_list('code')]
+        with self.assertNumQueries(2):
+            self.assertEqual([code for (code,) in Lender.objects.iter_values_list('code', chunk_size=2)], codes)
+        self.assertEqual(list(Lender.objects.filter(active=False).iter_values_list('code', 'active')),
+                         [('SVB', False)])
+
+
+class LenderPaginationTestCase(TestCase):
+    def setUp(self):
+        for i, letter in enumerate(string.ascii_uppercase[:12]):
+            Lender.objects.create(name=f'Lender {letter}', code=f'PG{letter}', upfront_commission_rate=i % 4,
+                                  trial_commission_rate=12 - i, active=i % 3 != 0)
+
+    def crawl(self, url):
+        codes, requests = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(url).json()
+            self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+            codes.extend(each['code'] for each in page['results'])
+            url, requests = page['next'], requests + 1
+        return codes, requests
+
+    def test_page_numbers_are_still_the_default(self):
+        page = self.client.get('/lenders/').json()
+        self.assertEqual((page['count'], len(page['results'])), (12, 5))
+
+    def test_cursor_pagination_visits_every_lender_once_in_order(self):
+        codes, requests = self.crawl('/lenders/?pagination=cursor')
+        self.assertEqual(codes, list(Lender.objects.order_by('created', 'id').values_list('code', flat=True)))
+        self.assertEqual(requests, 3)
+
+    def test_cursor_pagination_follows_the_ordering_and_filters(self):
+        codes, _ = self.crawl('/lenders/?pagination=cursor&ordering=-trial_commission_rate&active=True&page_size=3')
+        self.assertEqual(codes, list(Lender.objects.filter(active=True).order_by('-trial_commission_rate')
+                                     .values_list('code', flat=True)))
+
+    def test_cursor_pages_over_repeated_values_are_keyset_queries(self):
+        # 12 lenders, 8 of them active and upfront rates repeating every 4
+        for ordering, expected in (('active', ['active', 'created', 'id']),
+                                   ('-upfront_commission_rate', ['-upfront_commission_rate', '-id'])):
+            with self.subTest(ordering=ordering):
+                url, codes = f'/lenders/?pagination=cursor&ordering={ordering}&page_size=2', []
+                while url:
+                    with CaptureQueriesContext(connection) as queries:
+                        page = self.client.get(url).json()
+                    self.assertFalse([query for query in queries if 'OFFSET' in query['sql']])
+                    codes.extend(each['code'] for each in page['results'])
+                    url, previous = page['next'], page['previous']
+                self.assertEqual(codes, list(Lender.objects.order_by(*expected).values_list('code', flat=True)))
+                # and back again from the last page
+                codes = [each['code'] for each in page['results']]
+                while previous:
+                    page = self.client.get(previous).json()
+                    codes[:0] = [each['code'] for each in page['results']]
+                    previous = page['previous']
+                self.assertEqual(codes, list(Lender.objects.order_by(*expected).values_list('code', flat=True)))
+
+    def test_invalid_cursors(self):
+        for cursor in ('nonsense', base64.b64encode(b'p=%5B1%5D').decode(),
+                       base64.b64encode(b'p=%5B%22soon%22%2C1%5D').decode()):
+            self.assertEqual(self.client.get(f'/lenders/?pagination=cursor&cursor={cursor}').status_code, 404, cursor)
+
+    @override_settings(LENDER_MAX_PAGE_SIZE=10)
+    def test_page_size_is_client_selectable_up_to_the_maximum(self):
+        self.assertEqual(len(self.client.get('/lenders/?page_size=8').json()['results']), 8)
+        self.assertEqual(len(self.client.get('/lenders/?page_size=500').json()['results']), 10)
+        self.assertEqual(len(self.client.get('/lenders/?pagination=cursor&page_size=500').json()['results']), 10)
+
+
+class LenderQueryPlanTestCase(TransactionTestCase):
+    """
+    Every filter/ordering combination of the lenders list is served by an index rather than a scan and a sort.
+    (A TransactionTestCase because MySQL's ANALYZE TABLE commits.)
+    """
+    def expected_index(self, filters, ordering):
+        field = ordering[0].lstrip('-')
+        if field == 'active':
+            return 'lender_active_'
+        short_name = {'upfront_commission_rate': 'upfront', 'trial_commission_rate': 'trial'}.get(field, field)
+        # MySQL filters with `active = true` and seeks the composite index, while Django filters SQLite with a bare
+        # `WHERE active` that SQLite cannot seek, so there the ordering index is walked instead
+        if filters and connection.vendor == 'mysql':
+            return f'lender_active_{short_name}_idx'
+        return f'lender_{short_name}_idx'
+
+    def test_list_query_shapes_use_the_lender_indexes(self):
+        seed_lenders(300)
+        for filters, ordering in LIST_QUERY_SHAPES:
+            with self.subTest(filters=filters, ordering=ordering):
+                plan = Lender.objects.filter(**filters).order_by(*ordering)[:5].explain()
+                self.assertIn(self.expected_index(filters, ordering), plan)
+
+    def test_search_and_rate_ranges_use_their_indexes(self):
+        seed_lenders(300)
+        for data, index in (({'search': 'benchmark_lender_AB'}, 'lender_name_prefix_idx'),
+                            ({'upfront_commission_rate__gte': 10, 'upfront_commission_rate__lte': 20},
+                             'lender_upfront_idx'),
+                            ({'trial_commission_rate__gte': 290}, 'lender_trial_idx')):
+            with self.subTest(data=data):
+                plan = LenderFilterSet(data, Lender.objects.all()).qs.order_by('created', 'id')[:5].explain()
+                self.assertIn(index, plan)
+
+
+class LenderResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cba = Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                                         trial_commission_rate=23, active=True)
+
+    def test_repeated_requests_are_served_from_the_cache(self):
+        first = self.client.get('/lenders/CBA/')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get('/lenders/CBA/')
+        self.assertEqual(len(queries), 1)  # the change counter
+        self.assertEqual(second.content, first.content)
+        self.assertEqual((second['ETag'], second['Last-Modified']), (first['ETag'], first['Last-Modified']))
+        self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_query_params_and_formats_are_cached_separately(self):
+        for url in ['/lenders/', '/lenders/?active=True', '/lenders/?format=csv', '/lenders/CBA/?format=csv']:
+            self.client.get(url)
+        self.assertEqual(self.client.get('/lenders/?format=csv')['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(self.client.get('/lenders/?active=True').json()['count'], 1)
+        self.assertEqual(response_cache_stats(), {'hits': 2, 'misses': 4})
+
+    def test_conditional_requests_get_not_modified(self):
+        response = self.client.get('/lenders/CBA/')
+        self.assertEqual(self.client.get('/lenders/CBA/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/lenders/CBA/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                         .status_code, 304)
+        self.assertEqual(self.client.get('/lenders/CBA/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_saving_or_deleting_a_lender_invalidates_the_cache(self):
+        before = self.client.get('/lenders/CBA/')
+        self.cba.upfront_commission_rate = 13
+        self.cba.save()
+        after = self.client.get('/lenders/CBA/', HTTP_IF_NONE_MATCH=before['ETag'],
+                                HTTP_IF_MODIFIED_SINCE=before['Last-Modified'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['upfront_commission_rate'], 13)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.cba.delete()
+        self.assertEqual(self.client.get('/lenders/CBA/').status_code, 404)
+        self.assertEqual(self.client.get('/lenders/').json()['count'], 0)
+
+    def test_writes_of_another_process_invalidate_the_cache(self):
+        before = self.client.get('/lenders/CBA/')
+        # another process, with a local-memory cache of its own, updates the lender
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                               'LOCATION': 'another process'}}):
+            self.client.force_login(User.objects.create_user('bulk', password='bulk'))
+            self.client.patch('/lenders/bulk/', [{'code': 'CBA', 'upfront_commission_rate': 13}],
+                              content_type='application/json')
+        after = self.client.get('/lenders/CBA/', HTTP_IF_NONE_MATCH=before['ETag'],
+                                HTTP_IF_MODIFIED_SINCE=before['Last-Modified'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['upfront_commission_rate'], 13)
+        self.assertEqual(response_cache_stats(), {'hits': 0, 'misses': 2})
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get('/lenders/CBA/?format=api')
+        self.client.get('/lenders/CBA/?format=api')
+        self.assertEqual(response_cache_stats(), {'hits': 0, 'misses': 0})
+
+    def test_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                                   'LOCATION': directory}}):
+                first = self.client.get('/lenders/CBA/')
+                self.assertEqual(self.client.get('/lenders/CBA/').content, first.content)
+                self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1})
+
+
+class CSVRendererTestCase(TestCase):
+    def setUp(self):
+        self.results = [
+            {'id': 1, 'url': 'http://testserver/lenders/CBA/', 'name': 'Commonwealth Bank, "CBA"', 'code': 'CBA',
+             'upfront_commission_rate': 12.0, 'trial_commission_rate': 0.1 + 0.2, 'active': True, 'options': None},
+            {'id': 2, 'url': 'http://testserver/lenders/SVB/', 'name': 'Silicon\nValley', 'code': 'SVB',
+             'upfront_commission_rate': 1e16, 'trial_commission_rate': 200.0, 'active': False, 'options': None},
+        ]
+
+    def test_output_is_what_pandas_wrote(self):
+        page = {'count': 2, 'next': None, 'previous': None, 'results': self.results}
+        for data, content in [(page, self.results), (self.results[0], [self.results[0]]),
+                              ({'detail': 'Not found.'}, [{'detail': 'Not found.'}]),
+                              (['Expected a list of items.'], ['Expected a list of items.'])]:
+            self.assertEqual(CSVRenderer().render(data), pd.DataFrame(data=content).to_csv(index=False))
+
+    def test_empty_page_renders_nothing(self):
+        self.assertEqual(CSVRenderer().render({'count': 0, 'next': None, 'previous': None, 'results': []}), '')
+        self.assertEqual(CSVRenderer().render(None), '')
+
+    def test_pages_are_rendered_in_blocks(self):
+        renderer = CSVRenderer()
+        renderer.rows_per_block = 1
+        blocks = list(renderer.render_blocks({'results': self.results}))
+        self.assertEqual(len(blocks), 2)
+        self.assertTrue(blocks[0].startswith('id,url,name,'))
+
+    def test_list_and_detail_csv_responses(self):
+        Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                              trial_commission_rate=23, active=True)
+        self.assertEqual(self.client.get('/lenders/?format=csv').content.decode().splitlines()[1:],
+                         self.client.get('/lenders/CBA/?format=csv').content.decode().splitlines()[1:])
+        self.assertEqual(self.client.get('/lenders/XYZ/?format=csv').content, b'detail\nNot found.\n')
+
+    def test_list_shaped_errors(self):
+        self.client.force_login(User.objects.create_user('csv', password='csv'))
+        response = self.client.post('/lenders/commissions/?format=csv', {'code': 'CBA'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content,
+                         b'0\n"expected a list of loans, each an object with code, loan_amount, term_months"\n')
+        response = self.client.delete('/lenders/bulk/?format=csv', {'code': 'CBA'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, b'0\n"Expected a list of items but got type ""dict""."\n')
+
+
+class LenderBulkTestCase(TestCase):
+    def setUp(self):
+        Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                              trial_commission_rate=23, active=True)
+        Lender.objects.create(name='Westpac', code='WBC', upfront_commission_rate=11, trial_commission_rate=13,
+                              active=True)
+        self.client.force_login(User.objects.create_user('bulk', password='bulk'))
+
+    def assertNumStatements(self, number):
+        """
+        assertNumQueries not counting the savepoints of the atomic blocks nested in the test's transaction.
+        """
+        return self.StatementCounter(self, number)
+
+    class StatementCounter(CaptureQueriesContext):
+        def __init__(self, test_case, number):
+            super().__init__(connection)
+            self.test_case, self.number = test_case, number
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            super().__exit__(exc_type, exc_value, traceback)
+            if exc_type is None:
+                statements = [query['sql'] for query in self.captured_queries if 'SAVEPOINT' not in query['sql']]
+                self.test_case.assertEqual(len(statements), self.number, statements)
+
+    def lender(self, code, **fields):
+        return {'name': f'Lender {code}', 'code': code, 'upfront_commission_rate': 1.5, 'trial_commission_rate': 2,
+                'active': True, **fields}
+
+    def test_create(self):
+        items = [self.lender('ABC'), self.lender('CBA'), self.lender('abc'), self.lender('DEF', active=False),
+                 self.lender('ABC'), self.lender('GHI', upfront_commission_rate='nan')]
+        # session and user, one IN query, the change counter's UPDATE and SELECT, one INSERT
+        with self.assertNumStatements(2 + 4):
+            response = self.client.post('/lenders/bulk/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        report = response.json()
+        self.assertEqual([entry['item']['code'] for entry in report['items_added']], ['ABC', 'DEF'])
+        self.assertEqual(report['items_added'][1]['item']['url'], 'http://testserver/lenders/DEF/')
+        self.assertEqual(Lender.objects.get(code='DEF').active, False)
+        self.assertEqual([(entry['item']['code'], entry['exception']) for entry in report['items_not_added']], [
+            ('CBA', {'code': ['lender with this code already exists.']}),
+            ('abc', {'code': ['only capital alphabets [A-Z] are allowed.']}),
+            ('ABC', {'code': ['lender with this code already exists.']}),
+            ('GHI', {'upfront_commission_rate': ['A valid number is required.']}),
+        ])
+
+        response = self.client.post('/lenders/bulk/', [self.lender('XYZ')], content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_shape_and_size(self):
+        for data in ({'code': 'ABC'}, []):
+            response = self.client.post('/lenders/bulk/', data, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        with override_settings(LENDER_BULK_MAX_ITEMS=1):
+            response = self.client.post('/lenders/bulk/', [self.lender('ABC'), self.lender('DEF')],
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Lender.objects.filter(code='ABC').exists())
+
+    def test_partial_update(self):
+        items = [{'code': 'CBA', 'active': False}, {'code': 'WBC', 'name': 'Westpac'}, {'code': 'XYZ', 'active': False},
+                 {'active': False}, {'code': 'CBA', 'trial_commission_rate': 600}]
+        # session and user, one IN query, the change counter's UPDATE and SELECT, one UPDATE
+        with self.assertNumStatements(2 + 4):
+            response = self.client.patch('/lenders/bulk/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        report = response.json()
+        self.assertEqual([(entry['item']['code'], entry['item']['active']) for entry in report['items_updated']],
+                         [('CBA', False)])
+        self.assertEqual([entry['item']['code'] for entry in report['items_unchanged']], ['WBC'])
+        self.assertEqual([(entry['item'], entry['exception']) for entry in report['items_not_updated']], [
+            ({'code': 'XYZ', 'active': False}, {'code': ['Not found.']}),
+            ({'active': False}, {'code': ['This field is required.']}),
+            ({'code': 'CBA', 'trial_commission_rate': 600},
+             {'trial_commission_rate': ['Ensure this value is less than or equal to 500.0.']}),
+        ])
+        self.assertEqual(Lender.objects.get(code='CBA').active, False)
+
+    def test_delete(self):
+        # session and user, one SELECT, the change counter's UPDATE and SELECT, one tombstone INSERT and one DELETE
+        with self.assertNumStatements(2 + 5):
+            response = self.client.delete('/lenders/bulk/', ['CBA', 'XYZ', 'CBA'], content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json(), {
+            'items_deleted': [{'item': 'CBA', 'exception': None}],
+            'items_not_deleted': [{'item': 'XYZ', 'exception': {'code': ['Not found.']}}],
+        })
+        self.assertEqual(list(Lender.objects.values_list('code', flat=True)), ['WBC'])
+
+    def test_bulk_writes_invalidate_the_response_cache(self):
+        self.assertEqual(len(self.client.get('/lenders/?format=json').json()['results']), 2)
+        self.client.post('/lenders/bulk/', [self.lender('ABC')], content_type='application/json')
+        self.assertEqual(len(self.client.get('/lenders/?format=json').json()['results']), 3)
+        self.client.patch('/lenders/bulk/', [{'code': 'ABC', 'name': 'Renamed'}], content_type='application/json')
+        self.assertEqual(self.client.get('/lenders/ABC/?format=json').json()['name'], 'Renamed')
+        self.client.delete('/lenders/bulk/', ['ABC'], content_type='application/json')
+        self.assertEqual(self.client.get('/lenders/ABC/?format=json').status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.post('/lenders/bulk/', [self.lender('ABC')], content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+class LenderValidationParityTestCase(TestCase):
+    """
+    lenders.validation must reject exactly the rows, with exactly the messages, that calling full_clean() and save()
+    on every row in turn would, the only difference being that non-finite rates are rejected as invalid.
+    """
+    edge_values = {
+        'name': ['Westpac', '', ' ', 'N' * 1024, 'N' * 1025, 'Bänk\n"quoted", name', None, 12],
+        'code': ['', 'AB', 'ABCD', 'abc', 'A1C', 'AB\n', ' AB', 'ÄBC', None, 'CBA', 'DUP', 'DUP', 'NEW'],
+        'upfront_commission_rate': ['0', '500', '-0.0001', '500.0001', 'nan', 'inf', '-inf', '1e2', 'abc', '',
+                                    ' 5 ', None, 7, 499.5],
+        'trial_commission_rate': ['0.0', '250', '-1', '501', 'NaN', 'Infinity', '5e-1', 'x', '', None],
+        'active': [True, False, 'True', 'False', 't', 'f', '1', '0', 1, 0, 'TRUE', 'yes', '', None],
+    }
+
+    def setUp(self):
+        Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=12,
+                              trial_commission_rate=23, active=True)
+
+    def rows(self):
+        """
+        Every edge value of every field in a row of otherwise valid values, then a few rows mixing bad values.
+        """
+        valid = {'name': 'Lender', 'upfront_commission_rate': '1.5', 'trial_commission_rate': '2', 'active': 'True'}
+        codes = (''.join(letters) for letters in itertools.product(string.ascii_uppercase, repeat=3) if
+                 ''.join(letters) not in ('CBA', 'DUP', 'NEW'))
+        rows = []
+        for field, values in self.edge_values.items():
+            for value in values:
+                rows.append({**valid, 'code': next(codes), field: value})
+        for values in zip(*[itertools.cycle(values) for values in self.edge_values.values()]):
+            rows.append(dict(zip(self.edge_values, values)))
+            if len(rows) > 100:
+                break
+        return rows
+
+    def saved_one_by_one(self, rows):
+        expected = {}
+        for position, row in enumerate(rows):
+            lender = Lender(**row)
+            try:
+                lender.full_clean()
+            except ValidationError as e:
+                expected[position] = e.message_dict
+            errors = expected.get(position, {})
+            for field in ('upfront_commission_rate', 'trial_commission_rate'):
+                value = getattr(lender, field)
+                if field not in errors and isinstance(value, float) and not math.isfinite(value):
+                    errors[field] = [Lender._meta.get_field(field).error_messages['invalid'] % {'value': row[field]}]
+            if errors:
+                expected[position] = errors
+            else:
+                lender.save()
+        return expected
+
+    def test_errors_are_the_ones_full_clean_gives(self):
+        rows = self.rows()
+        df = pd.DataFrame(rows, dtype=object)
+        errors, values, existing = validate_lender_frame(df)
+        self.assertEqual(list(existing), ['CBA'])
+        expected = self.saved_one_by_one(rows)
+        self.assertEqual(errors, expected)
+        for position, row in enumerate(rows):
+            if position not in errors:
+                lender = Lender.objects.get(code=values['code'][position])
+                for field in row:
+                    self.assertEqual(values[field][position], getattr(lender, field), (position, field))
+
+    def test_existing_codes_are_accepted_unless_rejected(self):
+        row = {'name': 'Lender', 'code': 'CBA', 'upfront_commission_rate': '1', 'trial_commission_rate': '2',
+               'active': 'False'}
+        errors, values, existing = validate_lender_frame(pd.DataFrame([row, row]), reject_existing=False)
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(existing['CBA'].name, 'Commonwealth Bank')
+        self.assertEqual(values['active'], [False, False])
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(MissingColumnsError, 'missing column(s): active'):
+            validate_lender_frame(pd.DataFrame([{'name': 'Lender', 'code': 'ABC', 'upfront_commission_rate': 1,
+                                                 'trial_commission_rate': 1}]))
+
+    def test_one_query_however_many_rows(self):
+        df = pd.DataFrame({'name': ['Lender'] * 5000, 'code': ['ABC', 'CBA'] * 2500, 'upfront_commission_rate': 1.0,
+                           'trial_commission_rate': '2', 'active': True})
+        with self.assertNumQueries(1):
+            errors, values, existing = validate_lender_frame(df)
+        self.assertEqual(len(errors), 4999)
+
+
+class LenderExportTestCase(TestCase):
+    def setUp(self):
+        for code, active in (('CBA', True), ('WBC', False), ('SVB', True)):
+            Lender.objects.create(name=f'Lender "{code}" ✓', code=code, upfront_commission_rate=12.5,
+                                  trial_commission_rate=0.1 + 0.2, active=active)
+        self.expected = list(Lender.objects.order_by('id').values(
+            'id', 'name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active'))
+
+    def export(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response['Content-Type'], b''.join(response.streaming_content).decode()
+
+    def test_json_array(self):
+        with mock.patch('lenders.views.EXPORT_CHUNK_ROWS', 2):
+            content_type, content = self.export('/lenders/export/')
+        self.assertEqual(content_type, 'application/json')
+        self.assertEqual(json.loads(content), self.expected)
+        self.assertEqual(self.export('/lenders/export/?code=XYZ')[1], '[]')
+
+    def test_ndjson(self):
+        for headers in ({'HTTP_ACCEPT': 'application/x-ndjson'}, {}):
+            with mock.patch('lenders.views.EXPORT_CHUNK_ROWS', 2):
+                content_type, content = self.export('/lenders/export/' + ('' if headers else '?format=ndjson'),
+                                                    **headers)
+            self.assertEqual(content_type, 'application/x-ndjson')
+            self.assertEqual([json.loads(line) for line in content.splitlines()], self.expected)
+        self.assertEqual(self.export('/lenders/export/?format=ndjson&code=XYZ')[1], '')
+
+    def test_filters(self):
+        content = self.export('/lenders/export/?active=True&ordering=-code')[1]
+        self.assertEqual([lender['code'] for lender in json.loads(content)], ['CBA', 'SVB'])
+
+    def test_blocks(self):
+        rows = [(i, f'{i}') for i in range(5)]
+        for rows_per_block in (1, 2, 5, 10):
+            blocks = list(json_blocks(['a', 'b'], rows, rows_per_block))
+            self.assertEqual(json.loads(''.join(blocks)), [{'a': i, 'b': f'{i}'} for i in range(5)])
+            ndjson_blocks = list(json_blocks(['a', 'b'], rows, rows_per_block, ndjson=True))
+            self.assertEqual(len(ndjson_blocks), math.ceil(5 / rows_per_block))
+            self.assertEqual(''.join(ndjson_blocks), ''.join(f'{{"a":{i},"b":"{i}"}}\n' for i in range(5)))
+
+    async def test_async_blocks_are_the_same(self):
+        async def rows(n):
+            for i in range(n):
+                yield (i, f'{i}')
+        for n, ndjson in itertools.product((0, 1, 4, 5), (False, True)):
+            self.assertEqual([block async for block in ajson_blocks(['a', 'b'], rows(n), 2, ndjson)],
+                             list(json_blocks(['a', 'b'], ((i, f'{i}') for i in range(n)), 2, ndjson)))
+
+    async def test_asgi_export_is_an_async_stream(self):
+        response = await self.async_client.get('/lenders/export/?format=ndjson')
+        self.assertTrue(response.is_async)
+        content = b''.join([block async for block in response.streaming_content]).decode()
+        self.assertEqual([json.loads(line) for line in content.splitlines()], self.expected)
+
+
+@skipUnless(parquet_available(), 'pyarrow is not installed')
+class LenderParquetTestCase(TestCase):
+    def setUp(self):
+        for code, active in (('CBA', True), ('WBC', False)):
+            Lender.objects.create(name=f'Lender "{code}" ✓', code=code, upfront_commission_rate=12.5,
+                                  trial_commission_rate=0.1 + 0.2, active=active)
+        self.expected = list(Lender.objects.order_by('id').values(
+            'id', 'name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active'))
+
+    def rows(self, response):
+        self.assertEqual(response['Content-Type'], PARQUET_MEDIA_TYPE)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return read_parquet_rows(BytesIO(content))
+
+    def test_list_and_detail(self):
+        listed = self.rows(self.client.get('/lenders/?format=parquet'))
+        self.assertEqual([row['code'] for row in listed], ['CBA', 'WBC'])
+        self.assertEqual(listed[0]['url'], 'http://testserver/lenders/CBA/?format=parquet')
+        self.assertEqual(self.rows(self.client.get('/lenders/CBA/?format=parquet')), listed[:1])
+        self.assertEqual(self.rows(self.client.get('/lenders/XYZ/?format=parquet')), [{'detail': 'Not found.'}])
+
+    def test_export_is_streamed_a_row_group_per_chunk(self):
+        with mock.patch('lenders.views.EXPORT_CHUNK_ROWS', 1):
+            response = self.client.get('/lenders/export/?format=parquet')
+            self.assertEqual(self.rows(response), self.expected)
+        self.assertEqual(self.rows(self.client.get('/lenders/export/?format=parquet&code=XYZ')), [])
+
+    def test_blocks_are_one_file(self):
+        blocks = list(parquet_blocks(['code', 'active'], [('A', True), ('B', False), ('C', True)], 2))
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(read_parquet_rows(BytesIO(b''.join(blocks))),
+                         [{'code': 'A', 'active': True}, {'code': 'B', 'active': False}, {'code': 'C', 'active': True}])
+
+    async def test_asgi_export_is_the_same_file(self):
+        response = await self.async_client.get('/lenders/export/?format=parquet')
+        self.assertTrue(response.is_async)
+        content = b''.join([block async for block in response.streaming_content])
+        self.assertEqual(read_parquet_rows(BytesIO(content)), self.expected)
+
+    def test_bulk_create_from_a_parquet_body(self):
+        self.client.force_login(User.objects.create_user('bulk', password='bulk'))
+        body = parquet_table_bytes([
+            {'name': 'Parquet Bank', 'code': 'PQB', 'upfront_commission_rate': 1.5, 'trial_commission_rate': 2.0,
+             'active': True},
+            {'name': 'Copy Bank', 'code': 'CBA', 'upfront_commission_rate': 1.0, 'trial_commission_rate': 2.0,
+             'active': True}])
+        response = self.client.post('/lenders/bulk/', body, content_type=PARQUET_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([each['item']['code'] for each in response.json()['items_added']], ['PQB'])
+        self.assertEqual([each['item']['code'] for each in response.json()['items_not_added']], ['CBA'])
+        response = self.client.post('/lenders/bulk/', b'not parquet', content_type=PARQUET_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+
+
+class LenderCommissionTestCase(TestCase):
+    def setUp(self):
+        Lender.objects.create(name='Commonwealth Bank', code='CBA', upfront_commission_rate=1.5,
+                              trial_commission_rate=0.3, active=True)
+        Lender.objects.create(name='Westpac', code='WBC', upfront_commission_rate=1, trial_commission_rate=0.2,
+                              active=False)
+        self.client.force_login(User.objects.create_user('pricer', password='pricer'))
+
+    def price(self, body, content_type='application/json', url='/lenders/commissions/'):
+        response = self.client.post(url, body if content_type == 'text/csv' else json.dumps(body),
+                                    content_type=content_type)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_loans_are_priced_or_reported_in_order(self):
+        loans = [{'code': 'CBA', 'loan_amount': 100000, 'term_months': 24},
+                 {'code': 'CBA', 'loan_amount': '333.33', 'term_months': 7},
+                 {'code': 'WBC', 'loan_amount': 1000, 'term_months': 12},
+                 {'code': 'XYZ', 'loan_amount': 1000, 'term_months': 12},
+                 {'code': 7, 'loan_amount': 1000, 'term_months': 12},
+                 {'code': 'CBA', 'loan_amount': -1, 'term_months': 'soon'},
+                 {'code': 'CBA', 'loan_amount': 1000}]
+        with CaptureQueriesContext(connection) as queries:
+            response, content = self.price(loans)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(len([query for query in queries if 'lenders_lender' in query['sql']]), 1)
+        self.assertEqual([(loan['upfront_commission'], loan['trial_commission'], loan['error'])
+                          for loan in json.loads(content)], [
+            (1500.0, 600.0, None),
+            (5.0, 0.58, None),
+            (None, None, INACTIVE_LENDER),
+            (None, None, UNKNOWN_LENDER),
+            (None, None, UNKNOWN_LENDER),
+            (None, None, INVALID_LOAN_AMOUNT),
+            (None, None, INVALID_TERM_MONTHS),
+        ])
+        self.assertEqual(json.loads(content)[1]['loan_amount'], 333.33)
+
+    def test_commissions_round_half_up_to_the_cent(self):
+        # 1.5% of 3 and of 67 are the ties 0.045 and 1.005, which np.round takes down to 0.04 and 1.0
+        response, content = self.price([{'code': 'CBA', 'loan_amount': amount, 'term_months': 12}
+                                        for amount in (3, 67, 1)])
+        self.assertEqual([loan['upfront_commission'] for loan in json.loads(content)], [0.05, 1.01, 0.02])
+
+    def test_batches_without_string_codes(self):
+        for codes in ([None], [5], [None, 5, ['CBA']]):
+            response, content = self.price([{'code': code, 'loan_amount': 1, 'term_months': 12} for code in codes])
+            self.assertEqual(response.status_code, 207, codes)
+            self.assertEqual([loan['error'] for loan in json.loads(content)], [UNKNOWN_LENDER] * len(codes))
+
+    def test_csv_loans_and_formats(self):
+        body = 'code,loan_amount,term_months\nCBA,1000,12\nNAN,,3\n'
+        response, content = self.price(body, content_type='text/csv', url='/lenders/commissions/?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(content, 'code,loan_amount,term_months,upfront_commission,trial_commission,error\n'
+                                  'CBA,1000.0,12.0,15.0,3.0,\n'
+                                  f'NAN,,3.0,,,{INVALID_LOAN_AMOUNT}\n')
+        response, content = self.price(body, content_type='text/csv', url='/lenders/commissions/?format=ndjson')
+        self.assertEqual([json.loads(line)['upfront_commission'] for line in content.splitlines()], [15.0, None])
+        response, content = self.price([])
+        self.assertEqual((response.status_code, content), (200, '[]'))
+
+    def test_invalid_batches_are_rejected(self):
+        for body, content_type in [({'code': 'CBA'}, 'application/json'), (['CBA'], 'application/json'),
+                                   ('code,loan_amount\nCBA,1\n', 'text/csv'), ('', 'text/csv')]:
+            response = self.client.post('/lenders/commissions/', body if content_type == 'text/csv'
+                                        else json.dumps(body), content_type=content_type)
+            self.assertEqual(response.status_code, 400, body)
+        with override_settings(LENDER_COMMISSION_MAX_LOANS=1):
+            response = self.client.post('/lenders/commissions/', json.dumps([{}, {}]), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        response = self.client.post('/lenders/commissions/', '[]', content_type='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+
+class LenderLookupTestCase(TestCase):
+    def setUp(self):
+        for code in ('CBA', 'WBC', 'SVB', 'ANZ', 'NAB', 'ING', 'AMP'):
+            Lender.objects.create(name=f'Lender {code}', code=code, upfront_commission_rate=1, trial_commission_rate=2,
+                                  active=True)
+
+    def test_code_in_filter_returns_the_whole_basket_in_one_page(self):
+        with self.assertNumQueries(3):  # the change counter of the response cache, the count and the page
+            page = self.client.get('/lenders/?code__in=CBA,WBC,SVB,ANZ,NAB,ING,XYZ').json()
+        self.assertEqual(sorted(lender['code'] for lender in page['results']),
+                         ['ANZ', 'CBA', 'ING', 'NAB', 'SVB', 'WBC'])
+        self.assertEqual(len(self.client.get('/lenders/?code__in=CBA,WBC,SVB&page_size=2').json()['results']), 2)
+        export = self.client.get('/lenders/export/?code__in=CBA,AMP')
+        self.assertEqual([lender['code'] for lender in json.loads(b''.join(export.streaming_content))],
+                         ['CBA', 'AMP'])
+
+    @override_settings(LENDER_LOOKUP_MAX_CODES=2)
+    def test_baskets_are_bounded(self):
+        self.assertEqual(self.client.get('/lenders/?code__in=CBA,WBC').status_code, 200)
+        self.assertEqual(self.client.get('/lenders/?code__in=CBA,WBC,SVB').status_code, 400)
+        response = self.client.post('/lenders/lookup/', ['CBA', 'WBC', 'SVB'], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_lookup_is_keyed_by_code_with_null_for_not_found(self):
+        with self.assertNumQueries(1):
+            response = self.client.post('/lenders/lookup/', ['WBC', 'XYZ', 'CBA', 'WBC'],
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()), ['WBC', 'XYZ', 'CBA'])
+        self.assertIsNone(response.json()['XYZ'])
+        self.assertEqual(response.json()['CBA'], self.client.get('/lenders/CBA/').json())
+        for body in ([], {'codes': ['CBA']}, [1, None]):
+            self.assertEqual(self.client.post('/lenders/lookup/', body, content_type='application/json').status_code,
+                             400, body)
+
+
+class LenderSearchTestCase(TestCase):
+    def setUp(self):
+        for name, code, upfront, trial in (('Commonwealth Bank', 'CBA', 1.5, 0.2), ('Westpac', 'WBC', 0.5, 0.1),
+                                           ('Bank of Queensland', 'BOQ', 0.65, 0.15), ('100% Home Loans', 'HUN', 2, 0)):
+            Lender.objects.create(name=name, code=code, upfront_commission_rate=upfront, trial_commission_rate=trial,
+                                  active=True)
+
+    def codes(self, query, url='/lenders/?format=json&'):
+        response = self.client.get(url + query)
+        self.assertEqual(response.status_code, 200)
+        return [lender['code'] for lender in response.json()['results']]
+
+    def test_search_is_a_case_insensitive_name_prefix(self):
+        self.assertEqual(self.codes('search=bank'), ['BOQ'])
+        self.assertEqual(self.codes('search=COMMONWEALTH%20BANK'), ['CBA'])
+        self.assertEqual(self.codes('search=w&active=True'), ['WBC'])
+        self.assertEqual(self.codes('search=pac'), [])
+        # LIKE wildcards are matched literally
+        self.assertEqual(self.codes('search=%25'), [])
+        self.assertEqual(self.codes('search=100%25'), ['HUN'])
+
+    def test_rate_ranges(self):
+        self.assertEqual(self.codes('upfront_commission_rate__gte=0.65'), ['CBA', 'BOQ', 'HUN'])
+        self.assertEqual(self.codes('upfront_commission_rate__gte=0.6&upfront_commission_rate__lte=1.5'),
+                         ['CBA', 'BOQ'])
+        self.assertEqual(self.codes('trial_commission_rate__lte=0.1&ordering=-trial_commission_rate'), ['WBC', 'HUN'])
+        self.assertEqual(self.codes('trial_commission_rate__gte=0.1&search=b&pagination=cursor'), ['BOQ'])
+        self.assertEqual(self.client.get('/lenders/?upfront_commission_rate__gte=high').status_code, 400)
+
+    def test_export_is_filtered_too(self):
+        export = self.client.get('/lenders/export/?search=bank&trial_commission_rate__gte=0.1')
+        self.assertEqual([lender['code'] for lender in json.loads(b''.join(export.streaming_content))], ['BOQ'])
+
+
+class LenderChangesTestCase(TestCase):
+    def setUp(self):
+        for code in ('CBA', 'WBC', 'SVB'):
+            Lender.objects.create(name=f'Lender {code}', code=code, upfront_commission_rate=1, trial_commission_rate=2,
+                                  active=True)
+        self.client.force_login(User.objects.create_user('sync', password='sync'))
+
+    def changes(self, since=None):
+        response = self.client.get('/lenders/changes/?format=json' + (f'&since={since}' if since else ''))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_inserts_every_lender(self):
+        with self.assertNumQueries(2 + 2):  # session and user, the change counter, the lenders
+            synced = self.changes()
+        self.assertEqual([(change['change'], change['code']) for change in synced['changes']],
+                         [('insert', 'CBA'), ('insert', 'WBC'), ('insert', 'SVB')])
+        lender = self.client.get('/lenders/CBA/?format=json').json()
+        self.assertEqual(synced['changes'][0], {'change': 'insert', **lender})
+        self.assertEqual(self.changes(synced['next'])['changes'], [])
+
+    def test_inserts_updates_and_deletes_since_a_token(self):
+        token = self.changes()['next']
+        ids = dict(Lender.objects.values_list('code', 'id'))
+        self.client.patch('/lenders/WBC/', {'active': False}, content_type='application/json')
+        self.client.delete('/lenders/CBA/')
+        self.client.post('/lenders/bulk/', [{'name': 'Lender CBA', 'code': 'CBA', 'upfront_commission_rate': 3,
+                                             'trial_commission_rate': 4}], content_type='application/json')
+        self.client.patch('/lenders/bulk/', [{'code': 'SVB', 'name': 'Renamed'}], content_type='application/json')
+        self.client.delete('/lenders/bulk/', ['SVB'], content_type='application/json')
+        with self.assertNumQueries(2 + 3):  # session and user, the change counter, the lenders, the tombstones
+            synced = self.changes(token)
+        self.assertEqual([(change['change'], change['code']) for change in synced['changes']],
+                         [('update', 'WBC'), ('delete', 'CBA'), ('insert', 'CBA'), ('delete', 'SVB')])
+        self.assertEqual(synced['changes'][0]['active'], False)
+        self.assertEqual(synced['changes'][1], {'change': 'delete', 'id': ids['CBA'], 'code': 'CBA'})
+        self.assertEqual(self.changes(synced['next'])['changes'], [])
+
+    def test_bulk_updates_are_changes(self):
+        token = self.changes()['next']
+        self.client.patch('/lenders/bulk/', [{'code': 'SVB', 'name': 'Renamed'}], content_type='application/json')
+        self.assertEqual([(change['change'], change['name']) for change in self.changes(token)['changes']],
+                         [('update', 'Renamed')])
+
+    def test_a_write_stamped_before_a_token_is_sent_after_it(self):
+        """
+        A transaction that stamped its lender's updated time before a token was handed out, and committed after, still
+        has its change sent since that token.
+        """
+        stamped = timezone.now() - datetime.timedelta(minutes=5)
+        token = self.changes()['next']
+        with mock.patch('django.utils.timezone.now', return_value=stamped):
+            Lender.objects.create(name='Late', code='LAT', upfront_commission_rate=1, trial_commission_rate=2)
+        self.assertEqual(Lender.objects.get(code='LAT').updated, stamped)
+        self.assertEqual([(change['change'], change['code']) for change in self.changes(token)['changes']],
+                         [('insert', 'LAT')])
+
+    def test_queryset_deletes_are_changes(self):
+        token = self.changes()['next']
+        self.assertEqual(Lender.objects.filter(code__in=['CBA', 'WBC']).delete(), (2, {'lenders.Lender': 2}))
+        self.assertEqual([(change['change'], change['code']) for change in self.changes(token)['changes']],
+                         [('delete', 'CBA'), ('delete', 'WBC')])
+
+    def test_deletes_lock_the_change_counter_before_the_lender(self):
+        with CaptureQueriesContext(connection) as queries:
+            Lender.objects.get(code='CBA').delete()
+        statements = [query['sql'] for query in queries]
+        counter = next(i for i, sql in enumerate(statements) if sql.startswith('UPDATE "lenders_lenderchangecounter"'))
+        delete = next(i for i, sql in enumerate(statements) if sql.startswith('DELETE FROM "lenders_lender" '))
+        self.assertLess(counter, delete)
+
+    def test_invalid_tokens(self):
+        for token in ('yesterday', '-1', '1' * 40):
+            response = self.client.get(f'/lenders/changes/?since={token}')
+            self.assertEqual(response.status_code, 400, token)
+            self.assertIn('since', response.json())
+        # a token ahead of every committed change was not handed out
+        response = self.client.get(f"/lenders/changes/?since={int(self.changes()['next']) + 1}")
+        self.assertEqual(response.status_code, 400)
+
+
+class LenderChangesConcurrencyTestCase(TransactionTestCase):
+    @skipUnless(connection.vendor == 'mysql', 'SQLite serializes whole write transactions')
+    def test_a_write_committed_after_a_token_is_sent_after_it(self):
+        """
+        A write that drew its change sequence number before a token was handed out, and committed after, is sent
+        since that token.
+        """
+        self.client.force_login(User.objects.create_user('sync', password='sync'))
+        drawn, commit = threading.Event(), threading.Event()
+
+        def write():
+            try:
+                with transaction.atomic():
+                    Lender.objects.create(name='Late', code='LAT', upfront_commission_rate=1, trial_commission_rate=2)
+                    drawn.set()
+                    commit.wait(10)
+            finally:
+                connection.close()
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertTrue(drawn.wait(10))
+        token = self.client.get('/lenders/changes/?format=json').json()['next']
+        commit.set()
+        writer.join()
+        changes = self.client.get(f'/lenders/changes/?format=json&since={token}').json()['changes']
+        self.assertEqual([(change['change'], change['code']) for change in changes], [('insert', 'LAT')])
+
+
+@override_settings(LENDER_RESPONSE_CACHE_TIMEOUT=0)
+class LenderRowsSerializerParityTestCase(TestCase):
+    def setUp(self):
+        for code, name, upfront, trial, active in [('CBA', 'Commonwealth Bank, "CBA"', 12, 0.1 + 0.2, True),
+                                                   ('SVB', 'Silicon\nValley ✓', 1e16 / 1e14, 0, False),
+                                                   ('WBC', 'Westpac', 0.0, 500, True),
+                                                   ('ANZ', '', 1 / 3, 2.5, False),
+                                                   ('NAB', 'N\\A\tB', 499.99, 1e-7, True)]:
+            Lender.objects.create(name=name, code=code, upfront_commission_rate=upfront, trial_commission_rate=trial,
+                                  active=active)
+
+    def responses(self, url, **headers):
+        """
+        The content of a response with the rows serializer, and with LenderSerializer over model instances.
+        """
+        fast = self.client.get(url, **headers)
+        with mock.patch.object(LenderViewSet, 'get_queryset', GenericAPIView.get_queryset), \
+                mock.patch.object(LenderViewSet, 'get_serializer', GenericAPIView.get_serializer):
+            reference = self.client.get(url, **headers)
+        self.assertEqual(fast.status_code, reference.status_code)
+        return fast.content, reference.content
+
+    def test_list_responses_are_byte_identical(self):
+        urls = ['/lenders/', '/lenders/?format=json&page_size=100', '/lenders/?format=csv&ordering=-code',
+                '/lenders.json', '/lenders/?active=False', '/lenders/?code__in=NAB,ANZ,XYZ&format=json',
+                '/lenders/?pagination=cursor&ordering=-trial_commission_rate&page_size=2&format=json']
+        if parquet_available():
+            urls.append('/lenders/?format=parquet')
+        for url in urls:
+            with self.subTest(url=url):
+                fast, reference = self.responses(url)
+                self.assertEqual(fast, reference)
+        fast, reference = self.responses('/lenders/?page_size=2', HTTP_ACCEPT='application/json',
+                                         HTTP_HOST='example.com')
+        self.assertEqual(fast, reference)
+        self.assertIn(b'"url":"http://example.com/lenders/CBA/"', fast)
+
+    def test_cursor_pages_follow_the_same_positions(self):
+        url = '/lenders/?pagination=cursor&ordering=upfront_commission_rate&page_size=2&format=json'
+        while url:
+            fast, reference = self.responses(url)
+            self.assertEqual(fast, reference)
+            url = json.loads(fast)['next']
+
+    def test_lookup_is_serialized_like_a_detail(self):
+        lookup = self.client.post('/lenders/lookup/?format=json', ['NAB', 'CBA'], content_type='application/json')
+        self.assertEqual(lookup.json(), {code: self.client.get(f'/lenders/{code}/?format=json').json()
+                                         for code in ('NAB', 'CBA')})
+
+
+class LatencySummaryTestCase(SimpleTestCase):
+    def test_percentiles_are_observed_latencies(self):
+        summary = latency_summary([i / 1000 for i in range(100, 0, -1)])
+        self.assertEqual(summary, {'requests': 100, 'requests_per_second': 19.8, 'mean_ms': 50.5, 'p50_ms': 50.0,
+                                   'p95_ms': 95.0, 'p99_ms': 99.0, 'max_ms': 100.0})
+        self.assertEqual(latency_summary([0.25])['p99_ms'], 250.0)
+
+
+class StartupTestCase(SimpleTestCase):
+    def test_web_worker_starts_within_budget_without_deferred_modules(self):
+        """benchmark_startup raises CommandError if a cold start is over budget or imports pandas or numpy"""
+        call_command('benchmark_startup', repeat=3, stdout=StringIO())
@@ -0,0 +1,166 @@
+import functools
+import math
+import re
+from django.core.exceptions import ValidationError
+from django.core.validators import (MinLengthValidator, MaxLengthValidator, MinValueValidator, MaxValueValidator,
+                                    RegexValidator)
+from django.db import models
+from lenders.models import Lender
+
+
+# the fields a bulk of lenders is validated on, i.e. every field a client sets
+LENDER_FIELDS = ['name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active']
+BOOLEAN_VALUES = {True: True, 't': True, 'True': True, '1': True, False: False, 'f': False, 'False': False, '0': False}
+
+
+class MissingColumnsError(ValueError):
+    """
+    A frame of lenders does not have a column for every lender field.
+    """
+
+
+def _limits(field, lower_validator, upper_validator):
+    """
+    The tightest (lower, upper) limit_value of a field's validators of the two kinds, None where there is none.
+    """
+    lower = max((v.limit_value for v in field.validators if type(v) is lower_validator), default=None)
+    upper = min((v.limit_value for v in field.validators if type(v) is upper_validator), default=None)
+    return lower, upper
+
+
+def _flag_every_value(series):
+    """
+    The check of a field this module cannot compile: every value goes through the model field.
+    """
+    import pandas as pd
+    return pd.Series(True, index=series.index), series.tolist()
+
+
+def _compile_check(field):
+    """
+    Compile the validators of a model field into one column-wise check: a function taking a pandas Series of raw
+    values and returning (a boolean Series flagging the values that may be invalid, the converted values as a list).
+
+    A flag only means the value has to go through field.clean() to get its messages, so the checks may be stricter
+    than the field but never more lenient. A field with a validator this does not know flags every value.
+    """
+    known = {MinLengthValidator, MaxLengthValidator, MinValueValidator, MaxValueValidator, RegexValidator}
+    if any(type(validator) not in known for validator in field.validators):
+        return _flag_every_value
+
+    if isinstance(field, models.CharField):
+        min_length, max_length = _limits(field, MinLengthValidator, MaxLengthValidator)
+        # validator.regex is a lazy object whose every attribute access goes through a proxy, too slow per value
+        regexes = [(re.compile(v.regex.pattern, v.regex.flags), v.inverse_match) for v in field.validators
+                   if isinstance(v, RegexValidator)]
+
+        def check(series):
+            strings = series.astype(str)
+            lengths = strings.str.len()
+            flagged = series.isna() | ~lengths.between(min_length or 0, max_length or math.inf)
+            if not field.blank:
+                flagged |= lengths == 0
+            for regex, inverse_match in regexes:
+                matches = strings.str.contains(regex)
+                flagged |= matches if inverse_match else ~matches
+            return flagged, strings.tolist()
+
+    elif isinstance(field, models.FloatField):
+        minimum, maximum = _limits(field, MinValueValidator, MaxValueValidator)
+        minimum = -math.inf if minimum is None else minimum
+        maximum = math.inf if maximum is None else maximum
+
+        def check(series):
+            import pandas as pd
+            numbers = pd.to_numeric(series, errors='coerce')
+            # NaN is never between, and the database cannot store infinities either
+            flagged = ~numbers.between(minimum, maximum) | (numbers.abs() == math.inf)
+            # as floats, like the field's to_python(), even when every cell looks like an integer
+            return flagged, numbers.astype(float).tolist()
+
+    elif isinstance(field, models.BooleanField):
+        def check(series):
+            booleans = series.map(BOOLEAN_VALUES)
+            return booleans.isna(), booleans.tolist()
+
+    else:
+        return _flag_every_value
+    return check
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_checks():
+    """
+    The column-wise check of every field in LENDER_FIELDS, compiled once per process from the Lender model, whose
+    validators are built from LenderFieldConstraints.
+    """
+    return {name: _compile_check(Lender._meta.get_field(name)) for name in LENDER_FIELDS}
+
+
+def field_errors(field_name, value):
+    """
+    The messages Lender.full_clean() reports for a single value of a field.
+    """
+    field = Lender._meta.get_field(field_name)
+    try:
+        cleaned = field.clean(value, None)
+    except ValidationError as e:
+        return e.messages
+    if isinstance(cleaned, float) and not math.isfinite(cleaned):
+        # full_clean lets NaN and infinities through the min/max validators but the database cannot store them
+        return [field.error_messages['invalid'] % {'value': value}]
+    return []
+
+
+def validate_lender_frame(df, reject_existing=True):
+    """
+    Validate every row of a DataFrame of lenders in one column-wise pass.
+
+    Returns (errors, values, existing) where errors maps a row position to the full_clean() style error dict of that
+    row, values holds the converted columns (as lists) and existing maps the valid codes already in the database to
+    their Lender, fetched with one IN query.
+    Only the values the compiled checks flag go through the model field (once per distinct value), so the cost per
+    row is paid by bad rows only, and their messages are exactly the ones full_clean() gives.
+
+    Uniqueness of `code` follows the rule of saving the rows one by one: the first valid row of a code wins and every
+    later row of that code is rejected. Codes already in the database are rejected too, if `reject_existing`.
+    """
+    missing = [column for column in LENDER_FIELDS if column not in df.columns]
+    if missing:
+        raise MissingColumnsError(f'missing column(s): {", ".join(missing)}')
+
+    invalid, values = {}, {}
+    for column, check in compiled_checks().items():
+        invalid[column], values[column] = check(df[column])
+
+    errors, messages_of = {}, {}
+    for column, mask in invalid.items():
+        raw_values = df[column]
+        for position in mask.to_numpy().nonzero()[0]:
+            raw = raw_values.iat[position]
+            try:
+                messages = messages_of[column, raw]
+            except (KeyError, TypeError):  # not seen yet, or not hashable
+                messages = field_errors(column, raw)
+                try:
+                    messages_of[column, raw] = messages
+                except TypeError:
+                    pass
+            if messages:
+                errors.setdefault(position, {})[column] = messages
+            else:  # the compiled check was stricter than the model field, e.g. ' 1.5' is a valid float
+                values[column][position] = Lender._meta.get_field(column).to_python(raw)
+
+    # uniqueness is only checked on codes that are valid themselves, exactly like Model.validate_unique()
+    code_ok = [position not in errors or 'code' not in errors[position] for position in range(len(df))]
+    existing = Lender.objects.in_bulk({code for code, ok in zip(values['code'], code_ok) if ok}, field_name='code')
+    taken = existing if reject_existing else {}
+    first_valid_row = {}
+    for position, code in enumerate(values['code']):
+        if code_ok[position] and position not in errors and code not in taken:
+            first_valid_row.setdefault(code, position)
+    unique_message = Lender(code='').unique_error_message(Lender, ('code',)).messages
+    for position, code in enumerate(values['code']):
+        if code_ok[position] and (code in taken or first_valid_row.get(code, position) < position):
+            errors.setdefault(position, {})['code'] = unique_message
+    return errors, values, existing
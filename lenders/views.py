@@ -1,19 +1,241 @@
-from lenders.models import Lender
-from lenders.serializers import LenderSerializer
-from rest_framework import viewsets, permissions
+from django.conf import settings
+from django.db import transaction
+from lenders.models import Lender, LenderChangeCounter
+from lenders.serializers import LenderSerializer, LenderBulkSerializer, LenderRowsSerializer
+from lenders.bulk import insert_lenders, update_lenders, delete_lenders
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework import filters
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.settings import api_settings
-from lenders.renderers import CSVRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from lenders.renderers import CSVRenderer, NDJSONRenderer, ParquetRenderer, json_blocks, ajson_blocks, csv_blocks
+from lenders.parsers import ParquetParser, CSVParser
+from lenders.changes import lender_changes, change_token, token_seq, InvalidChangeTokenError
+from lenders.commissions import loan_frame, price_loans, InvalidLoansError, COMMISSION_FIELDS
+from lenders.parquet import parquet_available, parquet_blocks, aparquet_blocks
+from lenders.filtersets import LenderFilterSet
+from lenders.pagination import LenderPageNumberPagination, LenderCursorPagination
+from lenders.caching import CachedResponseMixin
 
-class LenderViewSet(viewsets.ModelViewSet):
+
+# the fields of an exported lender, in the order the csv download has them, and rows fetched and encoded at a time
+EXPORT_FIELDS = ['id', 'name', 'code', 'upfront_commission_rate', 'trial_commission_rate', 'active']
+EXPORT_CHUNK_ROWS = 2000
+# ?format=parquet and parquet bulk uploads are only offered when the optional pyarrow is installed
+PARQUET_RENDERERS = (ParquetRenderer,) if parquet_available() else ()
+PARQUET_PARSERS = (ParquetParser,) if parquet_available() else ()
+
+
+def bulk_status_code(report, rejected_key):
+    """
+    200 when every item of a bulk request went through, 207 when some were rejected.
+    """
+    return status.HTTP_207_MULTI_STATUS if report[rejected_key] else status.HTTP_200_OK
+
+
+class LenderViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Lender.objects.all()
     serializer_class = LenderSerializer
-    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (CSVRenderer,)
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (CSVRenderer,) + PARQUET_RENDERERS
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = LenderPageNumberPagination
 
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['active','code']
+    filterset_class = LenderFilterSet
     ordering_fields = ['created', 'code', 'upfront_commission_rate', 'trial_commission_rate','active']
+    ordering = ['created', 'id']
+
+    lookup_field = 'code'
+
+    def get_queryset(self):
+        if self.action == 'list':
+            # rows rather than model instances, serialized by LenderRowsSerializer
+            return super().get_queryset().values_list(*LenderRowsSerializer.ROW_FIELDS, named=True)
+        return super().get_queryset()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list' and kwargs.get('many'):
+            return LenderRowsSerializer(*args, context=self.get_serializer_context())
+        return super().get_serializer(*args, **kwargs)
+
+    @property
+    def paginator(self):
+        """
+        Cursor pagination when the client opts in with ?pagination=cursor, page number pagination otherwise.
+        """
+        request = getattr(self, 'request', None)
+        if not hasattr(self, '_paginator') and request is not None and request.query_params.get('pagination') == 'cursor':
+            self._paginator = LenderCursorPagination()
+        return super().paginator
+
+    @action(detail=False, methods=['get'], renderer_classes=[JSONRenderer, NDJSONRenderer, *PARQUET_RENDERERS])
+    def export(self, request):
+        """
+        Stream every lender matching the filters of the list (?active=, ?code=, ?code__in=, ?search= and the rate
+        ranges) in id order, as one JSON array, as NDJSON with ?format=ndjson (or Accept: application/x-ndjson) or as
+        parquet with ?format=parquet, without pagination.
+        Lenders are fetched in keyset chunks and encoded a chunk at a time, so memory does not grow with the table.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer_format = request.accepted_renderer.format
+        if isinstance(request._request, ASGIRequest):
+            # like the csv download, an async generator streams on the event loop rather than holding a thread
+            rows = queryset.aiter_values_list(*EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_ROWS)
+            if renderer_format == 'parquet':
+                blocks = aparquet_blocks(EXPORT_FIELDS, rows, EXPORT_CHUNK_ROWS)
+            else:
+                blocks = ajson_blocks(EXPORT_FIELDS, rows, EXPORT_CHUNK_ROWS, renderer_format == 'ndjson')
+        else:
+            rows = queryset.iter_values_list(*EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_ROWS)
+            if renderer_format == 'parquet':
+                blocks = parquet_blocks(EXPORT_FIELDS, rows, EXPORT_CHUNK_ROWS)
+            else:
+                blocks = json_blocks(EXPORT_FIELDS, rows, EXPORT_CHUNK_ROWS, renderer_format == 'ndjson')
+        return StreamingHttpResponse(blocks, content_type=request.accepted_renderer.media_type)
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, CSVParser],
+            renderer_classes=[JSONRenderer, NDJSONRenderer, CSVRenderer])
+    def commissions(self, request):
+        """
+        Price a batch of loans (a JSON list of objects or a csv, with code, loan_amount and term_months), up to
+        LENDER_COMMISSION_MAX_LOANS: the upfront and trial commissions of each loan, or why it could not be priced in
+        'error', streamed in loan order as a JSON array, as NDJSON (?format=ndjson) or as a csv (?format=csv).
+        The lenders are fetched with one query and the commissions computed with array arithmetic. The response is
+        207 Multi-Status if any loan could not be priced.
+        """
+        try:
+            loans = loan_frame(request.data)
+        except InvalidLoansError as e:
+            raise serializers.ValidationError(str(e))
+        if len(loans) > settings.LENDER_COMMISSION_MAX_LOANS:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than {settings.LENDER_COMMISSION_MAX_LOANS} elements.')
+        columns = price_loans(loans)
+        rows = zip(*columns)
+        renderer_format = request.accepted_renderer.format
+        if renderer_format == 'csv':
+            blocks = csv_blocks(COMMISSION_FIELDS, rows, EXPORT_CHUNK_ROWS, lineterminator='\n')
+        else:
+            blocks = json_blocks(COMMISSION_FIELDS, rows, EXPORT_CHUNK_ROWS, renderer_format == 'ndjson')
+        failed = any(error is not None for error in columns[-1])
+        return StreamingHttpResponse(blocks, content_type=request.accepted_renderer.media_type,
+                                     status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny],
+            renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES)
+    def lookup(self, request):
+        """
+        Look up the lenders of a JSON list of up to LENDER_LOOKUP_MAX_CODES codes, with one query on the unique code
+        index and without pagination. The result is keyed by code, in the order the codes were given, a code no lender
+        has mapping to null. Only reads, so no login is needed, as for GET.
+        """
+        codes = serializers.ListField(child=serializers.CharField(), allow_empty=False,
+                                      max_length=settings.LENDER_LOOKUP_MAX_CODES).run_validation(request.data)
+        # a filter rather than in_bulk(), which splits the codes in a query per 999 on SQLite
+        found = Lender.objects.filter(code__in=set(codes)).values_list(*LenderRowsSerializer.ROW_FIELDS)
+        serialized = LenderRowsSerializer(found, context=self.get_serializer_context()).data
+        by_code = {lender['code']: lender for lender in serialized}
+        return Response({code: by_code.get(code) for code in codes})
+
+    @action(detail=False, methods=['get'], renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES)
+    def changes(self, request):
+        """
+        The lenders inserted, updated and deleted since the ?since= change token of an earlier response (every lender
+        without one), in the order they were committed, and the token to send next time in 'next'.
+        The token is the last change sequence number committed when the changes are read. Writers draw theirs from
+        the LenderChangeCounter row, which they keep locked until they commit, so a write that commits after a token
+        was handed out has a greater number than it.
+        """
+        since = request.query_params.get('since')
+        until = LenderChangeCounter.committed_value()
+        try:
+            since = token_seq(since) if since else None
+            if since is not None and since > until:
+                raise InvalidChangeTokenError(f'{change_token(since)!r} is not a change token.')
+        except InvalidChangeTokenError as e:
+            raise serializers.ValidationError({'since': [str(e)]})
+        changes = lender_changes(since, until, self.get_serializer_context())
+        return Response({'next': change_token(until), 'changes': changes})
+
+    def bulk_serializer(self, request, **kwargs):
+        serializer = LenderBulkSerializer(data=request.data, many=True, max_length=settings.LENDER_BULK_MAX_ITEMS,
+                                          context=self.get_serializer_context(), **kwargs)
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def rejected_items(self, request, item_errors):
+        return [{'item': request.data[position], 'exception': item_errors[position]} for position in sorted(item_errors)]
+
+    def serialized_items(self, lenders):
+        return [{'item': item, 'exception': None}
+                for item in LenderSerializer(lenders, many=True, context=self.get_serializer_context()).data]
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, *PARQUET_PARSERS])
+    def bulk(self, request):
+        """
+        Create every lender of a JSON list (or the rows of a parquet file) at once, with bulk inserts in one
+        transaction.
+        Each item is reported in 'items_added' or 'items_not_added' with its errors, as a /csv-in-bulk/ upload does.
+        """
+        serializer = self.bulk_serializer(request)
+        lenders = [Lender(**data) for data in serializer.validated_data]
+        with transaction.atomic():
+            failed = insert_lenders(lenders)
+        for index, error in failed.items():
+            serializer.item_errors[serializer.positions[index]] = error
+        report = {
+            'items_added': self.serialized_items([lender for i, lender in enumerate(lenders) if i not in failed]),
+            'items_not_added': self.rejected_items(request, serializer.item_errors),
+        }
+        return Response(report, status=bulk_status_code(report, 'items_not_added'))
+
+    @bulk.mapping.patch
+    def bulk_partial_update(self, request):
+        """
+        Update the lenders of a JSON list of partial lenders identified by code, with bulk updates in one transaction.
+        """
+        serializer = self.bulk_serializer(request, partial=True)
+        stored = Lender.objects.in_bulk({data['code'] for data in serializer.validated_data}, field_name='code')
+        updated, unchanged, fields = [], [], set()
+        for position, data in zip(serializer.positions, serializer.validated_data):
+            lender = stored.get(data['code'])
+            if lender is None:
+                serializer.item_errors[position] = {'code': [NotFound.default_detail]}
+                continue
+            changed = [field for field, value in data.items() if getattr(lender, field) != value]
+            for field in changed:
+                setattr(lender, field, data[field])
+            fields.update(changed)
+            (updated if changed else unchanged).append(lender)
+        with transaction.atomic():
+            update_lenders(list({lender.pk: lender for lender in updated}.values()), sorted(fields))
+        report = {
+            'items_updated': self.serialized_items(updated),
+            'items_unchanged': self.serialized_items(unchanged),
+            'items_not_updated': self.rejected_items(request, serializer.item_errors),
+        }
+        return Response(report, status=bulk_status_code(report, 'items_not_updated'))
 
-    lookup_field = 'code'
\ No newline at end of file
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """
+        Delete the lenders of a JSON list of codes.
+        """
+        codes = serializers.ListField(child=serializers.CharField(), allow_empty=False,
+                                      max_length=settings.LENDER_BULK_MAX_ITEMS).run_validation(request.data)
+        codes = list(dict.fromkeys(codes))  # a code listed more than once is deleted and reported once
+        with transaction.atomic():
+            deleted = delete_lenders(codes)
+        report = {'items_deleted': [], 'items_not_deleted': []}
+        for code in codes:
+            if code in deleted:
+                report['items_deleted'].append({'item': code, 'exception': None})
+            else:
+                report['items_not_deleted'].append({'item': code, 'exception': {'code': [NotFound.default_detail]}})
+        return Response(report, status=bulk_status_code(report, 'items_not_deleted'))